@@ -0,0 +1,226 @@
+import asyncio
+import datetime
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pymongo.errors import DuplicateKeyError
+
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+# Each client's bucket refills at RATE_LIMIT_RATE tokens per second up to RATE_LIMIT_BURST.
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "2"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+# "memory" keeps buckets per worker process; "mongo" shares them between workers and instances.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Requests carrying one of these keys in X-API-Key (e.g. the SMS gateway) get their
+# own bucket instead of their IP's. Unknown keys are ignored, so they can't be rotated
+# to dodge the limit.
+RATE_LIMIT_API_KEYS = frozenset(key.strip() for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip())
+# Buckets of API-key callers; the default burst pays for a full batch of 500 questions.
+RATE_LIMIT_API_KEY_RATE = float(os.getenv("RATE_LIMIT_API_KEY_RATE", "20"))
+RATE_LIMIT_API_KEY_BURST = float(os.getenv("RATE_LIMIT_API_KEY_BURST", "5000"))
+# Number of proxies in front of the app that append to X-Forwarded-For (1 on Render).
+# The client address is the entry that many places from the right, i.e. the one the
+# outermost trusted proxy saw; entries further left are client-supplied. 0 uses the
+# connecting address.
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+# LLM calls in flight, per worker process: single questions and each call of a batch.
+LLM_CONCURRENCY_LIMIT = int(os.getenv("LLM_CONCURRENCY_LIMIT", "16"))
+
+# Tokens one question costs. A batch pays for its first question on arrival and for
+# the rest once its body is parsed (see charge).
+QUESTION_COST = 10
+# Token cost by path prefix, first match wins. Paths outside /api (the frontend,
+# static files, health checks, /metrics) are free.
+ROUTE_COSTS: Tuple[Tuple[str, float], ...] = (
+    ("/api/query", QUESTION_COST),
+    ("/api/agri-share/agri-share/equipment/import", 10),
+    ("/api/", 1),
+)
+# Routes that make one LLM call per request; the middleware takes an llm_slots slot
+# for them or rejects the request. The batch route takes a slot per call instead.
+LLM_ROUTES = frozenset({"/api/query/query", "/api/query/query/"})
+
+admission_rejections = Counter(
+    "agrisaathi_admission_rejections_total",
+    "Requests rejected with 429 by admission control, by reason (rate or concurrency).",
+    labels=("reason",),
+)
+
+
+class LLMSlots:
+    """
+    Counts LLM calls in flight in this worker against a limit. `try_acquire` is for
+    requests that are turned away when no slot is free; `acquire` waits for one, for
+    calls of a batch that has already been admitted. Used from the event loop only.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def try_acquire(self) -> bool:
+        if self.in_use >= self.limit or self._waiters:
+            return False
+        self.in_use += 1
+        return True
+
+    async def acquire(self):
+        if self.try_acquire():
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to the first waiter.
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_use -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+llm_slots = LLMSlots(LLM_CONCURRENCY_LIMIT)
+
+
+def route_cost(path: str) -> float:
+    for prefix, cost in ROUTE_COSTS:
+        if path.startswith(prefix):
+            return cost
+    return 0
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in an OrderedDict, for one worker process, kept in order of last
+    update. Calls come from the event loop thread only, so no lock is needed. Past
+    `max_clients` buckets the least recently updated one is dropped; its client
+    starts again from a full bucket, as it would after going idle.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, cost: float) -> float:
+        """Takes `cost` tokens from `key`'s bucket. Returns 0, or the seconds until they would be available."""
+        return self.take_now(key, cost, time.monotonic())
+
+    def take_now(self, key: str, cost: float, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        retry_after = 0.0
+        if tokens < cost:
+            retry_after = (cost - tokens) / self.rate
+        else:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class MongoBucketStore:
+    """
+    Token buckets in a MongoDB collection, shared by every worker and instance. A
+    bucket is read, refilled and written back only if no one else wrote it in
+    between, retrying on a conflict. Idle buckets are removed by the TTL index on
+    `expires_at` (see indexes.py).
+    """
+
+    def __init__(self, collection, rate: float, burst: float, attempts: int = 3):
+        self.collection = collection
+        self.rate = rate
+        self.burst = burst
+        self.attempts = attempts
+
+    async def take(self, key: str, cost: float) -> float:
+        from .db import run_db
+        return await run_db("rate_limits.take", self.take_now, key, cost, time.time())
+
+    def take_now(self, key: str, cost: float, now: float) -> float:
+        expires_at = datetime.datetime.fromtimestamp(now + self.burst / self.rate, datetime.timezone.utc)
+        for _ in range(self.attempts):
+            bucket = self.collection.find_one({"_id": key})
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket["tokens"] + max(0.0, now - bucket["updated"]) * self.rate)
+            if tokens < cost:
+                return (cost - tokens) / self.rate
+            fields = {"tokens": tokens - cost, "updated": now, "expires_at": expires_at}
+            if bucket is None:
+                try:
+                    self.collection.insert_one({"_id": key, **fields})
+                    return 0.0
+                except DuplicateKeyError:
+                    continue
+            written = self.collection.update_one(
+                {"_id": key, "tokens": bucket["tokens"], "updated": bucket["updated"]}, {"$set": fields}
+            )
+            if written.modified_count:
+                return 0.0
+        # Still contended: ask the client to come back once its request would have been paid for.
+        return cost / self.rate
+
+
+def create_bucket_store(backend: Optional[str] = None, rate: float = RATE_LIMIT_RATE, burst: float = RATE_LIMIT_BURST):
+    backend = backend or RATE_LIMIT_BACKEND
+    if backend == "mongo":
+        from .db import db
+        return MongoBucketStore(db.rate_limits, rate, burst)
+    if backend != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+    return MemoryBucketStore(rate, burst)
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+async def charge(request: Request, cost: float):
+    """
+    Takes `cost` more tokens from the caller's bucket, for requests whose cost is
+    only known from their body (a batch's question count). Raises 429 if the bucket
+    can't pay yet, or 413 if it never could. Does nothing when admission control is off.
+    """
+    admission = request.scope.get("state", {}).get("admission")
+    if admission is None or cost <= 0:
+        return
+    store, key = admission
+    if cost > store.burst:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Request costs more than this client's rate limit of {store.burst:.0f} tokens; split it",
+        )
+    retry_after = await store.take(key, cost)
+    if retry_after > 0:
+        admission_rejections.inc("rate")
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": retry_after_header(retry_after)})
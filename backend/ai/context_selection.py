@@ -0,0 +1,48 @@
+from typing import List
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def select_context(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    dedup_threshold: float = 0.95,
+    mmr_lambda: float = 0.7,
+) -> List[int]:
+    """
+    Chooses up to `k` of the retrieved candidates for the prompt. Vectors are unit
+    length; candidates are ordered best match first.
+
+    A candidate whose cosine similarity to a better-ranked, kept candidate is at
+    least `dedup_threshold` is dropped as a near-duplicate. The rest are picked
+    greedily by maximal marginal relevance,
+    `mmr_lambda * sim(query, d) - (1 - mmr_lambda) * max(sim(d, picked))`,
+    so each pick is relevant but unlike those before it. Returns candidate
+    positions in pick order; fewer than `k` if duplicates were dropped.
+    """
+    if len(candidate_vectors) == 0:
+        return []
+    similarity = candidate_vectors @ candidate_vectors.T
+    relevance = candidate_vectors @ query_vector
+
+    kept: List[int] = []
+    for i in range(len(candidate_vectors)):
+        if not kept or similarity[i, kept].max() < dedup_threshold:
+            kept.append(i)
+
+    remaining = np.array(kept)
+    # Highest similarity of each remaining candidate to anything picked so far.
+    redundancy = np.zeros(len(remaining), dtype=np.float32)
+    picked: List[int] = []
+    while len(remaining) and len(picked) < k:
+        best = int(np.argmax(mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy))
+        picked.append(int(remaining[best]))
+        remaining = np.delete(remaining, best)
+        redundancy = np.maximum(np.delete(redundancy, best), similarity[remaining, picked[-1]])
+    return picked
@@ -1,30 +1,193 @@
 import os
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_embeddings():
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "torch" runs the model through sentence-transformers; "onnx" runs an exported copy
+# (see backend/ai/onnx_export.py) with ONNX Runtime, which is several times faster on CPU.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'models', 'all-MiniLM-L6-v2-onnx'),
+)
+# Use the dynamically int8-quantized model when it has been exported.
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "1") != "0"
+# Intra-op threads per process; 0 lets the runtime use every core. With several
+# gunicorn workers, set this to cores / workers so they don't oversubscribe the CPU.
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# all-MiniLM-L6-v2 was trained on 256-token inputs; sentence-transformers truncates there too.
+MAX_SEQ_LENGTH = 256
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an ONNX export of a sentence-transformers model: the
+    token embeddings are mean-pooled over the attention mask and L2-normalized,
+    exactly as the torch pipeline does, so both backends produce interchangeable
+    vectors (up to quantization error).
+
+    Texts are embedded in batches of similar length to keep padding small. The
+    inference session is created on first use in each process, because ONNX
+    Runtime's thread pool does not survive a fork (see backend/preload.py).
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        threads: int = 0,
+        batch_size: int = 32,
+        max_length: int = MAX_SEQ_LENGTH,
+    ):
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+        if not quantized or not os.path.exists(model_path):
+            if quantized:
+                logger.warning(f"No quantized model in {model_dir}, using the full-precision one")
+            model_path = os.path.join(model_dir, MODEL_FILE)
+        self.model_path = model_path
+        self.threads = threads
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+
+        self._session = None
+        self._session_pid = None
+        self._input_names = ()
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    import onnxruntime as ort
+
+                    options = ort.SessionOptions()
+                    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                    options.intra_op_num_threads = self.threads
+                    options.inter_op_num_threads = 1
+                    session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+                    self._input_names = tuple(i.name for i in session.get_inputs())
+                    self._session, self._session_pid = session, os.getpid()
+                    logger.info(f"Loaded ONNX embedding model {self.model_path} ({self.threads or 'default'} threads)")
+        return self._session
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for i, encoding in enumerate(encodings):
+            input_ids[i, :len(encoding.ids)] = encoding.ids
+            attention_mask[i, :len(encoding.ids)] = 1
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": np.zeros_like(input_ids)}
+
+        session = self._get_session()
+        token_embeddings = session.run(None, {name: inputs[name] for name in self._input_names})[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds `texts` into a (len(texts), dim) float32 array."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = []
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            batches.append(self._embed_batch([texts[i] for i in batch]))
+        embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+
+class TorchEmbeddings(Embeddings):
+    """
+    sentence-transformers embeddings through langchain_huggingface. The model, and
+    torch with it, is loaded on first use in each process: torch's OpenMP thread
+    pool and the HF tokenizers' threads do not survive a fork, so a model loaded
+    in the gunicorn master is not reused by the workers (see backend/preload.py).
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = 0, batch_size: int = 32):
+        self.model_name = model_name
+        self.threads = threads
+        self.batch_size = batch_size
+        self._model = None
+        self._model_pid = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None or self._model_pid != os.getpid():
+            with self._lock:
+                if self._model is None or self._model_pid != os.getpid():
+                    from langchain_huggingface import HuggingFaceEmbeddings
+
+                    if self.threads:
+                        import torch
+                        torch.set_num_threads(self.threads)
+                    model = HuggingFaceEmbeddings(
+                        model_name=self.model_name,
+                        model_kwargs={'device': 'cpu'},
+                        encode_kwargs={'batch_size': self.batch_size},
+                    )
+                    self._model, self._model_pid = model, os.getpid()
+                    logger.info(f"Loaded torch embedding model {self.model_name} ({self.threads or 'default'} threads)")
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._get_model().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._get_model().embed_query(text)
+
+
+def get_embeddings(backend: Optional[str] = None) -> Embeddings:
     """
-    Returns an instance of HuggingFaceEmbeddings.
-    This function acts as a factory for the embedding model.
+    Returns the embedding model for the configured backend (EMBEDDING_BACKEND:
+    "torch" or "onnx"). Both produce normalized all-MiniLM-L6-v2 vectors, so an
+    index built with one can be queried with the other.
     """
-    logger.info("Initializing HuggingFace embeddings...")
-    
-    model_name = "sentence-transformers/all-MiniLM-L6-v2"
-    
-    model_kwargs = {'device': 'cpu'}
-    
-    encode_kwargs = {}
+    backend = backend or EMBEDDING_BACKEND
+    logger.info(f"Initializing {backend} embeddings...")
 
     try:
-        embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs=model_kwargs,
-            encode_kwargs=encode_kwargs
-        )
-        logger.info(f"Successfully initialized HuggingFaceEmbeddings with model: {model_name}")
+        if backend == "onnx":
+            embeddings = OnnxEmbeddings(
+                ONNX_MODEL_DIR,
+                quantized=ONNX_QUANTIZED,
+                threads=EMBEDDING_THREADS,
+                batch_size=EMBEDDING_BATCH_SIZE,
+            )
+        elif backend == "torch":
+            embeddings = TorchEmbeddings(MODEL_NAME, threads=EMBEDDING_THREADS, batch_size=EMBEDDING_BATCH_SIZE)
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        logger.info(f"Successfully initialized {backend} embeddings with model: {MODEL_NAME}")
         return embeddings
     except Exception as e:
-        logger.error(f"Failed to initialize HuggingFaceEmbeddings: {e}", exc_info=True)
+        logger.error(f"Failed to initialize {backend} embeddings: {e}", exc_info=True)
         raise
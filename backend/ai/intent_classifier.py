@@ -4,17 +4,12 @@ from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 import logging
 import random
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 LABELS = ["weather", "irrigation", "crop selection", "market price", "government scheme", "finance", "general query"]
 
-llm = ChatGroq(
-    model="llama3-8b-8192",
-    temperature=0,
-    max_tokens=50,
-    api_key=os.getenv("GROQ_API_KEY")
-)
 
 intent_prompt_template = """
 You are an expert at classifying user queries in the agricultural domain.
@@ -35,7 +30,16 @@ INTENT_PROMPT = PromptTemplate(
     input_variables=["query", "labels"]
 )
 
-intent_chain = LLMChain(llm=llm, prompt=INTENT_PROMPT)
+@lru_cache(maxsize=1)
+def get_intent_chain() -> LLMChain:
+    """Builds the Groq client and chain on first use rather than at import."""
+    llm = ChatGroq(
+        model="llama3-8b-8192",
+        temperature=0,
+        max_tokens=50,
+        api_key=os.getenv("GROQ_API_KEY")
+    )
+    return LLMChain(llm=llm, prompt=INTENT_PROMPT)
 
 def classify_intent(query: str) -> str:
     """
@@ -54,7 +58,7 @@ def classify_intent(query: str) -> str:
     try:
         formatted_labels = "\n".join([f"- {label}" for label in LABELS])
 
-        result = intent_chain.invoke({
+        result = get_intent_chain().invoke({
             "query": query,
             "labels": formatted_labels
         })
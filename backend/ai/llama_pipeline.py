@@ -1,12 +1,16 @@
+import asyncio
 import os
 from langchain_groq import ChatGroq
 from langchain.prompts import PromptTemplate
 from langchain.schema import Document
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from .retriever import get_retriever
-from ..schemas import WeatherResponse, MarketResponse
+from ..metrics import span
+from ..admission import llm_slots
+from ..schemas import WeatherResponse, MarketResponse, MarketTrendsResponse
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
 import logging
 import tiktoken
 import re
@@ -17,12 +21,18 @@ load_dotenv()
 if not os.getenv("GROQ_API_KEY"):
     print("Warning: GROQ_API_KEY not set. AI features will not work.")
 
-llm = ChatGroq(
-    model="llama3-8b-8192",  
-    temperature=0.3,  
-    max_tokens=512, 
-    api_key=os.getenv("GROQ_API_KEY")
-)
+# LLM calls in flight at once for one batch request (see get_ai_responses_batch).
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+@lru_cache(maxsize=1)
+def get_llm() -> ChatGroq:
+    """Builds the Groq chat client on first use rather than at import."""
+    return ChatGroq(
+        model="llama3-8b-8192",  
+        temperature=0.3,  
+        max_tokens=512, 
+        api_key=os.getenv("GROQ_API_KEY")
+    )
 
 LANGUAGE_INSTRUCTIONS = {
     "hindi": "हिंदी में जवाब दें। केवल हिंदी का उपयोग करें, कोई अंग्रेजी शब्द न मिलाएं।",
@@ -55,6 +65,11 @@ DO NOT mix languages. Your ENTIRE response must be in {lang} only.
 {context}
 ---
 
+**Current Conditions:**
+Weather: {weather}
+Market prices: {market}
+Price trends: {trends}
+
 **User Query:** {query}
 **Location:** {district}, {state} (Pin: {pincode})
 
@@ -63,13 +78,28 @@ DO NOT mix languages. Your ENTIRE response must be in {lang} only.
 
 PROMPT = PromptTemplate(
     template=prompt_template,
-    input_variables=["language_instruction", "context", "query", "pincode", "district", "state", "lang"]
+    input_variables=["language_instruction", "context", "query", "pincode", "district", "state", "lang", "weather", "market", "trends"]
 )
 
+@lru_cache(maxsize=1)
+def get_token_encoding():
+    """
+    The tiktoken encoding, or None if it cannot be loaded (tiktoken downloads it on
+    first use, which fails offline); count_tokens then estimates from the length.
+    The outcome is cached either way so the download is not retried per call.
+    """
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
 def count_tokens(text: str) -> int:
     """Count tokens in text using tiktoken (approximation for LLaMA)"""
     try:
-        encoding = tiktoken.get_encoding("cl100k_base")  
+        encoding = get_token_encoding()
+        if encoding is None:
+            return len(text) // 4
         return len(encoding.encode(text))
     except:
         return len(text) // 4
@@ -104,15 +134,17 @@ def summarize_weather_data(weather_data: WeatherResponse) -> str:
         return "Not available"
     
     try:
-        current = weather_data.current if hasattr(weather_data, 'current') else {}
-        forecast = weather_data.forecast if hasattr(weather_data, 'forecast') else {}
-        
-        summary = f"Temp: {current.get('temp', 'N/A')}°C, "
-        summary += f"Humidity: {current.get('humidity', 'N/A')}%, "
-        summary += f"Rain: {current.get('rain', 'No')} "
-        
-        if forecast:
-            summary += f"| 7-day: {forecast.get('summary', 'Variable conditions')}"
+        forecast = weather_data.forecast if hasattr(weather_data, 'forecast') else []
+        if not forecast:
+            return "Not available"
+
+        today = forecast[0].get('day', {})
+        summary = f"Temp: {today.get('mintemp_c', 'N/A')}-{today.get('maxtemp_c', 'N/A')}°C, "
+        summary += f"Humidity: {today.get('avghumidity', 'N/A')}%, "
+        summary += f"Rain: {today.get('daily_chance_of_rain', 'N/A')}% "
+
+        total_rain = sum(day.get('day', {}).get('totalprecip_mm') or 0 for day in forecast)
+        summary += f"| {len(forecast)}-day rain: {total_rain:.1f} mm"
         
         return summary[:200]  
     except:
@@ -124,15 +156,34 @@ def summarize_market_data(market_data: MarketResponse) -> str:
         return "Not available"
     
     try:
-        if hasattr(market_data, 'prices') and market_data.prices:
-            prices = market_data.prices[:3]  
-            price_list = [f"{p.get('commodity', 'Item')}: ₹{p.get('price', 'N/A')}" 
+        if hasattr(market_data, 'market_data') and market_data.market_data:
+            prices = market_data.market_data[:3]  
+            price_list = [f"{p.commodity} ({p.apmc}): ₹{p.modal_price:g}/{p.unit}" 
                          for p in prices]
             return " | ".join(price_list)
         return "No current prices available"
     except:
         return "Market data processing error"
 
+def summarize_market_trends(trends_data: MarketTrendsResponse, limit: int = 5) -> str:
+    """Create concise price-trend summary"""
+    if not trends_data or not trends_data.trends:
+        return "Not available"
+
+    try:
+        parts = []
+        for trend in trends_data.trends[:limit]:
+            part = f"{trend.commodity}: ₹{trend.rolling_modal_price:g} ({trends_data.window_days}-day avg)"
+            if trend.week_over_week_change_pct is not None:
+                direction = "rising" if trend.week_over_week_change_pct > 0 else "falling"
+                part += f", {direction} {abs(trend.week_over_week_change_pct):g}% week-on-week"
+            if trend.best_mandi:
+                part += f", best mandi {trend.best_mandi} at ₹{trend.best_mandi_modal_price:g}"
+            parts.append(part)
+        return " | ".join(parts)
+    except:
+        return "Market trend processing error"
+
 def sanitize_query(query: str) -> str:
     """Sanitize user query to remove potentially harmful characters."""
     return query.replace("#", "").replace("*", "").replace("-", "")
@@ -192,13 +243,83 @@ def get_language_instruction(lang: str) -> str:
     lang_lower = lang.lower()
     return LANGUAGE_INSTRUCTIONS.get(lang_lower, f"Respond only in {lang} language.")
 
+@lru_cache(maxsize=1)
+def get_stuff_chain():
+    return create_stuff_documents_chain(get_llm(), PROMPT)
+
+def _as_documents(retrieved_docs) -> List[Document]:
+    fixed_docs = []
+    for doc in retrieved_docs:
+        if isinstance(doc, Document):
+            fixed_docs.append(doc)
+        elif isinstance(doc, str):
+            fixed_docs.append(Document(page_content=doc, metadata={"source": "retriever"}))
+        else:
+            fixed_docs.append(Document(page_content=str(doc), metadata={"source": "retriever"}))
+    return fixed_docs
+
+def _prepare_chain_input(
+    query: str,
+    lang: str,
+    pincode: str,
+    location_details: Dict[str, Any],
+    docs: List[Document],
+    weather_summary: str = "Not available",
+    market_summary: str = "Not available",
+    trends_summary: str = "Not available",
+) -> Tuple[Dict[str, Any], List[Document]]:
+    """Fits the retrieved documents into the token budget and builds the prompt variables."""
+    truncated_docs = truncate_context(docs, max_tokens=2000)
+
+    context_text = "\n".join([doc.page_content for doc in truncated_docs])
+    estimated_input_tokens = count_tokens(context_text) + count_tokens(query) + 200  
+    logger.info(f"Estimated input tokens: {estimated_input_tokens}")
+    
+    if estimated_input_tokens > 4500:  
+        logger.warning(f"Input tokens ({estimated_input_tokens}) may exceed limits")
+
+        truncated_docs = truncate_context(truncated_docs, max_tokens=1500)
+
+    chain_input = {
+        "language_instruction": get_language_instruction(lang),
+        "context": truncated_docs,
+        "query": query,
+        "pincode": pincode,
+        "district": location_details.get("district", "N/A"),
+        "state": location_details.get("state", "N/A"),
+        "lang": lang,
+        "weather": weather_summary,
+        "market": market_summary,
+        "trends": trends_summary,
+    }
+    return chain_input, truncated_docs
+
+def _format_response(result, truncated_docs: List[Document], lang: str) -> Tuple[str, float, list]:
+    if isinstance(result, dict):
+        response_text = result.get("output", result.get("text", str(result)))
+    else:
+        response_text = str(result)
+
+    confidence = 0.85 if truncated_docs else 0.3
+    sources = [doc.metadata.get("source", "unknown") for doc in truncated_docs]
+
+    logger.info(f"Generated AI response with confidence: {confidence}")
+
+    cleaned_response = clean_ai_response(response_text)
+    cleaned_response = post_process_language(cleaned_response, lang)
+    
+    logger.debug(f"Cleaned AI Response: {cleaned_response[:200]}...")
+
+    return cleaned_response, confidence, list(set(sources))
+
 async def get_ai_response(
     query: str,
     lang: str,
     pincode: str,
     location_details: Dict[str, Any],
     weather_data: WeatherResponse,
-    market_data: MarketResponse
+    market_data: MarketResponse,
+    market_trends: Optional[MarketTrendsResponse] = None,
 ):
     
     query = sanitize_query(query)
@@ -212,59 +333,21 @@ async def get_ai_response(
         except (AttributeError, NotImplementedError):
             retrieved_docs = retriever._get_relevant_documents(query)
 
-        fixed_docs = []
-        for doc in retrieved_docs:
-            if isinstance(doc, Document):
-                fixed_docs.append(doc)
-            elif isinstance(doc, str):
-                fixed_docs.append(Document(page_content=doc, metadata={"source": "retriever"}))
-            else:
-                fixed_docs.append(Document(page_content=str(doc), metadata={"source": "retriever"}))
-
-        truncated_docs = truncate_context(fixed_docs, max_tokens=2000)
-
-        weather_summary = summarize_weather_data(weather_data)
-        market_summary = summarize_market_data(market_data)
-
-        context_text = "\n".join([doc.page_content for doc in truncated_docs])
-        estimated_input_tokens = count_tokens(context_text) + count_tokens(query) + 200  
-        logger.info(f"Estimated input tokens: {estimated_input_tokens}")
-        
-        if estimated_input_tokens > 4500:  
-            logger.warning(f"Input tokens ({estimated_input_tokens}) may exceed limits")
-
-            truncated_docs = truncate_context(truncated_docs, max_tokens=1500)
-
-        language_instruction = get_language_instruction(lang)
+        chain_input, truncated_docs = _prepare_chain_input(
+            query,
+            lang,
+            pincode,
+            location_details,
+            _as_documents(retrieved_docs),
+            weather_summary=summarize_weather_data(weather_data),
+            market_summary=summarize_market_data(market_data),
+            trends_summary=summarize_market_trends(market_trends),
+        )
 
-        stuff_chain = create_stuff_documents_chain(llm, PROMPT)
+        with span("llm"):
+            result = await get_stuff_chain().ainvoke(chain_input)
 
-        result = stuff_chain.invoke({
-            "language_instruction": language_instruction,
-            "context": truncated_docs,
-            "query": query,
-            "pincode": pincode,
-            "district": location_details.get("district", "N/A"),
-            "state": location_details.get("state", "N/A"),
-            "lang": lang
-        })
-
-        if isinstance(result, dict):
-            response_text = result.get("output", result.get("text", str(result)))
-        else:
-            response_text = str(result)
-
-        confidence = 0.85 if truncated_docs else 0.3
-        sources = [doc.metadata.get("source", "unknown") for doc in truncated_docs]
-
-        logger.info(f"Generated AI response with confidence: {confidence}")
-
-        cleaned_response = clean_ai_response(response_text)
-        cleaned_response = post_process_language(cleaned_response, lang)
-        
-        logger.debug(f"Cleaned AI Response: {cleaned_response[:200]}...")
-
-        return cleaned_response, confidence, list(set(sources))
+        return _format_response(result, truncated_docs, lang)
 
     except Exception as e:
         logger.error(f"Chain execution error: {e}", exc_info=True)
@@ -272,6 +355,67 @@ async def get_ai_response(
         fallback_response = generate_fallback_response(query, location_details, lang)
         return fallback_response, 0.0, []
 
+async def get_ai_responses_batch(
+    items: List[Dict[str, Any]],
+    max_concurrency: int = BATCH_LLM_CONCURRENCY,
+) -> List[Tuple[str, float, list]]:
+    """
+    Answers many questions at once; `items` are dicts with query, lang, pincode,
+    location_details and optionally weather_data, market_data and market_trends,
+    which are summarized once per pincode. All distinct questions are embedded in
+    one call and looked up in one FAISS search, identical questions from the same
+    pincode are answered once, and at most `max_concurrency` LLM calls run at a time. Each call also
+    takes one of the worker's admission.llm_slots, shared with single questions.
+    Answers come back in the order of `items`; a failed generation gets the
+    fallback response.
+    """
+    queries = [sanitize_query(item["query"]) for item in items]
+    unique_queries = list(dict.fromkeys(queries))
+    logger.info(f"get_ai_responses_batch called with {len(items)} questions, {len(unique_queries)} distinct")
+
+    try:
+        retrieved = await asyncio.to_thread(get_retriever().get_relevant_documents_batch, unique_queries)
+    except Exception as e:
+        logger.error(f"Batch retrieval error: {e}", exc_info=True)
+        retrieved = [[] for _ in unique_queries]
+    docs_by_query = {query: _as_documents(docs) for query, docs in zip(unique_queries, retrieved)}
+
+    summaries = {}
+    for item in items:
+        if item["pincode"] not in summaries:
+            summaries[item["pincode"]] = {
+                "weather_summary": summarize_weather_data(item.get("weather_data")),
+                "market_summary": summarize_market_data(item.get("market_data")),
+                "trends_summary": summarize_market_trends(item.get("market_trends")),
+            }
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(query: str, item: Dict[str, Any]):
+        async with semaphore:
+            try:
+                chain_input, truncated_docs = _prepare_chain_input(
+                    query, item["lang"], item["pincode"], item["location_details"], docs_by_query[query],
+                    **summaries[item["pincode"]],
+                )
+                async with llm_slots:
+                    with span("llm"):
+                        result = await get_stuff_chain().ainvoke(chain_input)
+                return _format_response(result, truncated_docs, item["lang"])
+            except Exception as e:
+                logger.error(f"Chain execution error: {e}", exc_info=True)
+                return generate_fallback_response(query, item["location_details"], item["lang"]), 0.0, []
+
+    tasks = {}
+    keys = []
+    for query, item in zip(queries, items):
+        key = (query, item["lang"], item["pincode"])
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(generate(query, item))
+        keys.append(key)
+    await asyncio.gather(*tasks.values())
+    return [tasks[key].result() for key in keys]
+
 def generate_fallback_response(query: str, location_details: Dict[str, Any], lang: str) -> str:
     """Generate contextual fallback response in the target language"""
     district = location_details.get('district', 'your area')
@@ -0,0 +1,79 @@
+import argparse
+import logging
+import os
+
+from .embeddings import MODEL_FILE, MODEL_NAME, ONNX_MODEL_DIR, QUANTIZED_MODEL_FILE, TOKENIZER_FILE
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 17
+
+
+def export_model(model_name: str, output_dir: str):
+    """
+    Exports the transformer of a sentence-transformers model to `output_dir` as
+    model.onnx (token embeddings, dynamic batch and sequence axes) plus its
+    tokenizer.json. Needs torch and transformers, which only the build does.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["An example sentence to trace the model with."], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+        )
+    logger.info(f"Exported {model_name} to {output_dir}")
+
+
+def quantize_model(output_dir: str):
+    """
+    Writes model.int8.onnx next to model.onnx: MatMul weights quantized to int8,
+    activations quantized dynamically at run time. The embedding tables are left
+    in float, which keeps the drift from the full-precision model small.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+    # Shape inference and graph cleanup first, so the quantizer sees every MatMul.
+    prepared_path = os.path.join(output_dir, "model.prepared.onnx")
+    quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+    try:
+        quantize_dynamic(prepared_path, quantized_path, op_types_to_quantize=["MatMul"], weight_type=QuantType.QInt8)
+    finally:
+        os.remove(prepared_path)
+    logger.info(
+        f"Quantized {model_path}: {os.path.getsize(model_path) / 1e6:.1f} MB -> "
+        f"{os.path.getsize(quantized_path) / 1e6:.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX for EMBEDDING_BACKEND=onnx.")
+    parser.add_argument("--model", default=MODEL_NAME, help="Hugging Face model name or local path")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--skip-export", action="store_true", help="Only (re)quantize an existing model.onnx")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if not args.skip_export:
+        export_model(args.model, args.output)
+    quantize_model(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,46 @@
 import os
 import json
+import threading
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
 from typing import List
 from .embeddings import get_embeddings
+from .context_selection import normalize_rows, select_context
+from ..metrics import span
 import logging
 
 logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
-FAISS_INDEX_PATH = os.path.join(DATA_DIR, 'faiss_index')
+FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", os.path.join(DATA_DIR, 'faiss_index'))
+# Candidates fetched per query before near-duplicates are dropped and the rest
+# re-ranked for diversity. At k (5) duplicates are just dropped, shortening the
+# prompt; above k the freed slots are refilled from the extra candidates. 0
+# returns the plain top k.
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "5"))
+# Cosine similarity at or above which a candidate counts as a near-duplicate.
+RETRIEVAL_DEDUP_THRESHOLD = float(os.getenv("RETRIEVAL_DEDUP_THRESHOLD", "0.95"))
+# 1 ranks by relevance only; lower values favour diversity.
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7"))
 
 class SafeVectorStoreRetriever:
-    """Custom retriever that ensures all results are Document objects"""
+    """
+    Custom retriever that ensures all results are Document objects.
+
+    With `fetch_k` set, it fetches that many candidates, drops near-duplicates and
+    re-ranks the rest by maximal marginal relevance using the vectors stored in the
+    index (see context_selection.select_context) before keeping `k`. With `fetch_k`
+    None it returns the plain top `k`.
+    """
     
-    def __init__(self, vectorstore, search_kwargs=None):
+    def __init__(self, vectorstore, search_kwargs=None, fetch_k=RETRIEVAL_FETCH_K or None,
+                 dedup_threshold=RETRIEVAL_DEDUP_THRESHOLD, mmr_lambda=RETRIEVAL_MMR_LAMBDA):
         self.vectorstore = vectorstore
         self.search_kwargs = search_kwargs or {"k": 5}
+        self.fetch_k = fetch_k
+        self.dedup_threshold = dedup_threshold
+        self.mmr_lambda = mmr_lambda
     
     def get_relevant_documents(self, query: str) -> List[Document]:
         """Synchronous document retrieval with safe Document conversion"""
@@ -29,20 +53,10 @@ class SafeVectorStoreRetriever:
                 logger.warning("Vectorstore is None, returning empty results")
                 return []
                 
-            docs = self.vectorstore.similarity_search(query, **self.search_kwargs)
+            with span("retriever"):
+                docs = self._search([self.vectorstore.embeddings.embed_query(query)])[0]
             logger.info(f"Retrieved {len(docs)} documents for query: {query[:50]}...")
-
-            safe_docs = []
-            for doc in docs:
-                if isinstance(doc, Document):
-                    safe_docs.append(doc)
-                else:
-                    safe_docs.append(Document(
-                        page_content=str(doc), 
-                        metadata={"source": "retriever"}
-                    ))
-            
-            return safe_docs
+            return docs
             
         except Exception as e:
             logger.error(f"Error in document retrieval: {e}")
@@ -55,25 +69,52 @@ class SafeVectorStoreRetriever:
                 logger.warning("Vectorstore is None, returning empty results")
                 return []
             
-            docs = self.vectorstore.similarity_search(query, **self.search_kwargs)
+            with span("retriever"):
+                docs = self._search([self.vectorstore.embeddings.embed_query(query)])[0]
             logger.info(f"Retrieved {len(docs)} documents for query: {query[:50]}...")
-            
-            safe_docs = []
-            for doc in docs:
-                if isinstance(doc, Document):
-                    safe_docs.append(doc)
-                else:
-                    safe_docs.append(Document(
-                        page_content=str(doc), 
-                        metadata={"source": "retriever"}
-                    ))
-            
-            return safe_docs
+            return docs
             
         except Exception as e:
             logger.error(f"Error in async document retrieval: {e}")
             return []
     
+    def get_relevant_documents_batch(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Embeds all queries in one call and searches the index once for all of them.
+        Returns up to `k` documents per query, in the order of `queries`.
+        """
+        if self.vectorstore is None:
+            logger.warning("Vectorstore is None, returning empty results")
+            return [[] for _ in queries]
+        if not queries:
+            return []
+
+        with span("retriever.batch"):
+            results = self._search(self.vectorstore.embeddings.embed_documents(queries))
+        logger.info(f"Retrieved documents for {len(queries)} queries in one search")
+        return results
+
+    def _search(self, vectors) -> List[List[Document]]:
+        """Searches the index for each query vector and returns its documents."""
+        k = self.search_kwargs.get("k", 4)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.fetch_k or getattr(self.vectorstore, "_normalize_L2", False):
+            vectors = normalize_rows(vectors)
+        _, indices = self.vectorstore.index.search(vectors, max(k, self.fetch_k or k))
+
+        results = []
+        for vector, row in zip(vectors, indices):
+            ids = [int(i) for i in row if i != -1]
+            if self.fetch_k and ids:
+                stored = normalize_rows(self.vectorstore.index.reconstruct_batch(ids))
+                ids = [ids[j] for j in select_context(vector, stored, k, self.dedup_threshold, self.mmr_lambda)]
+            results.append([self._document(i) for i in ids[:k]])
+        return results
+
+    def _document(self, i: int) -> Document:
+        doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i])
+        return doc if isinstance(doc, Document) else Document(page_content=str(doc), metadata={"source": "retriever"})
+
     async def ainvoke(self, query: str) -> List[Document]:
         """LangChain-style async invoke method"""
         return await self._aget_relevant_documents(query)
@@ -120,8 +161,27 @@ def load_knowledge_base():
         logger.error(f"Error loading knowledge base: {e}")
         return documents
 
+_retriever = None
+_retriever_lock = threading.Lock()
+
 def get_retriever():
-    """Get the vector store retriever with safe Document handling"""
+    """
+    Get the vector store retriever with safe Document handling. The embedding model
+    and FAISS index are loaded once per process and shared by all requests.
+    """
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                retriever = _build_retriever()
+                # A failed load is not kept, so the next request tries again.
+                if retriever.vectorstore is not None:
+                    _retriever = retriever
+                return retriever
+    return _retriever
+
+def _build_retriever():
+    """Load (or build) the FAISS index and wrap it in a retriever"""
     try:
         embeddings = get_embeddings()
 
@@ -0,0 +1,115 @@
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MODULE = f"{__package__}.llama_pipeline"
+# After a failed load, the next attempt waits this long, doubling per failure up to the maximum.
+AI_RETRY_SECONDS = float(os.getenv("AI_RETRY_SECONDS", "10"))
+AI_RETRY_MAX_SECONDS = float(os.getenv("AI_RETRY_MAX_SECONDS", "300"))
+
+
+class AIUnavailable(RuntimeError):
+    """The pipeline failed to load and is not due to be retried for `retry_after` seconds."""
+
+    def __init__(self, error: Optional[str], retry_after: float):
+        super().__init__(f"AI pipeline unavailable: {error}")
+        self.retry_after = retry_after
+
+
+class AIRuntime:
+    """
+    Loads the AI pipeline — LangChain, the Groq client, tiktoken, the embedding
+    model and the FAISS index — outside of module import, so the app starts
+    serving (and answers liveness probes) before any of it is loaded.
+
+    `start_warmup()` loads everything on a worker thread after startup; a query
+    that arrives first loads it on demand instead. A failed load is retried by the
+    next query only after a cooldown that doubles with each failure; until then
+    queries fail fast with AIUnavailable. `status()` reports progress for the
+    readiness probe.
+    """
+
+    def __init__(self):
+        self.state = "idle"  # idle, loading, ready or failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.failures = 0
+        self.retry_at = 0.0
+        self._warm_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, warm_model: bool = True):
+        """
+        Imports the pipeline and loads its model and index; blocking and idempotent.
+        The embedding model is created lazily in each process, so it is loaded here
+        by embedding a probe, unless `warm_model` is False (the gunicorn master,
+        which must not start torch or ONNX Runtime threads before forking).
+        """
+        with self._lock:
+            if self.state == "failed" and time.monotonic() < self.retry_at:
+                return
+            if self.state == "ready" and (not warm_model or self._warm_pid == os.getpid()):
+                return
+            self.state = "loading"
+            started = time.perf_counter()
+            try:
+                pipeline = importlib.import_module(PIPELINE_MODULE)
+                pipeline.get_llm()
+                pipeline.get_token_encoding()
+                vectorstore = pipeline.get_retriever().vectorstore
+                if vectorstore is None:
+                    raise RuntimeError("Knowledge base index could not be loaded")
+                if warm_model:
+                    vectorstore.embeddings.embed_query("warm up")
+                    self._warm_pid = os.getpid()
+            except Exception as e:
+                self.state, self.error = "failed", str(e)
+                cooldown = min(AI_RETRY_MAX_SECONDS, AI_RETRY_SECONDS * 2 ** self.failures)
+                self.failures += 1
+                self.retry_at = time.monotonic() + cooldown
+                logger.error(f"AI warmup failed after {time.perf_counter() - started:.1f}s, retrying in {cooldown:.0f}s: {e}")
+                return
+            self.state, self.error, self.failures = "ready", None, 0
+            self.load_seconds = time.perf_counter() - started
+            logger.info(f"AI pipeline ready in {self.load_seconds:.1f}s")
+
+    def start_warmup(self):
+        if self._task is None:
+            self._task = asyncio.create_task(asyncio.to_thread(self.load))
+
+    async def get_pipeline(self):
+        """
+        Returns the llama_pipeline module, loading it off the event loop if needed.
+        Raises AIUnavailable if it failed to load and the retry cooldown is not over.
+        """
+        if self.state == "failed" and time.monotonic() < self.retry_at:
+            raise AIUnavailable(self.error, self.retry_at - time.monotonic())
+        if self.state != "ready":
+            await asyncio.to_thread(self.load)
+            if self.state != "ready":
+                raise AIUnavailable(self.error, max(0.0, self.retry_at - time.monotonic()))
+        return importlib.import_module(PIPELINE_MODULE)
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def status(self) -> Dict[str, Any]:
+        status = {"ai": self.state}
+        if self.error:
+            status["error"] = self.error
+        if self.state == "failed":
+            status["retry_in_seconds"] = round(max(0.0, self.retry_at - time.monotonic()), 1)
+        if self.load_seconds is not None:
+            status["load_seconds"] = round(self.load_seconds, 2)
+        return status
+
+
+ai_runtime = AIRuntime()
@@ -0,0 +1,254 @@
+import gzip
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .admission import LLM_ROUTES, LLMSlots, admission_rejections, retry_after_header, route_cost
+from .http_cache import brotli, choose_encoding
+
+# Media types worth compressing; images, archives and the like already are.
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+# Compressible types that are streamed to the client event by event; compressing
+# would buffer the events in the encoder.
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+# Brotli window (log2 bytes) for streamed bodies, whose size is not known up front.
+STREAM_BROTLI_WINDOW = 18
+
+
+class SecurityHeadersMiddleware:
+    """
+    Pure ASGI middleware that adds fixed headers (e.g. Content-Security-Policy) to
+    every HTTP response. The headers are encoded once, up front, and replace any
+    header of the same name set by the application.
+    """
+
+    def __init__(self, app: ASGIApp, headers: Dict[str, str]):
+        self.app = app
+        self.raw_headers: List[Tuple[bytes, bytes]] = [
+            (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()
+        ]
+        self.names = {name for name, _ in self.raw_headers}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = [header for header in message.get("headers", []) if header[0].lower() not in self.names]
+                message["headers"] = headers + self.raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality, lgwin=STREAM_BROTLI_WINDOW)
+            self.compress, self.flush = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self.compress, self.flush = self._compressor.compress, self._compressor.flush
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware that compresses responses with brotli or gzip, whichever
+    the client prefers (see http_cache.choose_encoding).
+
+    Responses are left alone when they are smaller than `minimum_size`, already
+    encoded (e.g. precompressed payloads and static files), not of a compressible
+    media type, or server-sent events. A compressed response's strong ETag is
+    weakened. A body sent in one message is compressed in one call and gets an
+    exact Content-Length; a streamed body is compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers or self.start["status"] in (204, 206, 304):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSED_TYPES)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether compressing is worthwhile.
+            self.start = message
+            self.passthrough = not self._compressible(MutableHeaders(raw=message["headers"]))
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=list(self.start["headers"]))
+            self.start["headers"] = headers.raw
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            # The upstream ETag names the identity bytes; the compressed body is only
+            # semantically equivalent, so the tag must become weak.
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if not more_body:
+                if self.encoding == "br":
+                    # A window no larger than the body saves most of the encoder setup cost.
+                    window = max(10, min(22, len(body).bit_length()))
+                    body = brotli.compress(body, quality=self.middleware.brotli_quality, lgwin=window)
+                else:
+                    body = gzip.compress(body, compresslevel=self.middleware.gzip_level, mtime=0)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+            del headers["Content-Length"]
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            await self.send(self.start)
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware that turns requests away with a fast 429 and Retry-After
+    before they reach the application:
+
+    - each client has a token bucket, in `key_store` for a known X-API-Key and in
+      `store` by IP otherwise (see admission.py), and every request takes its
+      route's cost from it; the bucket is left in the request state for
+      admission.charge, which takes body-dependent costs later;
+    - the single-question LLM route takes one of `llm_slots`, shared with the
+      batch route's LLM calls, and is rejected when none is free.
+
+    Free routes (cost 0) pass straight through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store,
+        llm_slots: LLMSlots,
+        key_store=None,
+        api_keys: frozenset = frozenset(),
+        proxy_hops: int = 0,
+    ):
+        self.app = app
+        self.store = store
+        self.key_store = key_store or store
+        self.llm_slots = llm_slots
+        self.api_keys = api_keys
+        self.proxy_hops = proxy_hops
+
+    def client_bucket(self, scope: Scope):
+        """Returns the (store, key) of the client's bucket."""
+        headers = Headers(scope=scope)
+        api_key = headers.get("x-api-key")
+        if api_key in self.api_keys:
+            return self.key_store, f"key:{api_key}"
+        if self.proxy_hops:
+            # Each trusted proxy appends the address it saw, so only the rightmost
+            # `proxy_hops` entries can be trusted; the client can forge the rest.
+            forwarded = [entry.strip() for entry in ",".join(headers.getlist("x-forwarded-for")).split(",") if entry.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return self.store, f"ip:{forwarded[-self.proxy_hops]}"
+        client = scope.get("client")
+        return self.store, f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        cost = route_cost(path)
+        if cost <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        llm_route = path in LLM_ROUTES
+        if llm_route and not self.llm_slots.try_acquire():
+            admission_rejections.inc("concurrency")
+            await self.reject(send, 1.0, "Server busy, retry shortly")
+            return
+        # The slot is held while the bucket is checked, so a slow shared store can't let extra requests in.
+        try:
+            store, key = self.client_bucket(scope)
+            retry_after = await store.take(key, cost)
+            if retry_after > 0:
+                admission_rejections.inc("rate")
+                await self.reject(send, retry_after, "Too many requests")
+                return
+            scope.setdefault("state", {})["admission"] = (store, key)
+            await self.app(scope, receive, send)
+        finally:
+            if llm_route:
+                self.llm_slots.release()
+
+    async def reject(self, send: Send, retry_after: float, detail: str):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", retry_after_header(retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
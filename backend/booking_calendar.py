@@ -0,0 +1,148 @@
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Bookings cover whole days: a booking from start_date to end_date (both inclusive,
+# ISO "YYYY-MM-DD") holds the equipment for every day in between.
+#
+# Each piece of equipment has one document in the `booking_calendar` collection:
+#   {"_id": <equipment_id>, "intervals": [{"start", "end", "booking_id"}, ...]}
+# kept sorted by start. Reserving is a single conditional update on that document,
+# which MongoDB applies atomically, and reading a date range touches only that document.
+
+
+def parse_day(value: str, field: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid {field}: expected YYYY-MM-DD.")
+
+
+def parse_range(start: str, end: str, start_field: str = "start_date", end_field: str = "end_date") -> Tuple[date, date]:
+    start_day, end_day = parse_day(start, start_field), parse_day(end, end_field)
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail=f"{end_field} must not be before {start_field}.")
+    return start_day, end_day
+
+
+async def reserve(calendar, equipment_id, booking_id, start_day: date, end_day: date) -> bool:
+    """
+    Adds the interval to the equipment's calendar unless it overlaps an existing one.
+    Returns False on a conflict.
+
+    The filter only matches a calendar without an overlapping interval. When it does
+    not match, the upsert tries to insert a new calendar with the same _id instead,
+    which fails with a duplicate key error if the calendar exists; so either the
+    interval is added or nothing is written, even under concurrent bookings.
+
+    The first two bookings of a piece of equipment can both find no calendar and
+    both insert one; the loser's duplicate key error is not a conflict, so the
+    update is retried once against the calendar that now exists.
+    """
+    start, end = start_day.isoformat(), end_day.isoformat()
+    for _ in range(2):
+        try:
+            await calendar.update_one(
+                {"_id": equipment_id, "intervals": {"$not": {"$elemMatch": {"start": {"$lte": end}, "end": {"$gte": start}}}}},
+                {"$push": {"intervals": {"$each": [{"start": start, "end": end, "booking_id": booking_id}], "$sort": {"start": 1}}}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            continue
+    return False
+
+
+async def release(calendar, equipment_id, booking_id, start_day: date, end_day: date):
+    """Removes the interval added by reserve(); other intervals of the same booking id are kept."""
+    interval = {"booking_id": booking_id, "start": start_day.isoformat(), "end": end_day.isoformat()}
+    await calendar.update_one({"_id": equipment_id}, {"$pull": {"intervals": interval}})
+
+
+async def booked_intervals(calendar, equipment_id, start_day: date, end_day: date) -> Optional[List[Tuple[date, date]]]:
+    """
+    Returns the (start, end) days of the booked intervals overlapping [start_day, end_day],
+    or None if the equipment has no calendar. The intervals are filtered on the server,
+    so only the ones in range are transferred however long the calendar is.
+    """
+    start, end = start_day.isoformat(), end_day.isoformat()
+    calendars = await calendar.aggregate([
+        {"$match": {"_id": equipment_id}},
+        {"$project": {"intervals": {"$filter": {
+            "input": "$intervals",
+            "as": "interval",
+            "cond": {"$and": [{"$lte": ["$$interval.start", end]}, {"$gte": ["$$interval.end", start]}]},
+        }}}},
+    ])
+    if not calendars:
+        return None
+    return [
+        (date.fromisoformat(interval["start"]), date.fromisoformat(interval["end"]))
+        for interval in calendars[0]["intervals"]
+    ]
+
+
+def free_windows(booked: List[Tuple[date, date]], start_day: date, end_day: date) -> List[Tuple[date, date]]:
+    """Returns the gaps in [start_day, end_day] not covered by the sorted, disjoint booked intervals."""
+    windows = []
+    cursor = start_day
+    for booked_start, booked_end in booked:
+        if booked_start > cursor:
+            windows.append((cursor, min(booked_start - timedelta(days=1), end_day)))
+        cursor = max(cursor, booked_end + timedelta(days=1))
+    if cursor <= end_day:
+        windows.append((cursor, end_day))
+    return windows
+
+
+def rebuild_calendars(database) -> int:
+    """
+    Rebuilds every calendar from the bookings collection, e.g. for bookings made
+    before calendars existed. Cancelled bookings are left out, and of two
+    overlapping bookings only the earlier-created one is kept (and the other logged).
+    Returns the number of calendars written.
+    """
+    intervals = defaultdict(list)
+    for booking in database.bookings.find({"status": {"$ne": "cancelled"}}).sort("_id", 1):
+        try:
+            start_day, end_day = date.fromisoformat(booking["start_date"]), date.fromisoformat(booking["end_date"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping booking {booking['_id']} with invalid dates")
+            continue
+        # Bookings created before ids were stored as ObjectIds hold equipment_id as a string.
+        taken = intervals[ObjectId(str(booking["equipment_id"]))]
+        if any(start_day <= existing_end and end_day >= existing_start for existing_start, existing_end, _ in taken):
+            logger.warning(f"Booking {booking['_id']} overlaps an earlier booking of {booking['equipment_id']}")
+            continue
+        taken.append((start_day, end_day, booking["_id"]))
+
+    for equipment_id, taken in intervals.items():
+        database.booking_calendar.replace_one(
+            {"_id": equipment_id},
+            {"intervals": [
+                {"start": start_day.isoformat(), "end": end_day.isoformat(), "booking_id": booking_id}
+                for start_day, end_day, booking_id in sorted(taken, key=lambda interval: interval[0])
+            ]},
+            upsert=True,
+        )
+    logger.info(f"Rebuilt {len(intervals)} booking calendars")
+    return len(intervals)
+
+
+def main():
+    argparse.ArgumentParser(description="Rebuild equipment booking calendars from the bookings collection.").parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    from .db import db
+    rebuild_calendars(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,217 @@
+import asyncio
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
+from .metrics import format_histogram, register_collector
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Client-side operation timeout, applied to every operation by pymongo.
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "200"))
+
+
+def _create_client():
+    # "mongomock://" runs against an in-memory stand-in, for local development and benchmarks.
+    if MONGO_URI and MONGO_URI.startswith("mongomock://"):
+        import mongomock
+        return mongomock.MongoClient()
+    # connect=False defers connecting (and pymongo's monitor threads) to the first
+    # operation, so a gunicorn master that imports the app can fork workers safely.
+    return MongoClient(
+        MONGO_URI,
+        connect=False,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        timeoutMS=MONGO_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    )
+
+
+client = _create_client()
 db = client.agrisathi
+
+# One thread per pooled connection: more threads would only queue on the pool.
+db_executor = ThreadPoolExecutor(max_workers=MONGO_MAX_POOL_SIZE, thread_name_prefix="mongo")
+
+
+class OperationStats:
+    """Latency counters for one collection operation."""
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bucket_counts = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float, failed: bool):
+        self.count += 1
+        self.errors += int(failed)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": dict(zip([*map(str, self.BUCKETS_MS), "+Inf"], self.bucket_counts)),
+        }
+
+
+_stats: Dict[str, OperationStats] = {}
+_stats_lock = threading.Lock()
+
+
+def db_metrics() -> Dict[str, Dict[str, Any]]:
+    """Returns per-operation latency stats keyed by "<collection>.<operation>"."""
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in sorted(_stats.items())}
+
+
+def _prometheus_lines() -> List[str]:
+    with _stats_lock:
+        stats = sorted((name, list(s.bucket_counts), s.total_ms, s.errors) for name, s in _stats.items())
+    bounds = [bound / 1000 for bound in OperationStats.BUCKETS_MS]
+    lines = [
+        "# HELP agrisaathi_mongodb_operation_duration_seconds MongoDB operation latency by collection and operation.",
+        "# TYPE agrisaathi_mongodb_operation_duration_seconds histogram",
+    ]
+    for name, counts, total_ms, _ in stats:
+        lines += format_histogram("agrisaathi_mongodb_operation_duration_seconds", {"operation": name}, bounds, counts, total_ms / 1000)
+    lines += [
+        "# HELP agrisaathi_mongodb_operation_errors_total Failed MongoDB operations.",
+        "# TYPE agrisaathi_mongodb_operation_errors_total counter",
+    ]
+    lines += [f'agrisaathi_mongodb_operation_errors_total{{operation="{name}"}} {errors}' for name, _, _, errors in stats]
+    return lines
+
+
+register_collector(_prometheus_lines)
+
+
+def _record(name: str, elapsed_ms: float, failed: bool):
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = OperationStats()
+        stats.observe(elapsed_ms, failed)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(f"Slow MongoDB operation {name}: {elapsed_ms:.1f} ms")
+
+
+async def run_db(name: str, fn, *args, **kwargs):
+    """Runs a blocking pymongo call on the database thread pool and records its latency."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = await loop.run_in_executor(db_executor, partial(fn, *args, **kwargs))
+        failed = False
+        return result
+    finally:
+        _record(name, (time.perf_counter() - started) * 1000, failed)
+
+
+class AsyncCollection:
+    """
+    Awaitable wrapper around a pymongo collection. Each call runs on the bounded
+    database thread pool, so a slow query never blocks the event loop.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def _run(self, operation: str, *args, **kwargs):
+        return run_db(f"{self.name}.{operation}", getattr(self.collection, operation), *args, **kwargs)
+
+    async def find_one(self, *args, **kwargs) -> Optional[dict]:
+        return await self._run("find_one", *args, **kwargs)
+
+    async def find(
+        self,
+        filter: Optional[dict] = None,
+        projection: Optional[dict] = None,
+        sort: Optional[list] = None,
+        limit: int = 0,
+        **kwargs,
+    ) -> List[dict]:
+        """Runs a find and materializes the cursor inside the worker thread."""
+        def query():
+            cursor = self.collection.find(filter or {}, projection, **kwargs)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await run_db(f"{self.name}.find", query)
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run("insert_one", *args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return await self._run("insert_many", *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run("update_one", *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._run("update_many", *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._run("delete_one", *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs) -> int:
+        return await self._run("count_documents", *args, **kwargs)
+
+    async def aggregate(self, pipeline: list, **kwargs) -> List[dict]:
+        return await run_db(f"{self.name}.aggregate", lambda: list(self.collection.aggregate(pipeline, **kwargs)))
+
+
+class AsyncDatabase:
+    """Gives AsyncCollection access to the collections of a pymongo database."""
+
+    def __init__(self, database):
+        self.database = database
+        self._collections: Dict[str, AsyncCollection] = {}
+
+    def __getattr__(self, name: str) -> AsyncCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> AsyncCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = AsyncCollection(self.database[name])
+        return collection
+
+
+async_db = AsyncDatabase(db)
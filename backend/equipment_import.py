@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from typing import Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .models import Equipment, to_document
+
+# Separators accepted between several image URLs in one CSV cell.
+IMAGE_URL_SEPARATORS = ("|", ";", " ")
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file is neither CSV nor JSON lines."""
+    pass
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    raise ImportFormatError("Upload a .csv or .jsonl file.")
+
+
+def _split_urls(value) -> List[str]:
+    if isinstance(value, list):
+        return value
+    value = (value or "").strip()
+    for separator in IMAGE_URL_SEPARATORS:
+        if separator in value:
+            return [url.strip() for url in value.split(separator) if url.strip()]
+    return [value] if value else []
+
+
+def _csv_rows(text) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Empty cells mean "not given", so model defaults apply.
+        fields = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        if "image_urls" in fields:
+            fields["image_urls"] = _split_urls(fields["image_urls"])
+        # line_num counts the header line, so it matches the line number in the file.
+        yield reader.line_num, fields
+
+
+def _jsonl_rows(text) -> Iterator[Tuple[int, dict]]:
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(fields, dict):
+            yield line_number, ValueError("Each line must be a JSON object.")
+            continue
+        yield line_number, fields
+
+
+def iter_rows(binary_file, file_format: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yields (line number, fields) for each row of an uploaded file, reading it as a
+    stream. A row that cannot be parsed is yielded as (line number, exception).
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    rows = _csv_rows(text) if file_format == "csv" else _jsonl_rows(text)
+    yield from rows
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+
+def validate_batch(
+    rows: Iterator[Tuple[int, object]],
+    batch_size: int,
+    default_owner_id: Optional[str] = None,
+) -> Tuple[List[Tuple[int, dict]], List[Tuple[int, str]], bool]:
+    """
+    Reads up to `batch_size` rows and validates each with the Equipment model.
+    Returns (line number, document ready to insert) pairs, (line number, error)
+    pairs and whether the input is exhausted. Runs in a worker thread.
+    """
+    documents, errors = [], []
+    for _ in range(batch_size):
+        try:
+            line_number, fields = next(rows)
+        except StopIteration:
+            return documents, errors, True
+        except (UnicodeDecodeError, csv.Error) as e:
+            errors.append((0, f"Unreadable file: {e}"))
+            return documents, errors, True
+        if isinstance(fields, Exception):
+            errors.append((line_number, str(fields)))
+            continue
+        if default_owner_id and not fields.get("owner_id"):
+            fields["owner_id"] = default_owner_id
+        # Ids are assigned here, not taken from the file.
+        fields.pop("_id", None)
+        fields.pop("id", None)
+        try:
+            equipment = Equipment(**fields)
+        except ValidationError as e:
+            errors.append((line_number, _describe(e)))
+            continue
+        documents.append((line_number, to_document(equipment)))
+    return documents, errors, False
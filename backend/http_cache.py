@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available.
+    brotli = None
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into {coding: q}."""
+    encodings = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, available) -> Optional[str]:
+    """Picks the best of `available` ("br", "gzip") that the client accepts, or None for identity."""
+    accepted = accepted_encodings(accept_encoding or "")
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip"):
+        if coding not in available:
+            continue
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class PrecompressedPayload:
+    """
+    A response body serialized once, with gzip and (if available) brotli variants
+    prepared up front and a strong ETag per representation.
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json", cache_control: str = "no-cache"):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[Optional[str], bytes] = {None: body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        self.etags: Dict[Optional[str], str] = {
+            coding: f'"{digest}-{coding}"' if coding else f'"{digest}"' for coding in self.variants
+        }
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        # All variants carry the same content, so any of their tags is a match.
+        return not tags.isdisjoint(self.etags.values())
+
+    def response(self, request: Request) -> Response:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if self.not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
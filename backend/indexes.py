@@ -0,0 +1,115 @@
+import argparse
+import logging
+import sys
+from typing import Any, Dict, List, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# (collection, keys, options) for every index the app relies on.
+INDEXES: List[Tuple[str, list, Dict[str, Any]]] = [
+    # list_equipment: {"availability_status": True[, "pincode": ...]}, keyset-paginated on _id.
+    ("equipment", [("availability_status", ASCENDING), ("pincode", ASCENDING), ("_id", DESCENDING)], {"name": "availability_pincode_id"}),
+    ("equipment", [("availability_status", ASCENDING), ("_id", DESCENDING)], {"name": "availability_id"}),
+    # An owner's listings: {"owner_id": ...}
+    ("equipment", [("owner_id", ASCENDING)], {"name": "owner_id"}),
+    # get_user_bookings: {"$or": [{"renter_id": ...}, {"owner_id": ...}]};
+    # each $or branch needs its own index or the whole query falls back to a scan.
+    ("bookings", [("renter_id", ASCENDING), ("_id", DESCENDING)], {"name": "renter_id_id"}),
+    ("bookings", [("owner_id", ASCENDING), ("_id", DESCENDING)], {"name": "owner_id_id"}),
+    # Bookings of one piece of equipment, e.g. when backfilling owner_id.
+    ("bookings", [("equipment_id", ASCENDING), ("_id", DESCENDING)], {"name": "equipment_id_id"}),
+    # Shared rate-limit buckets (admission.MongoBucketStore) expire once idle long enough to be full.
+    ("rate_limits", [("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+]
+
+# (collection, name) of indexes earlier versions created that INDEXES has replaced;
+# each is a prefix of its replacement, so it only costs writes and memory.
+SUPERSEDED_INDEXES: List[Tuple[str, str]] = [
+    ("equipment", "availability_pincode"),  # -> availability_pincode_id
+    ("bookings", "renter_id"),  # -> renter_id_id
+    ("bookings", "equipment_id"),  # -> equipment_id_id
+]
+
+
+def hot_queries() -> List[Tuple[str, str, dict]]:
+    """The hot agri-share query shapes as (label, collection, filter), with sample values."""
+    sample_id = ObjectId()
+    return [
+        ("list_equipment", "equipment", {"availability_status": True}),
+        ("list_equipment by pincode", "equipment", {"availability_status": True, "pincode": "440001"}),
+        ("get_equipment", "equipment", {"_id": sample_id}),
+        ("owned equipment", "equipment", {"owner_id": sample_id}),
+        # create_booking / availability read and update one calendar by _id.
+        ("booking calendar", "booking_calendar", {"_id": sample_id}),
+        ("get_user_bookings", "bookings", {"$or": [{"renter_id": sample_id}, {"owner_id": sample_id}]}),
+    ]
+
+
+def ensure_indexes(database) -> List[str]:
+    """
+    Creates the declared indexes (create_index is a no-op for ones that already
+    exist) and drops the superseded ones that are still present.
+    """
+    created = []
+    for collection, keys, options in INDEXES:
+        name = database[collection].create_index(keys, **options)
+        created.append(f"{collection}.{name}")
+    logger.info(f"Ensured MongoDB indexes: {', '.join(created)}")
+
+    for collection, name in SUPERSEDED_INDEXES:
+        if name in database[collection].index_information():
+            database[collection].drop_index(name)
+            logger.info(f"Dropped superseded index {collection}.{name}")
+    return created
+
+
+def _stages(plan: Any):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def check_query_plans(database) -> List[Tuple[str, List[str]]]:
+    """
+    Runs explain() on every hot query and returns (label, stages) for the ones whose
+    winning plan contains a COLLSCAN.
+    """
+    failures = []
+    for label, collection, query in hot_queries():
+        explain = database[collection].find(query).explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_stages(winning_plan))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        logger.info(f"{label:<28} {status:<8} {' <- '.join(stages)}")
+        if status != "ok":
+            failures.append((label, stages))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create agri-share indexes and verify the hot queries use them.")
+    parser.add_argument("--no-create", action="store_true", help="Only check the query plans")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    from .db import db
+    if not args.no_create:
+        ensure_indexes(db)
+    failures = check_query_plans(db)
+    if failures:
+        for label, stages in failures:
+            logger.error(f"Query '{label}' uses a collection scan: {' <- '.join(stages)}")
+        sys.exit(1)
+    logger.info("All hot queries are served by indexes.")
+
+
+if __name__ == "__main__":
+    main()
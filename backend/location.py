@@ -1,7 +1,18 @@
+import os
+import threading
 import requests
+from collections import OrderedDict
 from typing import Optional, Dict, Any
+from .metrics import record_cache, span
 
-API_URL = "https://api.postalpincode.in/pincode/{pincode}"
+# Overridable so that tests and load tests can point at a local stand-in.
+POSTAL_API_BASE = os.getenv("POSTAL_API_BASE", "https://api.postalpincode.in")
+API_URL = POSTAL_API_BASE + "/pincode/{pincode}"
+# Pincodes whose district and state are kept in memory; a pincode's location doesn't change.
+LOCATION_CACHE_SIZE = int(os.getenv("LOCATION_CACHE_SIZE", "20000"))
+
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
 
 class LocationError(Exception):
     """Custom exception for location service errors."""
@@ -9,22 +20,41 @@ class LocationError(Exception):
 
 def get_location_details(pincode: str) -> Optional[Dict[str, Any]]:
     """
-    Fetches location details (district, state) for a given Indian pincode.
+    Fetches location details (district, state) for a given Indian pincode. Successful
+    lookups are cached (least recently used first out); failures are not.
     """
     if not pincode or not pincode.isdigit() or len(pincode) != 6:
         raise LocationError(f"Invalid pincode format: {pincode}")
 
+    with _cache_lock:
+        cached = _cache.get(pincode)
+        if cached is not None:
+            _cache.move_to_end(pincode)
+    record_cache("location", cached is not None)
+    if cached is not None:
+        return dict(cached)
+
+    location = _fetch_location(pincode)
+    with _cache_lock:
+        _cache[pincode] = location
+        _cache.move_to_end(pincode)
+        while len(_cache) > LOCATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(location)
+
+def _fetch_location(pincode: str) -> Dict[str, Any]:
     url = API_URL.format(pincode=pincode)
     
     try:
-        response = requests.get(
-            url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-                "Accept": "application/json",
-            },
-            timeout=5  
-        )
+        with span("upstream.location"):
+            response = requests.get(
+                url,
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+                    "Accept": "application/json",
+                },
+                timeout=5  
+            )
         response.raise_for_status()
 
         data = response.json()
@@ -1,23 +1,42 @@
 import os
 from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
 from starlette.status import HTTP_404_NOT_FOUND
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import Response
 
 from .routes import query, market, weather, schemes, agri_share, location
-from .db import client
+from .db import client, db
+from .indexes import ensure_indexes
+from .ai.runtime import ai_runtime
+from .metrics import render as render_metrics
+from .uploads import shutdown_image_executor
+from .asgi_middleware import AdmissionControlMiddleware, CompressionMiddleware, SecurityHeadersMiddleware
+from . import admission
+from .static_files import PrecompressedStaticFiles, InMemoryIndex
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Load the AI pipeline in the background right after startup; when off, the first query loads it.
+AI_WARMUP = os.getenv("AI_WARMUP", "1") != "0"
+
 app = FastAPI()
 
 static_dir = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
+frontend_index = InMemoryIndex(os.path.join(static_dir, "index.html"))
+
+# Added first so it runs inside CORS: browsers can then read the 429s.
+if admission.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        store=admission.create_bucket_store(),
+        key_store=admission.create_bucket_store(rate=admission.RATE_LIMIT_API_KEY_RATE, burst=admission.RATE_LIMIT_API_KEY_BURST),
+        llm_slots=admission.llm_slots,
+        api_keys=admission.RATE_LIMIT_API_KEYS,
+        proxy_hops=admission.RATE_LIMIT_PROXY_HOPS,
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,29 +46,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class CSPMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response: Response = await call_next(request)
-
-        csp_policy = (
-            "default-src 'self'; "
-            "script-src 'self' https://agrisaathi.onrender.com 'unsafe-inline'; "
-            "script-src-elem 'self' https://agrisaathi.onrender.com; "
-            "script-src-attr 'self' https://agrisaathi.onrender.com 'unsafe-inline'; "
-            "style-src 'self' https://agrisaathi.onrender.com 'unsafe-inline' https://fonts.googleapis.com; "
-            "img-src 'self' data: https://agrisaathi.onrender.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "connect-src 'self' https://agrisaathi.onrender.com; "
-            "frame-src 'self'; "
-            "object-src 'none'; "
-            "base-uri 'self'; "
-            "form-action 'self';"
-        )
-
-        response.headers['Content-Security-Policy'] = csp_policy
-        return response
-
-app.add_middleware(CSPMiddleware)
+CSP_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' https://agrisaathi.onrender.com 'unsafe-inline'; "
+    "script-src-elem 'self' https://agrisaathi.onrender.com; "
+    "script-src-attr 'self' https://agrisaathi.onrender.com 'unsafe-inline'; "
+    "style-src 'self' https://agrisaathi.onrender.com 'unsafe-inline' https://fonts.googleapis.com; "
+    "img-src 'self' data: https://agrisaathi.onrender.com; "
+    "font-src 'self' https://fonts.gstatic.com; "
+    "connect-src 'self' https://agrisaathi.onrender.com; "
+    "frame-src 'self'; "
+    "object-src 'none'; "
+    "base-uri 'self'; "
+    "form-action 'self';"
+)
+
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_middleware(SecurityHeadersMiddleware, headers={"Content-Security-Policy": CSP_POLICY})
 
 app.include_router(query.router, prefix="/api/query")
 app.include_router(weather.router, prefix="/api/weather")
@@ -58,15 +71,31 @@ app.include_router(schemes.router, prefix="/api/schemes")
 app.include_router(agri_share.router, prefix="/api/agri-share")
 app.include_router(location.router, prefix="/api/location")
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the AI pipeline, embedding model and index are loaded."""
+    status = ai_runtime.status()
+    return JSONResponse(status, status_code=200 if ai_runtime.ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latencies, cache hit rates and MongoDB latencies in Prometheus format (per worker process)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/{full_path:path}")
-async def serve_frontend(full_path: str):
+async def serve_frontend(full_path: str, request: Request):
     if full_path.startswith("api") or full_path.startswith("static"):
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Not found")
-    return FileResponse(os.path.join(static_dir, "index.html"))
+    return frontend_index.response(request)
 
 @app.get("/")
-async def root():
-    return FileResponse(os.path.join(static_dir, "index.html"))
+async def root(request: Request):
+    return frontend_index.response(request)
 
 @app.on_event("startup")
 def on_startup():
@@ -75,3 +104,26 @@ def on_startup():
         print("Pinged your deployment. You successfully connected to MongoDB!")
     except Exception as e:
         print(e)
+
+    try:
+        ensure_indexes(db)
+    except Exception as e:
+        print(f"Failed to create MongoDB indexes: {e}")
+
+@app.on_event("startup")
+async def start_ai_warmup():
+    if AI_WARMUP:
+        ai_runtime.start_warmup()
+
+@app.on_event("startup")
+async def start_weather_prefetch():
+    if weather.WEATHER_API_KEY:
+        weather.weather_prefetcher.start()
+
+@app.on_event("shutdown")
+async def stop_weather_prefetch():
+    await weather.weather_prefetcher.stop()
+
+@app.on_event("shutdown")
+def stop_image_executor():
+    shutdown_image_executor()
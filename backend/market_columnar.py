@@ -0,0 +1,355 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from .schemas import MarketPrice
+
+logger = logging.getLogger(__name__)
+
+# Column name variants seen in Agmarknet / data.gov.in daily price dumps.
+COLUMN_ALIASES = {
+    "state": ("state",),
+    "apmc": ("market", "apmc", "market_name"),
+    "commodity": ("commodity",),
+    "min_price": ("min_price", "min_x0020_price", "min price", "min price (rs./quintal)"),
+    "max_price": ("max_price", "max_x0020_price", "max price", "max price (rs./quintal)"),
+    "modal_price": ("modal_price", "modal_x0020_price", "modal price", "modal price (rs./quintal)"),
+    "date": ("arrival_date", "date", "price date", "reported date"),
+}
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d %b %Y")
+
+# Dictionary-encoded string columns and their code dtypes.
+STRING_COLUMNS = {"state": np.uint16, "apmc": np.uint32, "commodity": np.uint16}
+NUMERIC_COLUMNS = {
+    "min_price": np.float32,
+    "max_price": np.float32,
+    "modal_price": np.float32,
+    # Days since 1970-01-01.
+    "date": np.int32,
+}
+META_FILE = "meta.json"
+# How long a reader with nothing mapped yet waits for an ingest to finish swapping the store in.
+REOPEN_DELAY_SECONDS = 0.05
+
+
+class IngestError(Exception):
+    """Raised when a price dump cannot be mapped onto the columnar schema."""
+    pass
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, int]:
+    normalized = [name.strip().lower() for name in header]
+    positions = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[column] = normalized.index(alias)
+                break
+        else:
+            raise IngestError(f"Missing column for '{column}' in header: {header}")
+    return positions
+
+
+# A dump covers few distinct dates, so memoising saves a strptime per row.
+@lru_cache(maxsize=8192)
+def _parse_date(value: str) -> int:
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return (datetime.strptime(value, fmt).date() - date(1970, 1, 1)).days
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value}")
+
+
+def _parse_price(value: str) -> float:
+    value = value.strip().replace(",", "")
+    return float(value) if value and value.upper() != "NR" else float("nan")
+
+
+def _read_chunks(path: str, chunk_rows: int) -> Iterator[List[List[str]]]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield [header]
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _load_meta(path: str) -> Optional[dict]:
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ingest_csv(
+    csv_paths: Iterable[str],
+    out_dir: str,
+    chunk_rows: int = 50_000,
+    append: bool = False,
+) -> int:
+    """
+    Streams mandi price CSV dumps into a columnar store at `out_dir`.
+
+    Each column is written as a raw little-endian array file (`<column>.bin`) that
+    grows chunk by chunk, so memory use is bounded by `chunk_rows` regardless of the
+    input size. String columns are dictionary-encoded; their dictionaries and the
+    row count live in `meta.json`. The store is built in a sibling temporary
+    directory and moved into place at the end, so readers never see a partial store;
+    if the ingest fails, the temporary directory is removed and the store is untouched.
+
+    With `append=True`, rows are added to the existing store (e.g. a new daily dump).
+    Returns the number of rows ingested; rows that fail to parse are skipped and logged.
+    """
+    tmp_dir = out_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        ingested, skipped, total_rows = _ingest_into(csv_paths, out_dir, tmp_dir, chunk_rows, append)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = out_dir.rstrip(os.sep) + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} malformed rows")
+    logger.info(f"Columnar store at {out_dir} now holds {total_rows + ingested} rows")
+    return ingested
+
+
+def _ingest_into(csv_paths: Iterable[str], out_dir: str, tmp_dir: str, chunk_rows: int, append: bool):
+    """Writes the store into `tmp_dir`; returns (rows ingested, rows skipped, rows already in the store)."""
+    dictionaries: Dict[str, List[str]] = {column: [] for column in STRING_COLUMNS}
+    total_rows = 0
+    existing = _load_meta(out_dir) if append else None
+    if existing:
+        dictionaries = existing["dictionaries"]
+        total_rows = existing["rows"]
+        for column in list(STRING_COLUMNS) + list(NUMERIC_COLUMNS):
+            shutil.copyfile(os.path.join(out_dir, f"{column}.bin"), os.path.join(tmp_dir, f"{column}.bin"))
+    codes = {column: {value: code for code, value in enumerate(values)} for column, values in dictionaries.items()}
+
+    files = {
+        column: open(os.path.join(tmp_dir, f"{column}.bin"), "ab")
+        for column in list(STRING_COLUMNS) + list(NUMERIC_COLUMNS)
+    }
+    ingested = skipped = 0
+    try:
+        for csv_path in csv_paths:
+            positions = None
+            for chunk in _read_chunks(csv_path, chunk_rows):
+                if positions is None:
+                    positions = _resolve_columns(chunk[0])
+                    continue
+
+                columns = {column: [] for column in files}
+                for row in chunk:
+                    try:
+                        parsed = {
+                            "min_price": _parse_price(row[positions["min_price"]]),
+                            "max_price": _parse_price(row[positions["max_price"]]),
+                            "modal_price": _parse_price(row[positions["modal_price"]]),
+                            "date": _parse_date(row[positions["date"]]),
+                        }
+                        for column in STRING_COLUMNS:
+                            value = row[positions[column]].strip()
+                            column_codes = codes[column]
+                            code = column_codes.get(value)
+                            if code is None:
+                                code = len(dictionaries[column])
+                                if code > np.iinfo(STRING_COLUMNS[column]).max:
+                                    raise IngestError(
+                                        f"Too many distinct values for '{column}' to fit in "
+                                        f"{np.dtype(STRING_COLUMNS[column]).name}"
+                                    )
+                                column_codes[value] = code
+                                dictionaries[column].append(value)
+                            parsed[column] = code
+                    except (IndexError, ValueError):
+                        skipped += 1
+                        continue
+                    for column, value in parsed.items():
+                        columns[column].append(value)
+
+                dtypes = {**STRING_COLUMNS, **NUMERIC_COLUMNS}
+                for column, values in columns.items():
+                    np.asarray(values, dtype=np.dtype(dtypes[column]).newbyteorder("<")).tofile(files[column])
+                ingested += len(columns["date"])
+                logger.info(f"Ingested {ingested} rows so far from {csv_path}")
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"rows": total_rows + ingested, "dictionaries": dictionaries}, f, ensure_ascii=False)
+    return ingested, skipped, total_rows
+
+
+class ColumnarMarketStore:
+    """
+    Read-only, memory-mapped view of a columnar price store written by `ingest_csv`.
+
+    Columns are opened with `np.memmap`, so only the pages touched by a query are
+    resident and several workers share them through the OS page cache. The store is
+    reopened when `meta.json` changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._version = None
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.columns: Dict[str, np.ndarray] = {}
+        self.dictionaries: Dict[str, List[str]] = {}
+        self._codes: Dict[str, Dict[str, int]] = {}
+
+    def available(self) -> bool:
+        return os.path.exists(os.path.join(self.path, META_FILE))
+
+    def _open(self):
+        """
+        Maps the current version of the store. ingest_csv swaps the store directory
+        with two renames, so the store can briefly be missing: a reader then keeps
+        the mapping it has (its files stay readable after they are unlinked), or,
+        without one, retries once.
+        """
+        try:
+            self._map()
+        except FileNotFoundError as e:
+            if self._version is not None:
+                logger.warning(f"Columnar market store at {self.path} is being replaced, keeping the current version: {e}")
+                return
+            time.sleep(REOPEN_DELAY_SECONDS)
+            self._map()
+
+    def _map(self):
+        stat = os.stat(os.path.join(self.path, META_FILE))
+        version = (stat.st_mtime_ns, stat.st_ino)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            meta = _load_meta(self.path)
+            rows = meta["rows"]
+            columns = {}
+            for column, dtype in {**STRING_COLUMNS, **NUMERIC_COLUMNS}.items():
+                dtype = np.dtype(dtype).newbyteorder("<")
+                if rows:
+                    columns[column] = np.memmap(os.path.join(self.path, f"{column}.bin"), dtype=dtype, mode="r", shape=(rows,))
+                else:
+                    columns[column] = np.empty(0, dtype=dtype)
+            self.rows, self.columns = rows, columns
+            self.dictionaries = meta["dictionaries"]
+            self._codes = {
+                column: {value.casefold(): code for code, value in enumerate(values)}
+                for column, values in self.dictionaries.items()
+            }
+            self._version = version
+            logger.info(f"Opened columnar market store at {self.path} with {rows} rows")
+
+    def select(
+        self,
+        state: Optional[str] = None,
+        apmc: Optional[str] = None,
+        commodity: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Returns the row positions matching every given filter (case-insensitive).
+        The most selective filter (APMC) is applied first over the full column and
+        the rest only over the surviving positions.
+        """
+        self._open()
+        positions = None
+        for column, value in (("apmc", apmc), ("commodity", commodity), ("state", state)):
+            if not value:
+                continue
+            code = self._codes[column].get(value.casefold())
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            if positions is None:
+                positions = np.flatnonzero(self.columns[column] == code)
+            else:
+                positions = positions[self.columns[column][positions] == code]
+        if positions is None:
+            positions = np.arange(self.rows)
+        return positions
+
+    def latest_prices(
+        self,
+        state: Optional[str] = None,
+        apmc: Optional[str] = None,
+        commodity: Optional[str] = None,
+        unit: str = "Quintal",
+    ) -> List[MarketPrice]:
+        """Returns the rows matching the filters on the most recent date they cover."""
+        positions = self.select(state, apmc, commodity)
+        if not len(positions):
+            return []
+        dates = self.columns["date"][positions]
+        positions = positions[dates == dates.max()]
+        return self.to_market_prices(positions, unit)
+
+    def to_market_prices(self, positions: np.ndarray, unit: str = "Quintal") -> List[MarketPrice]:
+        columns, dictionaries = self.columns, self.dictionaries
+        states = columns["state"][positions]
+        apmcs = columns["apmc"][positions]
+        commodities = columns["commodity"][positions]
+        min_prices = columns["min_price"][positions]
+        max_prices = columns["max_price"][positions]
+        modal_prices = columns["modal_price"][positions]
+        dates = (columns["date"][positions].astype("datetime64[D]")).astype(str)
+        return [
+            MarketPrice(
+                state=dictionaries["state"][states[i]],
+                apmc=dictionaries["apmc"][apmcs[i]],
+                commodity=dictionaries["commodity"][commodities[i]],
+                min_price=float(min_prices[i]),
+                max_price=float(max_prices[i]),
+                modal_price=float(modal_prices[i]),
+                unit=unit,
+                date=str(dates[i]),
+            )
+            for i in range(len(positions))
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest mandi price CSV dumps into a columnar store.")
+    parser.add_argument("out_dir", help="Directory of the columnar store")
+    parser.add_argument("csv_paths", nargs="+", help="CSV files to ingest")
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--append", action="store_true", help="Add rows to an existing store")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    ingest_csv(args.csv_paths, args.out_dir, chunk_rows=args.chunk_rows, append=args.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .schemas import MarketPrice
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    """An immutable view of one version of the price file and its indexes."""
+
+    def __init__(self, prices: List[MarketPrice], version: Optional[tuple], stateless: Tuple[int, ...] = ()):
+        self.prices = prices
+        self.version = version
+        # Legacy rows, whose location may be a city rather than a state; they match any state.
+        self.stateless = stateless
+        self.by_state = self._index(prices, "state")
+        self.by_apmc = self._index(prices, "apmc")
+        self.by_commodity = self._index(prices, "commodity")
+        # State + commodity is the most common combined filter, so it gets its own index.
+        by_state_commodity: Dict[Tuple[str, str], List[int]] = {}
+        for position, price in enumerate(prices):
+            key = (price.state.casefold(), price.commodity.casefold())
+            by_state_commodity.setdefault(key, []).append(position)
+        self.by_state_commodity = {key: tuple(positions) for key, positions in by_state_commodity.items()}
+
+    @staticmethod
+    def _index(prices: List[MarketPrice], field: str) -> Dict[str, Tuple[int, ...]]:
+        index: Dict[str, List[int]] = {}
+        for position, price in enumerate(prices):
+            index.setdefault(getattr(price, field).casefold(), []).append(position)
+        return {key: tuple(positions) for key, positions in index.items()}
+
+
+def _to_market_price(item: dict) -> MarketPrice:
+    """Builds a MarketPrice from a full-schema row or a legacy {crop, location, price} row."""
+    if "commodity" in item:
+        return MarketPrice(
+            state=item.get("state", "N/A"),
+            apmc=item.get("apmc", "N/A"),
+            commodity=item["commodity"],
+            min_price=item.get("min_price", item.get("modal_price", 0.0)),
+            max_price=item.get("max_price", item.get("modal_price", 0.0)),
+            modal_price=item.get("modal_price", 0.0),
+            unit=item.get("unit", "Quintal"),
+            date=item.get("date", "N/A"),
+        )
+    # The location may be a city or a state, so it is kept as the APMC only; the
+    # row is found for any state through _Snapshot.stateless.
+    return MarketPrice(
+        state="N/A",
+        apmc=item.get("location", "N/A"),
+        commodity=item.get("crop", "N/A"),
+        min_price=item.get("price", 0.0),
+        modal_price=item.get("price", 0.0),
+        max_price=item.get("price", 0.0),
+        unit="Quintal",
+        date="N/A",
+    )
+
+
+class MarketPriceStore:
+    """
+    In-memory market price table loaded once from a JSON file and indexed by
+    state, APMC and commodity.
+
+    The file's mtime and size are checked at most every `check_interval` seconds; when it
+    changes, a new snapshot is built off to the side and swapped in with a single
+    assignment, so readers always see either the old or the new data in full.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = _Snapshot([], None)
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, version: tuple) -> _Snapshot:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        prices = [_to_market_price(item) for item in data]
+        stateless = tuple(position for position, item in enumerate(data) if "commodity" not in item)
+        logger.info(f"Loaded {len(prices)} market price records from {self.path} ({len(stateless)} without a state)")
+        return _Snapshot(prices, version, stateless)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval and self._snapshot.version is not None:
+            return
+        with self._lock:
+            if now - self._last_check < self.check_interval and self._snapshot.version is not None:
+                return
+            self._last_check = now
+            try:
+                stat = os.stat(self.path)
+                version = (stat.st_mtime_ns, stat.st_size)
+                if version != self._snapshot.version:
+                    self._snapshot = self._load(version)
+            except (OSError, json.JSONDecodeError, ValueError) as e:
+                # Keep serving the last good snapshot if the file is missing or mid-write.
+                logger.error(f"Could not read or parse market data file at {self.path}: {e}")
+
+    def snapshot(self) -> _Snapshot:
+        self._refresh()
+        return self._snapshot
+
+    def find(
+        self,
+        state: Optional[str] = None,
+        apmc: Optional[str] = None,
+        commodity: Optional[str] = None,
+    ) -> List[MarketPrice]:
+        """
+        Returns the prices matching every given filter (case-insensitive). Legacy
+        {crop, location, price} rows carry no state and are returned for every state.
+        """
+        snapshot = self.snapshot()
+        candidates = []
+        if state and snapshot.stateless:
+            matching = set(snapshot.by_state.get(state.casefold(), ())) | set(snapshot.stateless)
+            candidates.append(tuple(sorted(matching)))
+            state = None
+        if state and commodity:
+            candidates.append(snapshot.by_state_commodity.get((state.casefold(), commodity.casefold()), ()))
+            state = commodity = None
+        for index, value in (
+            (snapshot.by_state, state),
+            (snapshot.by_apmc, apmc),
+            (snapshot.by_commodity, commodity),
+        ):
+            if value:
+                candidates.append(index.get(value.casefold(), ()))
+
+        if not candidates:
+            return list(snapshot.prices)
+
+        # Walk the smallest posting list and check the others by set membership.
+        candidates.sort(key=len)
+        smallest, rest = candidates[0], [set(positions) for positions in candidates[1:]]
+        return [
+            snapshot.prices[position]
+            for position in smallest
+            if all(position in positions for positions in rest)
+        ]
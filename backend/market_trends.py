@@ -0,0 +1,173 @@
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .market_columnar import ColumnarMarketStore
+from .schemas import CommodityTrend
+
+logger = logging.getLogger(__name__)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+
+
+def _window_means(
+    sums: Sequence[np.ndarray],
+    counts: np.ndarray,
+    end_index: np.ndarray,
+    length: int,
+) -> List[np.ndarray]:
+    """
+    For each commodity row of the (commodity, day) grids, averages the daily mandi
+    means over the `length` days ending at `end_index`. Only the cells inside the
+    windows are gathered, so the cost does not depend on the history length.
+    """
+    days = end_index[:, None] - np.arange(length)[None, :]
+    rows = np.broadcast_to(np.arange(len(end_index))[:, None], days.shape)
+    valid = days >= 0
+    days = np.where(valid, days, 0)
+    cell_counts = np.where(valid, counts[rows, days], 0.0)
+    present = cell_counts > 0
+    n_days = present.sum(axis=1)
+    means = []
+    for grid in sums:
+        daily = np.divide(grid[rows, days], cell_counts, out=np.zeros(days.shape), where=present)
+        means.append(_safe_divide(daily.sum(axis=1), n_days))
+    return means
+
+
+def _rolling_means(sums: Sequence[np.ndarray], counts: np.ndarray, window: int) -> List[np.ndarray]:
+    """Trailing `window`-day rolling average of the daily mandi means over the whole grid."""
+
+    def rolling_sum(values):
+        totals = np.cumsum(values, axis=1)
+        totals[:, window:] = totals[:, window:] - totals[:, :-window]
+        return totals
+
+    present = counts > 0
+    n_days = rolling_sum(present.astype(np.float64))
+    return [
+        _safe_divide(rolling_sum(np.divide(grid, counts, out=np.zeros(grid.shape), where=present)), n_days)
+        for grid in sums
+    ]
+
+
+def compute_trends(
+    store: ColumnarMarketStore,
+    state: str,
+    commodity: Optional[str] = None,
+    window: int = 7,
+    history_days: int = 365,
+    include_series: bool = False,
+    unit: str = "Quintal",
+) -> List[CommodityTrend]:
+    """
+    Computes per-commodity price trends for the mandis of a state.
+
+    Prices are averaged across mandis per day, then smoothed with a trailing
+    `window`-day rolling average of the min, max and modal prices. The
+    week-over-week change compares the average modal price of the last 7 days
+    with the 7 days before. The best mandi is the one in the state with the
+    highest average modal price over the last `window` days.
+
+    Everything is computed with array operations over the memory-mapped columns:
+    rows are bucketed into a (commodity, day) grid with `np.bincount`, so the cost
+    is linear in the matching rows, with no per-row Python work.
+    """
+    positions = store.select(state=state, commodity=commodity)
+    if not len(positions):
+        return []
+
+    columns = store.columns
+    dates = columns["date"][positions]
+    end = int(dates.max())
+    start = end - history_days + 1
+    recent = dates >= start
+    positions, dates = positions[recent], dates[recent]
+
+    min_prices = columns["min_price"][positions].astype(np.float64)
+    max_prices = columns["max_price"][positions].astype(np.float64)
+    modal_prices = columns["modal_price"][positions].astype(np.float64)
+    # Rows with missing ("NR") prices would poison the sums.
+    valid = ~(np.isnan(min_prices) | np.isnan(max_prices) | np.isnan(modal_prices))
+    positions, dates = positions[valid], dates[valid]
+    min_prices, max_prices, modal_prices = min_prices[valid], max_prices[valid], modal_prices[valid]
+    if not len(positions):
+        return []
+
+    commodity_codes, commodity_index = np.unique(columns["commodity"][positions], return_inverse=True)
+    apmc_codes, apmc_index = np.unique(columns["apmc"][positions], return_inverse=True)
+    n_commodities, n_apmcs = len(commodity_codes), len(apmc_codes)
+    day_index = dates - start
+
+    # (commodity, day) grid of mandi counts and price sums.
+    cell = commodity_index * history_days + day_index
+    size = n_commodities * history_days
+    grid_shape = (n_commodities, history_days)
+    counts = np.bincount(cell, minlength=size).reshape(grid_shape).astype(np.float64)
+    min_sums = np.bincount(cell, weights=min_prices, minlength=size).reshape(grid_shape)
+    max_sums = np.bincount(cell, weights=max_prices, minlength=size).reshape(grid_shape)
+    modal_sums = np.bincount(cell, weights=modal_prices, minlength=size).reshape(grid_shape)
+
+    has_data = counts > 0
+    rows = np.arange(n_commodities)
+
+    # Latest day with data per commodity.
+    latest_index = history_days - 1 - np.argmax(has_data[:, ::-1], axis=1)
+    latest_modal = modal_sums[rows, latest_index] / counts[rows, latest_index]
+    rolling_min, rolling_max, rolling_modal = _window_means(
+        (min_sums, max_sums, modal_sums), counts, latest_index, window
+    )
+
+    # Week-over-week change of the 7-day average modal price, ending at the last day.
+    last_day = np.full(n_commodities, history_days - 1)
+    (this_week,) = _window_means((modal_sums,), counts, last_day, 7)
+    (last_week,) = _window_means((modal_sums,), counts, last_day - 7, 7)
+    change_pct = _safe_divide((this_week - last_week) * 100.0, np.nan_to_num(last_week))
+
+    # Best mandi by average modal price over the last `window` days.
+    in_window = day_index > history_days - 1 - window
+    pair = commodity_index[in_window] * n_apmcs + apmc_index[in_window]
+    pair_counts = np.bincount(pair, minlength=n_commodities * n_apmcs).reshape(n_commodities, n_apmcs)
+    pair_sums = np.bincount(pair, weights=modal_prices[in_window], minlength=n_commodities * n_apmcs).reshape(n_commodities, n_apmcs)
+    pair_means = np.where(pair_counts > 0, pair_sums / np.maximum(pair_counts, 1), -np.inf)
+    best_apmc = np.argmax(pair_means, axis=1)
+    best_price = pair_means[rows, best_apmc]
+
+    series_min = series_max = series_modal = None
+    if include_series:
+        series_min, series_max, series_modal = _rolling_means((min_sums, max_sums, modal_sums), counts, window)
+
+    dictionaries = store.dictionaries
+    day_labels = np.arange(start, end + 1).astype("datetime64[D]").astype(str)
+    trends = []
+    for i in range(n_commodities):
+        series = None
+        if include_series:
+            days_with_data = np.flatnonzero(has_data[i])
+            series = [
+                {
+                    "date": str(day_labels[d]),
+                    "min_price": round(float(series_min[i, d]), 2),
+                    "max_price": round(float(series_max[i, d]), 2),
+                    "modal_price": round(float(series_modal[i, d]), 2),
+                }
+                for d in days_with_data
+            ]
+        has_best = np.isfinite(best_price[i])
+        trends.append(CommodityTrend(
+            commodity=dictionaries["commodity"][commodity_codes[i]],
+            unit=unit,
+            latest_date=str(day_labels[latest_index[i]]),
+            latest_modal_price=round(float(latest_modal[i]), 2),
+            rolling_min_price=round(float(rolling_min[i]), 2),
+            rolling_max_price=round(float(rolling_max[i]), 2),
+            rolling_modal_price=round(float(rolling_modal[i]), 2),
+            week_over_week_change_pct=round(float(change_pct[i]), 2) if np.isfinite(change_pct[i]) else None,
+            best_mandi=dictionaries["apmc"][apmc_codes[best_apmc[i]]] if has_best else None,
+            best_mandi_modal_price=round(float(best_price[i]), 2) if has_best else None,
+            series=series,
+        ))
+    return trends
@@ -0,0 +1,180 @@
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prometheus' default latency buckets, in seconds, extended to cover slow LLM calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def format_histogram(
+    name: str, labels: Dict[str, str], bounds: Sequence[float], counts: Sequence[int], total: float
+) -> List[str]:
+    """
+    Prometheus text lines for one histogram series: `counts` holds the
+    (non-cumulative) observations per bucket, with the +Inf bucket last.
+    """
+    label_text = "".join(f'{key}="{_escape(value)}",' for key, value in labels.items())
+    lines, cumulative = [], 0
+    for bound, count in zip([*map(repr, map(float, bounds)), "+Inf"], counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{label_text}le="{bound}"}} {cumulative}')
+    suffix = _format_labels(list(labels), list(labels.values()))
+    lines.append(f"{name}_sum{suffix} {total}")
+    lines.append(f"{name}_count{suffix} {cumulative}")
+    return lines
+
+
+class Counter:
+    """A Prometheus counter with optional labels."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """A Prometheus histogram with optional labels; `observe` costs one bisect and a lock."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            lines += format_histogram(self.name, dict(zip(self.labels, key)), self.buckets, counts, total)
+        return lines
+
+
+_registry: List = []
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def register_collector(collect: Callable[[], List[str]]):
+    """Adds a function returning Prometheus text lines for stats kept elsewhere (e.g. db_metrics)."""
+    _collectors.append(collect)
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    for collect in _collectors:
+        lines += collect()
+    return "\n".join(lines) + "\n"
+
+
+stage_duration = Histogram(
+    "agrisaathi_stage_duration_seconds",
+    "Duration of traced stages: query steps, retrieval, LLM and upstream HTTP calls.",
+    labels=("stage", "outcome"),
+)
+cache_requests = Counter(
+    "agrisaathi_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    labels=("cache", "result"),
+)
+
+# The spans of the request being traced, if any: (stage, seconds, outcome).
+_current_trace: contextvars.ContextVar[Optional[List[Tuple[str, float, str]]]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times the enclosed block into `agrisaathi_stage_duration_seconds{stage=...}`,
+    with outcome "error" if it raises, and adds it to the current trace.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_duration.observe(elapsed, stage, outcome)
+        spans = _current_trace.get()
+        if spans is not None:
+            spans.append((stage, elapsed, outcome))
+
+
+@contextmanager
+def trace(name: str, **fields):
+    """
+    Collects the spans opened inside the block (including in threads started with
+    asyncio.to_thread, which copy the context) and logs them as one structured line:
+    `trace=query total_ms=... location_ms=... weather_ms=...`.
+    """
+    spans: List[Tuple[str, float, str]] = []
+    token = _current_trace.set(spans)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_trace.reset(token)
+        stage_duration.observe(elapsed, name, outcome)
+        parts = [f"trace={name}", f"outcome={outcome}", f"total_ms={elapsed * 1000:.1f}"]
+        parts += [f"{key}={value}" for key, value in fields.items()]
+        parts += [
+            f"{stage}_ms={elapsed * 1000:.1f}" + ("" if outcome == "ok" else f" {stage}={outcome}")
+            for stage, elapsed, outcome in spans
+        ]
+        logger.info(" ".join(parts))
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache, "hit" if hit else "miss")
@@ -0,0 +1,101 @@
+import argparse
+import logging
+from typing import Dict
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Id fields that older versions stored as strings, because model_dump serializes
+# PyObjectId values to str.
+ID_FIELDS = {"equipment": ("owner_id",), "bookings": ("equipment_id", "renter_id", "owner_id")}
+
+
+def _as_object_id(value):
+    try:
+        return ObjectId(str(value))
+    except (InvalidId, TypeError):
+        return None
+
+
+def normalize_ids(database) -> Dict[str, int]:
+    """Converts id fields stored as strings to ObjectIds. Returns updated counts per collection."""
+    updated = {}
+    for collection, fields in ID_FIELDS.items():
+        updated[collection] = 0
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        requests = []
+        for doc in database[collection].find(query, {field: 1 for field in fields}):
+            changes = {
+                field: _as_object_id(doc[field])
+                for field in fields
+                if isinstance(doc.get(field), str) and _as_object_id(doc[field]) is not None
+            }
+            if changes:
+                requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if len(requests) >= BATCH_SIZE:
+                updated[collection] += database[collection].bulk_write(requests, ordered=False).modified_count
+                requests = []
+        if requests:
+            updated[collection] += database[collection].bulk_write(requests, ordered=False).modified_count
+        logger.info(f"Normalized ids on {updated[collection]} {collection} documents")
+    return updated
+
+
+def backfill_booking_owners(database) -> int:
+    """
+    Sets owner_id on bookings created before bookings carried it, from the owner
+    of the booked equipment. Looks owners up one batch of equipment at a time.
+    Bookings without a valid equipment_id, or whose equipment is gone or has no
+    owner, are skipped and counted. Returns the number of bookings updated.
+    """
+    updated = skipped = 0
+    missing = database.bookings.find({"owner_id": {"$exists": False}}, {"equipment_id": 1})
+    batch = []
+
+    def flush(batch):
+        equipment_ids = {_as_object_id(doc.get("equipment_id")) for doc in batch} - {None}
+        owners = {
+            equipment["_id"]: owner_id
+            for equipment in database.equipment.find({"_id": {"$in": list(equipment_ids)}}, {"owner_id": 1})
+            if (owner_id := _as_object_id(equipment.get("owner_id"))) is not None
+        }
+        requests = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"owner_id": owners[equipment_id]}})
+            for doc in batch
+            if (equipment_id := _as_object_id(doc.get("equipment_id"))) in owners
+        ]
+        modified = database.bookings.bulk_write(requests, ordered=False).modified_count if requests else 0
+        return modified, len(batch) - len(requests)
+
+    for doc in missing:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            done, left = flush(batch)
+            updated, skipped = updated + done, skipped + left
+            batch = []
+    if batch:
+        done, left = flush(batch)
+        updated, skipped = updated + done, skipped + left
+    logger.info(f"Backfilled owner_id on {updated} bookings")
+    if skipped:
+        logger.warning(f"Skipped {skipped} bookings without a known equipment owner")
+    return updated
+
+
+def main():
+    argparse.ArgumentParser(
+        description="Store agri-share ids as ObjectIds and backfill owner_id on existing bookings."
+    ).parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    from .db import db
+    normalize_ids(db)
+    backfill_booking_owners(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,19 @@ class PyObjectId(ObjectId):
             ),
         )
 
+def to_document(model: BaseModel) -> dict:
+    """
+    Dumps a model for insertion into MongoDB. model_dump serializes PyObjectId
+    fields to strings, so they are put back as ObjectIds to match id queries.
+    """
+    document = model.model_dump(by_alias=True)
+    for name, field in type(model).model_fields.items():
+        value = getattr(model, name)
+        if isinstance(value, ObjectId):
+            document[field.alias or name] = value
+    return document
+
+
 class User(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     name: str
@@ -55,6 +68,7 @@ class Equipment(BaseModel):
     price_per_day: float
     availability_status: bool = True
     image_urls: List[str] = []
+    thumbnail_urls: List[str] = []
     contact_name: str
     contact_phone: str
     contact_whatsapp: Optional[str] = None
@@ -68,6 +82,9 @@ class Booking(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     equipment_id: PyObjectId
     renter_id: PyObjectId
+    # Copied from the equipment when the booking is created, so an owner's bookings
+    # can be found without first looking up their equipment.
+    owner_id: Optional[PyObjectId] = None
     start_date: str
     end_date: str
     total_price: float
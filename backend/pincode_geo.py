@@ -0,0 +1,101 @@
+import csv
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# CSV with one row per pincode (or per post office, which is averaged per pincode) and
+# columns pincode, latitude, longitude, e.g. extracted from the India Post directory.
+PINCODE_CENTROIDS_FILE = os.getenv(
+    "PINCODE_CENTROIDS_FILE",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'pincode_centroids.csv'),
+)
+
+
+class PincodeCentroids:
+    """
+    In-memory spatial index over pincode centroid coordinates.
+
+    Centroids are kept sorted by latitude, so a radius query first narrows the
+    candidates to a latitude band with a binary search and then computes exact
+    haversine distances for that band with vectorized numpy.
+    """
+
+    def __init__(self, pincodes: List[str], latitudes, longitudes):
+        order = np.argsort(latitudes, kind="stable")
+        self.pincodes = np.asarray(pincodes, dtype=object)[order]
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)[order]
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)[order]
+        self._position = {pincode: i for i, pincode in enumerate(self.pincodes)}
+
+    @classmethod
+    def from_csv(cls, path: str) -> "PincodeCentroids":
+        sums = {}
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+            for row in reader:
+                try:
+                    pincode = row[fields["pincode"]].strip()
+                    latitude = float(row[fields["latitude"]])
+                    longitude = float(row[fields["longitude"]])
+                except (KeyError, ValueError, TypeError):
+                    continue
+                if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    continue
+                total = sums.setdefault(pincode, [0.0, 0.0, 0])
+                total[0] += latitude
+                total[1] += longitude
+                total[2] += 1
+        pincodes = list(sums)
+        latitudes = [sums[p][0] / sums[p][2] for p in pincodes]
+        longitudes = [sums[p][1] / sums[p][2] for p in pincodes]
+        logger.info(f"Loaded centroids for {len(pincodes)} pincodes from {path}")
+        return cls(pincodes, latitudes, longitudes)
+
+    def __len__(self) -> int:
+        return len(self.pincodes)
+
+    def centroid(self, pincode: str) -> Optional[Tuple[float, float]]:
+        position = self._position.get(pincode)
+        if position is None:
+            return None
+        return float(self.latitudes[position]), float(self.longitudes[position])
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[str, float]]:
+        """Returns (pincode, distance_km) for every centroid within the radius, nearest first."""
+        delta_lat = np.degrees(radius_km / EARTH_RADIUS_KM)
+        start = np.searchsorted(self.latitudes, latitude - delta_lat, side="left")
+        end = np.searchsorted(self.latitudes, latitude + delta_lat, side="right")
+
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2 = np.radians(self.latitudes[start:end])
+        lon2 = np.radians(self.longitudes[start:end])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        inside = np.flatnonzero(distances <= radius_km)
+        # Sort by distance, then pincode, so the order is stable for cursors.
+        band_pincodes = self.pincodes[start:end][inside]
+        order = np.lexsort((band_pincodes.astype(str), distances[inside]))
+        return [(band_pincodes[i], float(distances[inside][i])) for i in order]
+
+
+_centroids: Optional[PincodeCentroids] = None
+_centroids_lock = threading.Lock()
+
+
+def get_pincode_centroids() -> Optional[PincodeCentroids]:
+    """Loads the centroid table on first use; returns None if no centroid file is configured."""
+    global _centroids
+    if _centroids is None:
+        with _centroids_lock:
+            if _centroids is None and os.path.exists(PINCODE_CENTROIDS_FILE):
+                _centroids = PincodeCentroids.from_csv(PINCODE_CENTROIDS_FILE)
+    return _centroids
@@ -0,0 +1,76 @@
+import argparse
+import gzip
+import logging
+import os
+
+try:
+    import brotli
+except ImportError:  # Without brotli only .gz files are written.
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".xml", ".map", ".ico", ".webmanifest"}
+MIN_SIZE = 1024
+# A compressed copy is only kept if it saves at least this fraction of the size.
+MIN_SAVING = 0.1
+
+
+def _write_if_smaller(path: str, data: bytes, original_size: int) -> bool:
+    if len(data) > original_size * (1 - MIN_SAVING):
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def precompress(directory: str) -> int:
+    """
+    Writes `.gz` and `.br` siblings next to every compressible file under `directory`
+    (e.g. the Vite build output), at maximum compression, for PrecompressedStaticFiles
+    to serve. Up-to-date siblings are left alone. Returns the number of files written.
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = os.stat(path)
+            if stat.st_size < MIN_SIZE:
+                continue
+
+            targets = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                targets[".br"] = lambda data: brotli.compress(data, quality=11)
+            stale = {
+                suffix: compress for suffix, compress in targets.items()
+                if not os.path.exists(path + suffix) or os.stat(path + suffix).st_mtime_ns < stat.st_mtime_ns
+            }
+            if not stale:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            for suffix, compress in stale.items():
+                compressed = compress(data)
+                if _write_if_smaller(path + suffix, compressed, len(data)):
+                    written += 1
+                    logger.info(f"{path}{suffix}: {len(data)} -> {len(compressed)} bytes")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .br/.gz siblings for the static frontend build.")
+    parser.add_argument("directory", nargs="?", default=os.path.join(os.path.dirname(__file__), "static"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    written = precompress(args.directory)
+    logger.info(f"Wrote {written} precompressed files under {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
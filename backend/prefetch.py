@@ -0,0 +1,124 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PincodePrefetcher:
+    """
+    Tracks how often each pincode is requested and refreshes the cache entries of
+    the most popular ones shortly before they expire, so that lookups on the
+    request path are served from the cache.
+
+    Request counts decay exponentially, which lets the hot set follow the daily
+    traffic pattern instead of being dominated by all-time totals.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str], object],
+        cached_at: Callable[[str], Optional[float]],
+        ttl: float,
+        top_n: int = 2000,
+        lead_time: float = 300,
+        max_per_minute: int = 100,
+        poll_interval: float = 30,
+        half_life: float = 6 * 3600,
+    ):
+        self.refresh = refresh
+        self.cached_at = cached_at
+        self.ttl = ttl
+        self.top_n = top_n
+        self.lead_time = lead_time
+        self.min_interval = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self.poll_interval = poll_interval
+        self.half_life = half_life
+
+        self._scores: Dict[str, float] = {}
+        self._last_decay = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def record_request(self, pincode: str):
+        """Counts one request for a pincode."""
+        self._scores[pincode] = self._scores.get(pincode, 0.0) + 1.0
+
+    def _decay(self):
+        now = time.monotonic()
+        elapsed = now - self._last_decay
+        self._last_decay = now
+        if self.half_life <= 0 or elapsed <= 0:
+            return
+        factor = 0.5 ** (elapsed / self.half_life)
+        # Drop pincodes that have effectively gone quiet to keep the table bounded.
+        self._scores = {
+            pincode: score * factor
+            for pincode, score in self._scores.items()
+            if score * factor >= 0.05
+        }
+
+    def hot_pincodes(self) -> List[str]:
+        """Returns the top-N pincodes by decayed request count."""
+        return heapq.nlargest(self.top_n, self._scores, key=self._scores.get)
+
+    def due_pincodes(self) -> List[str]:
+        """
+        Returns the hot pincodes whose cache entry is missing or expires within
+        the lead time, ordered so that the soonest to expire is refreshed first.
+        """
+        now = time.time()
+        due = []
+        for pincode in self.hot_pincodes():
+            timestamp = self.cached_at(pincode)
+            expires_at = timestamp + self.ttl if timestamp is not None else now
+            if expires_at - now <= self.lead_time:
+                due.append((expires_at, pincode))
+        due.sort()
+        return [pincode for _, pincode in due]
+
+    async def run_once(self) -> int:
+        """Refreshes every due pincode, spacing the upstream calls by the rate limit."""
+        self._decay()
+        refreshed = 0
+        for pincode in self.due_pincodes():
+            try:
+                await asyncio.to_thread(self.refresh, pincode)
+                refreshed += 1
+            except Exception as e:
+                logger.warning(f"[PREFETCH] Failed to refresh pincode {pincode}: {e}")
+            if self.min_interval:
+                await asyncio.sleep(self.min_interval)
+        if refreshed:
+            logger.info(f"[PREFETCH] Refreshed {refreshed} cache entries.")
+        return refreshed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[PREFETCH] Prefetch cycle failed: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Starts the background refresh loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(
+                f"[PREFETCH] Started (top_n={self.top_n}, lead_time={self.lead_time}s, "
+                f"min_interval={self.min_interval:.2f}s)"
+            )
+
+    async def stop(self):
+        """Cancels the background refresh loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
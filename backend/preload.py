@@ -0,0 +1,46 @@
+import gc
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Set to "0" to skip loading the AI pipeline in the master (workers then load it themselves).
+PRELOAD_AI = os.getenv("PRELOAD_AI", "1") != "0"
+
+
+def preload_shared_state():
+    """
+    Loads the read-mostly state every worker needs — the AI pipeline's FAISS index
+    and tokenizers, the scheme search index, the market price snapshot and the
+    pincode centroids — once, in the gunicorn master before it forks the workers
+    (see gunicorn.conf.py). Workers then share those pages copy-on-write instead of
+    each loading its own copy.
+
+    The embedding model itself is not loaded here: torch's OpenMP pool and ONNX
+    Runtime's threads do not survive a fork, so each worker loads its own on
+    warmup (see embeddings.TorchEmbeddings and OnnxEmbeddings).
+
+    Afterwards every object is moved to the permanent GC generation, so the
+    workers' garbage collections do not write to (and so un-share) the pages
+    holding them.
+    """
+    from .ai.runtime import ai_runtime
+    from .pincode_geo import get_pincode_centroids
+    from .routes.market import market_store
+    from .routes.schemes import schemes_index, schemes_payload
+
+    started = time.perf_counter()
+    if PRELOAD_AI:
+        ai_runtime.load(warm_model=False)
+    schemes_payload.get()
+    schemes_index.get()
+    market_store.snapshot()
+    get_pincode_centroids()
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Preloaded shared state in {time.perf_counter() - started:.1f}s "
+        f"(AI: {ai_runtime.state}, {gc.get_freeze_count()} objects frozen)"
+    )
@@ -1,17 +1,124 @@
-import shutil
-import uuid
+import asyncio
+import json
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Body, Depends, UploadFile, File, Form, Request
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Body, Depends, UploadFile, File, Form, Request, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
 
-from ..models import Equipment, Booking, PyObjectId
-from ..db import db
+from ..models import Equipment, Booking, PyObjectId, to_document
+from ..db import async_db as db
+from ..pincode_geo import get_pincode_centroids
+from ..equipment_import import ImportFormatError, detect_format, iter_rows, validate_batch
+from ..uploads import MAX_IMAGES_PER_LISTING, discard_files, save_images
+from ..booking_calendar import parse_range, reserve, release, booked_intervals, free_windows
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_BATCH_SIZE = 200
+MAX_AVAILABILITY_DAYS = 366
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ERRORS = 1000
+
+# Equipment fields embedded in each booking by the bookings "detailed" view.
+BOOKING_EQUIPMENT_FIELDS = ("name", "pincode", "price_per_day", "thumbnail_urls", "contact_name", "contact_phone")
+
+# Fields rendered by EquipmentList/EquipmentCard.
+EQUIPMENT_CARD_FIELDS = {
+    "name": 1,
+    "description": 1,
+    "price_per_day": 1,
+    "pincode": 1,
+    "image_urls": 1,
+    "thumbnail_urls": 1,
+    "contact_name": 1,
+    "contact_phone": 1,
+    "contact_whatsapp": 1,
+}
+
+
+class EquipmentPage(BaseModel):
+    equipment: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class BookingPage(BaseModel):
+    bookings: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class EquipmentImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+
+
+class DateRange(BaseModel):
+    start_date: str
+    end_date: str
+
+
+class EquipmentAvailability(BaseModel):
+    equipment_id: str
+    start_date: str
+    end_date: str
+    booked: List[DateRange]
+    free: List[DateRange]
+
+
+def _to_json_doc(doc: dict) -> dict:
+    """Converts a raw Mongo document to JSON-ready values without building a model."""
+    return {
+        key: str(value) if isinstance(value, ObjectId) else _to_json_doc(value) if isinstance(value, dict) else value
+        for key, value in doc.items()
+    }
+
+
+def _after_cursor(query: dict, cursor: Optional[str]) -> dict:
+    if not cursor:
+        return query
+    if not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return {**query, "_id": {"$lt": ObjectId(cursor)}}
+
+
+async def _fetch_page(collection, query: dict, projection: Optional[dict], limit: int):
+    """Fetches one page sorted by `_id` descending, plus one document to detect the next page."""
+    docs = await collection.find(query, projection, sort=[("_id", -1)], limit=limit + 1)
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+async def _stream_json_array(collection, query: dict, projection: Optional[dict] = None):
+    """
+    Yields the matching documents as a JSON array, fetching STREAM_BATCH_SIZE documents
+    at a time by `_id` keyset, so memory stays flat whatever the result size.
+    """
+    yield b"["
+    first = True
+    batch_query = query
+    while True:
+        batch = await collection.find(batch_query, projection, sort=[("_id", -1)], limit=STREAM_BATCH_SIZE)
+        for doc in batch:
+            yield (b"" if first else b",") + json.dumps(_to_json_doc(doc), default=str).encode("utf-8")
+            first = False
+        if len(batch) < STREAM_BATCH_SIZE:
+            break
+        batch_query = {**query, "_id": {"$lt": batch[-1]["_id"]}}
+    yield b"]"
+
 
 @router.post("/agri-share/equipment", response_model=Equipment)
 async def create_equipment(
@@ -27,31 +134,25 @@ async def create_equipment(
     images: List[UploadFile] = File(...)
 ):
     """
-    Create a new equipment listing with image uploads.
+    Create a new equipment listing with image uploads. Images are stored once per
+    distinct content; the listing gets web-size and thumbnail URLs for each.
     """
-    image_urls = []
-    for image in images:
-        file_extension = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = f"backend/static/uploads/{unique_filename}"
-        
-        try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-        finally:
-            image.file.close()
-            
-        base_url = str(request.base_url).rstrip('/')
-        image_url = f"{base_url}/static/uploads/{unique_filename}"
-        image_urls.append(image_url)
-    
-    logger.info(f"Generated image URLs: {image_urls}")
+    if len(images) > MAX_IMAGES_PER_LISTING:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMAGES_PER_LISTING} images per listing.")
 
     try:
         owner_obj_id = PyObjectId(owner_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid owner_id format.")
 
+    base_url = str(request.base_url).rstrip('/')
+    created: List[str] = []
+    saved = await save_images(images, base_url, created)
+    image_urls = [urls["web"] for urls in saved]
+    thumbnail_urls = [urls["thumb"] for urls in saved]
+    
+    logger.info(f"Generated image URLs: {image_urls}")
+
     equipment_data = {
         "name": name,
         "description": description,
@@ -62,36 +163,191 @@ async def create_equipment(
         "contact_phone": contact_phone,
         "contact_whatsapp": contact_whatsapp,
         "image_urls": image_urls,
+        "thumbnail_urls": thumbnail_urls,
         "availability_status": True,
     }
     
     try:
         equipment_model = Equipment(**equipment_data)
-        equipment_to_insert = equipment_model.model_dump(by_alias=True, exclude=["id"])
-        result = db.equipment.insert_one(equipment_to_insert)
+        # The id is assigned here, so the inserted document is known without reading it back.
+        await db.equipment.insert_one(to_document(equipment_model))
     except Exception as e:
         logger.error(f"Failed to create equipment in DB: {e}")
+        discard_files(created)
         raise HTTPException(status_code=500, detail="Database operation failed.")
-    new_equipment = db.equipment.find_one({"_id": result.inserted_id})
-    
-    if new_equipment:
-        return Equipment(**new_equipment)
-    raise HTTPException(status_code=500, detail="Failed to create equipment")
+    return equipment_model
+
+
+@router.post("/agri-share/equipment/import", response_model=EquipmentImportResult)
+async def import_equipment(
+    file: UploadFile = File(...),
+    owner_id: Optional[str] = Form(None),
+):
+    """
+    Bulk-create equipment listings from a CSV (with a header row) or JSON lines file,
+    one listing per row, with the same fields as a listing; CSV image_urls may hold
+    several URLs separated by "|". `owner_id` applies to rows without one.
+
+    Rows are validated and inserted in batches of IMPORT_BATCH_SIZE with unordered
+    insert_many, so one bad row does not stop the rest. Rows that fail validation
+    or insertion are reported by line number.
+    """
+    try:
+        file_format = detect_format(file.filename, file.content_type)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if owner_id is not None and not ObjectId.is_valid(owner_id):
+        raise HTTPException(status_code=400, detail="Invalid owner_id format.")
+
+    rows = iter_rows(file.file, file_format)
+    inserted, failed, errors = 0, 0, []
+
+    def add_errors(row_errors):
+        nonlocal failed
+        failed += len(row_errors)
+        for line, error in row_errors[:max(MAX_IMPORT_ERRORS - len(errors), 0)]:
+            errors.append(ImportRowError(line=line, error=error))
+
+    try:
+        done = False
+        while not done:
+            # Parsing and validation are CPU work, so they run off the event loop.
+            documents, row_errors, done = await asyncio.to_thread(validate_batch, rows, IMPORT_BATCH_SIZE, owner_id)
+            add_errors(row_errors)
+            if not documents:
+                continue
+            try:
+                result = await db.equipment.insert_many([document for _, document in documents], ordered=False)
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as e:
+                inserted += e.details.get("nInserted", 0)
+                add_errors([
+                    (documents[write_error["index"]][0], write_error.get("errmsg", "Insert failed"))
+                    for write_error in e.details.get("writeErrors", [])
+                ])
+    finally:
+        await file.close()
 
+    logger.info(f"Imported {inserted} equipment listings from {file.filename} ({failed} rows failed)")
+    return EquipmentImportResult(inserted=inserted, failed=failed, errors=errors)
 
-@router.get("/agri-share/equipment", response_model=List[Equipment])
-async def list_equipment(pincode: str = None):
+
+@router.get("/agri-share/equipment", response_model=EquipmentPage)
+async def list_equipment(
+    pincode: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("card", pattern="^(card|full)$"),
+    stream: bool = False,
+):
     """
-    List all available equipment, optionally filtering by pincode.
+    List available equipment, newest first, optionally filtering by pincode.
+    Pages are keyed on `_id`: pass the returned `next_cursor` to get the next page.
+    `view=card` returns only the fields shown on an equipment card. With `stream=true`
+    the whole result is streamed as a JSON array instead, fetched in batches.
     """
     query = {"availability_status": True}
     if pincode:
         query["pincode"] = pincode
-    
-    equipment_list = []
-    for equipment in db.equipment.find(query):
-        equipment_list.append(Equipment(**equipment))
-    return equipment_list
+    projection = EQUIPMENT_CARD_FIELDS if view == "card" else None
+
+    if stream:
+        return StreamingResponse(_stream_json_array(db.equipment, query, projection), media_type="application/json")
+
+    docs, next_cursor = await _fetch_page(db.equipment, _after_cursor(query, cursor), projection, limit)
+    return EquipmentPage(equipment=[_to_json_doc(doc) for doc in docs], next_cursor=next_cursor)
+
+
+@router.get("/agri-share/equipment/nearby", response_model=EquipmentPage)
+async def list_nearby_equipment(
+    pincode: str = Query(..., min_length=6, max_length=6),
+    radius_km: float = Query(25, gt=0, le=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("card", pattern="^(card|full)$"),
+):
+    """
+    List available equipment within `radius_km` of a pincode, nearest first.
+    Distances are between pincode centroids; listings in the same pincode are
+    ordered newest first. Pass the returned `next_cursor` to get the next page.
+    """
+    centroids = get_pincode_centroids()
+    if centroids is None:
+        raise HTTPException(status_code=503, detail="Pincode coordinates are not configured.")
+    origin = centroids.centroid(pincode)
+    if origin is None:
+        raise HTTPException(status_code=404, detail=f"No coordinates known for pincode {pincode}.")
+
+    nearby = centroids.within(origin[0], origin[1], radius_km)
+    nearby_pincodes = [nearby_pincode for nearby_pincode, _ in nearby]
+    distances = dict(nearby)
+    rank_of = {nearby_pincode: rank for rank, nearby_pincode in enumerate(nearby_pincodes)}
+    projection = EQUIPMENT_CARD_FIELDS if view == "card" else None
+
+    start_rank, last_id = 0, None
+    if cursor:
+        try:
+            rank_part, id_part = cursor.split(":", 1)
+            start_rank, last_id = int(rank_part), ObjectId(id_part)
+        except (ValueError, InvalidId):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    # One index-covered count per pincode decides which pincodes fill this page
+    # completely, so the page needs at most three queries whatever the radius.
+    counts = {
+        group["_id"]: group["count"]
+        for group in await db.equipment.aggregate([
+            {"$match": {"availability_status": True, "pincode": {"$in": nearby_pincodes[start_rank:]}}},
+            {"$group": {"_id": "$pincode", "count": {"$sum": 1}}},
+        ])
+    }
+
+    remaining = limit + 1
+    docs = []
+    rank = start_rank
+    if last_id is not None and rank < len(nearby_pincodes):
+        docs += await db.equipment.find(
+            {"availability_status": True, "pincode": nearby_pincodes[rank], "_id": {"$lt": last_id}},
+            projection, sort=[("_id", -1)], limit=remaining,
+        )
+        remaining -= len(docs)
+        rank += 1
+
+    whole_pincodes, partial_pincode = [], None
+    while rank < len(nearby_pincodes) and remaining > 0:
+        count = counts.get(nearby_pincodes[rank], 0)
+        if count and count <= remaining:
+            whole_pincodes.append(nearby_pincodes[rank])
+            remaining -= count
+        elif count:
+            partial_pincode = nearby_pincodes[rank]
+            break
+        rank += 1
+
+    if whole_pincodes:
+        whole_docs = await db.equipment.find(
+            {"availability_status": True, "pincode": {"$in": whole_pincodes}}, projection
+        )
+        whole_docs.sort(key=lambda doc: doc["_id"], reverse=True)
+        whole_docs.sort(key=lambda doc: rank_of[doc["pincode"]])
+        docs += whole_docs
+    if partial_pincode is not None and remaining > 0:
+        docs += await db.equipment.find(
+            {"availability_status": True, "pincode": partial_pincode},
+            projection, sort=[("_id", -1)], limit=remaining,
+        )
+
+    next_cursor = None
+    if len(docs) > limit:
+        last = docs[limit - 1]
+        next_cursor = f"{rank_of[last['pincode']]}:{last['_id']}"
+
+    equipment = []
+    for doc in docs[:limit]:
+        item = _to_json_doc(doc)
+        item["distance_km"] = round(distances[doc["pincode"]], 2)
+        equipment.append(item)
+    return EquipmentPage(equipment=equipment, next_cursor=next_cursor)
 
 
 @router.get("/agri-share/equipment/{equipment_id}", response_model=Equipment)
@@ -99,46 +355,101 @@ async def get_equipment(equipment_id: PyObjectId):
     """
     Get details for a specific piece of equipment.
     """
-    equipment = db.equipment.find_one({"_id": equipment_id})
+    equipment = await db.equipment.find_one({"_id": equipment_id})
     if equipment:
         return Equipment(**equipment)
     raise HTTPException(status_code=404, detail="Equipment not found")
 
 
+@router.get("/agri-share/equipment/{equipment_id}/availability", response_model=EquipmentAvailability)
+async def get_equipment_availability(equipment_id: PyObjectId, start_date: str, end_date: str):
+    """
+    Get the booked and free date ranges of a piece of equipment between
+    start_date and end_date (inclusive, YYYY-MM-DD).
+    """
+    start_day, end_day = parse_range(start_date, end_date)
+    if (end_day - start_day).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_AVAILABILITY_DAYS} days.")
+
+    booked = await booked_intervals(db.booking_calendar, equipment_id, start_day, end_day)
+    if booked is None:
+        if not await db.equipment.find_one({"_id": equipment_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Equipment not found")
+        booked = []
+    as_range = lambda days: DateRange(start_date=days[0].isoformat(), end_date=days[1].isoformat())
+    return EquipmentAvailability(
+        equipment_id=str(equipment_id),
+        start_date=start_day.isoformat(),
+        end_date=end_day.isoformat(),
+        booked=[as_range(days) for days in booked],
+        free=[as_range(days) for days in free_windows(booked, start_day, end_day)],
+    )
+
+
 @router.post("/agri-share/bookings", response_model=Booking)
 async def create_booking(booking: Booking = Body(...)):
     """
-    Create a new booking request.
+    Create a new booking request. Fails with 409 if the equipment is already booked
+    on any day between start_date and end_date (inclusive).
     """
-    booking_dict = booking.model_dump(by_alias=True, exclude=["id"])
+    start_day, end_day = parse_range(booking.start_date, booking.end_date)
     
-    equipment = db.equipment.find_one({"_id": booking.equipment_id, "availability_status": True})
+    equipment = await db.equipment.find_one({"_id": booking.equipment_id, "availability_status": True}, {"owner_id": 1})
     if not equipment:
         raise HTTPException(status_code=404, detail="Equipment not available for booking")
-        
-    result = db.bookings.insert_one(booking_dict)
-    new_booking = db.bookings.find_one({"_id": result.inserted_id})
-    
-    if new_booking:
-        return Booking(**new_booking)
-    raise HTTPException(status_code=500, detail="Failed to create booking")
+    booking.owner_id = ObjectId(str(equipment["owner_id"]))
+    # The id is always assigned here: a client-supplied one could collide with an
+    # existing booking's interval in the calendar.
+    booking.id = PyObjectId()
+
+    if not await reserve(db.booking_calendar, booking.equipment_id, booking.id, start_day, end_day):
+        raise HTTPException(status_code=409, detail="Equipment is already booked for some of these dates")
+
+    try:
+        await db.bookings.insert_one(to_document(booking))
+    except Exception as e:
+        logger.error(f"Failed to create booking in DB: {e}")
+        await release(db.booking_calendar, booking.equipment_id, booking.id, start_day, end_day)
+        raise HTTPException(status_code=500, detail="Failed to create booking")
+    return booking
 
 
-@router.get("/agri-share/bookings", response_model=List[Booking])
-async def get_user_bookings(user_id: PyObjectId):
+@router.get("/agri-share/bookings", response_model=BookingPage)
+async def get_user_bookings(
+    user_id: PyObjectId,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("booking", pattern="^(booking|detailed)$"),
+    stream: bool = False,
+):
     """
-    Get all bookings for a specific user (both as owner and renter).
+    Get all bookings for a specific user (both as owner and renter), newest first.
+    `view=detailed` adds a summary of the booked equipment to each booking, joined
+    in the same query. `stream=true` streams all bookings as a JSON array.
     This is a simplified implementation. A real app would get the user_id from auth.
     """
-    owned_equipment_ids = [e["_id"] for e in db.equipment.find({"owner_id": user_id}, {"_id": 1})]
-    
-    bookings = []
-    for booking in db.bookings.find({
-        "$or": [
-            {"renter_id": user_id},
-            {"equipment_id": {"$in": owned_equipment_ids}}
-        ]
-    }):
-        bookings.append(Booking(**booking))
-        
-    return bookings
+    query = {"$or": [{"renter_id": user_id}, {"owner_id": user_id}]}
+
+    if stream:
+        if view != "booking":
+            raise HTTPException(status_code=400, detail="Streaming is only available for view=booking.")
+        return StreamingResponse(_stream_json_array(db.bookings, query), media_type="application/json")
+
+    if view == "booking":
+        docs, next_cursor = await _fetch_page(db.bookings, _after_cursor(query, cursor), None, limit)
+        return BookingPage(bookings=[_to_json_doc(doc) for doc in docs], next_cursor=next_cursor)
+
+    # The join runs after the page is cut, so it costs one equipment lookup per booking returned.
+    docs = await db.bookings.aggregate([
+        {"$match": _after_cursor(query, cursor)},
+        {"$sort": {"_id": -1}},
+        {"$limit": limit + 1},
+        {"$lookup": {"from": "equipment", "localField": "equipment_id", "foreignField": "_id", "as": "equipment"}},
+        {"$unwind": {"path": "$equipment", "preserveNullAndEmptyArrays": True}},
+        {"$addFields": {"equipment": {
+            "_id": "$equipment._id",
+            **{field: f"$equipment.{field}" for field in BOOKING_EQUIPMENT_FIELDS},
+        }}},
+    ])
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    return BookingPage(bookings=[_to_json_doc(doc) for doc in docs[:limit]], next_cursor=next_cursor)
@@ -1,10 +1,12 @@
-import json
 import os
 import logging
 from fastapi import APIRouter, HTTPException, Query
-from ..schemas import MarketResponse, MarketPrice
+from ..schemas import MarketResponse, MarketTrendsResponse
+from ..market_store import MarketPriceStore
+from ..market_columnar import ColumnarMarketStore
+from ..market_trends import compute_trends
 from ..location import get_location_details, LocationError
-from typing import List
+from typing import Optional
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
@@ -13,22 +15,25 @@ router = APIRouter()
 
 DATA_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'market_prices.json')
 
-def load_market_data_from_json() -> List[dict]:
-    """Loads market data from the local JSON file."""
-    try:
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-        logger.info(f"Successfully loaded {len(data)} records from {DATA_FILE}")
-        return data
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Could not read or parse market data file at {DATA_FILE}: {e}")
-        return []
+COLUMNAR_DIR = os.getenv(
+    "MARKET_COLUMNAR_DIR",
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'market_columnar'),
+)
+
+market_store = MarketPriceStore(DATA_FILE)
+# Agmarknet-scale history ingested with `python -m backend.market_columnar`; when
+# present it takes precedence over the small JSON file.
+columnar_store = ColumnarMarketStore(COLUMNAR_DIR)
 
 @router.get("/market", response_model=MarketResponse)
-async def get_market_prices(pincode: str = Query(..., min_length=6, max_length=6)):
+async def get_market_prices(
+    pincode: str = Query(..., min_length=6, max_length=6),
+    commodity: Optional[str] = Query(None),
+    apmc: Optional[str] = Query(None),
+):
     """
-    Retrieves market prices from a local JSON file and filters them by state
-    associated with the given pincode.
+    Retrieves market prices from the in-memory market price store and filters them
+    by the state associated with the given pincode, and optionally by commodity and APMC.
     """
     logger.info(f"GET /market called with pincode: {pincode}")
 
@@ -40,23 +45,45 @@ async def get_market_prices(pincode: str = Query(..., min_length=6, max_length=6
         logger.error(f"LocationError for pincode {pincode}: {e}")
         raise HTTPException(status_code=400, detail=f"Could not determine location for pincode: {e}")
 
-    all_market_data = load_market_data_from_json()
-    if not all_market_data:
-        return MarketResponse(market_data=[])
-    
-    adapted_market_data: List[MarketPrice] = []
-    for item in all_market_data:
-        price_details = MarketPrice(
-            state=item.get("location", "N/A"), 
-            apmc=item.get("location", "N/A"),
-            commodity=item.get("crop", "N/A"),
-            min_price=item.get("price", 0.0),
-            modal_price=item.get("price", 0.0),
-            max_price=item.get("price", 0.0),
-            unit="Quintal",
-            date="N/A",
-        )
-        adapted_market_data.append(price_details)
-
-    logger.info(f"Returning {len(adapted_market_data)} total market entries from local JSON.")
-    return MarketResponse(market_data=adapted_market_data)
+    if columnar_store.available():
+        market_data = columnar_store.latest_prices(state=user_state, apmc=apmc, commodity=commodity)
+    else:
+        market_data = market_store.find(state=user_state, apmc=apmc, commodity=commodity)
+
+    logger.info(f"Returning {len(market_data)} market entries for state '{user_state}'.")
+    return MarketResponse(market_data=market_data)
+
+@router.get("/trends", response_model=MarketTrendsResponse)
+async def get_market_trends(
+    pincode: str = Query(..., min_length=6, max_length=6),
+    commodity: Optional[str] = Query(None),
+    window: int = Query(7, ge=1, le=90),
+    history_days: int = Query(365, ge=7, le=3650),
+    include_series: bool = Query(False),
+):
+    """
+    Returns rolling price averages, week-over-week change and the best-paying mandi
+    per commodity for the state associated with the given pincode.
+    """
+    logger.info(f"GET /trends called with pincode: {pincode}, commodity: {commodity}")
+
+    try:
+        location = get_location_details(pincode)
+        user_state = location["state"]
+    except LocationError as e:
+        logger.error(f"LocationError for pincode {pincode}: {e}")
+        raise HTTPException(status_code=400, detail=f"Could not determine location for pincode: {e}")
+
+    if not columnar_store.available():
+        raise HTTPException(status_code=404, detail="No market price history available.")
+
+    trends = compute_trends(
+        columnar_store,
+        state=user_state,
+        commodity=commodity,
+        window=window,
+        history_days=history_days,
+        include_series=include_series,
+    )
+    logger.info(f"Returning trends for {len(trends)} commodities in state '{user_state}'.")
+    return MarketTrendsResponse(state=user_state, window_days=window, trends=trends)
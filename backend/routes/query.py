@@ -1,72 +1,197 @@
-from fastapi import APIRouter, HTTPException
-from ..schemas import QueryRequest, QueryResponse
-from ..ai.llama_pipeline import get_ai_response
-from .weather import get_weather
-from .market import get_market_prices
+import asyncio
+import logging
+import os
+from fastapi import APIRouter, HTTPException, Request
+from ..schemas import QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse, BatchQueryResult
+from ..ai.runtime import AIUnavailable, ai_runtime
+from ..admission import QUESTION_COST, charge, retry_after_header
+from ..metrics import span, trace
+from .weather import get_weather, load_weather, weather_prefetcher
+from .market import columnar_store, get_market_prices, get_market_trends
 from ..location import get_location_details, LocationError
-import traceback
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Uncached pincode lookups (location, weather) a batch runs at once, across all batches in this worker.
+# Each is a blocking call on the default thread pool, which weather and uploads share.
+BATCH_LOCATION_CONCURRENCY = int(os.getenv("BATCH_LOCATION_CONCURRENCY", "4"))
+_location_semaphore = asyncio.Semaphore(BATCH_LOCATION_CONCURRENCY)
+
 @router.post("/query", response_model=QueryResponse)
 async def handle_query(request: QueryRequest):
-    print(f"[QUERY] Received request: query='{request.query}', language='{request.language}', pincode='{request.pincode}'")
+    """
+    Answers a farmer's question from their location, weather, market prices and the
+    knowledge base. Each stage is timed (see backend/metrics.py) and the request's
+    timings are logged as one line at the end.
+    """
+    logger.info(f"Received query: query='{request.query}', language='{request.language}', pincode='{request.pincode}'")
+
+    with trace("query", pincode=request.pincode, language=request.language):
+        try:
+            with span("query.location"):
+                location_details = get_location_details(request.pincode)
+        except LocationError as e:
+            logger.error(f"Location lookup failed: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.exception(f"Unexpected error in location lookup: {e}")
+            raise HTTPException(status_code=500, detail="Location service failed")
+
+        try:
+            with span("query.weather"):
+                weather_data = await get_weather(request.pincode, fields=None, hourly=False)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Weather fetch failed: {e}")
+            weather_data = None
+
+        try:
+            with span("query.market"):
+                market_data = await get_market_prices(request.pincode, commodity=None, apmc=None)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Market fetch failed: {e}")
+            market_data = None
+
+        market_trends = None
+        if columnar_store.available():
+            try:
+                with span("query.trends"):
+                    market_trends = await get_market_trends(
+                        request.pincode, commodity=None, window=7, history_days=365, include_series=False
+                    )
+            except Exception as e:
+                logger.exception(f"Market trends failed: {e}")
 
+        try:
+            with span("query.ai"):
+                pipeline = await ai_runtime.get_pipeline()
+                ai_response, confidence, sources = await pipeline.get_ai_response(
+                    query=request.query,
+                    lang=request.language,
+                    pincode=request.pincode,
+                    location_details=location_details,
+                    weather_data=weather_data,
+                    market_data=market_data,
+                    market_trends=market_trends,
+                )
+        except AIUnavailable as e:
+            logger.error(f"{e}; retrying in {e.retry_after:.0f}s")
+            raise HTTPException(
+                status_code=503,
+                detail="AI service temporarily unavailable",
+                headers={"Retry-After": retry_after_header(e.retry_after)},
+            )
+        except Exception as e:
+            logger.exception(f"AI response generation failed: {e}")
+            raise HTTPException(status_code=500, detail="AI processing failed")
+
+        return QueryResponse(
+            response=ai_response,
+            confidence=confidence,
+            sources=sources,
+            weather=weather_data.dict() if weather_data else None,
+            market=market_data.dict() if market_data else None,
+        )
+
+
+async def _lookup_location(pincode: str):
+    """Returns the location details for a pincode, or the LocationError raised for it."""
     try:
-        print(f"[STEP 1] Fetching location details...")
-        location_details = get_location_details(request.pincode)
-        print(f"[STEP 1] Location: {location_details}")
+        async with _location_semaphore:
+            return await asyncio.to_thread(get_location_details, pincode)
     except LocationError as e:
-        print(f"[ERROR] Location lookup failed: {e}")
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        print(f"[FATAL] Unexpected error in location lookup: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="Location service failed")
+        return e
 
-    try:
-        print(f"[STEP 2] Fetching weather data...")
-        weather_data = await get_weather(request.pincode)
-        print(f"[STEP 2] Weather data OK")
-    except HTTPException:
-        raise  
-    except Exception as e:
-        print(f"[ERROR] Weather fetch failed: {e}")
-        traceback.print_exc()
-        weather_data = None  
 
+async def _lookup_conditions(pincode: str) -> dict:
+    """
+    Returns the weather, market prices and price trends for a pincode, as the
+    get_ai_response keyword arguments; any that cannot be fetched is None.
+    """
+    conditions = {"weather_data": None, "market_data": None, "market_trends": None}
+    weather_prefetcher.record_request(pincode)
     try:
-        print(f"[STEP 3] Fetching market data...")
-        market_data = await get_market_prices(request.pincode)
-        print(f"[STEP 3] Market data OK")
-    except HTTPException:
-        raise
+        async with _location_semaphore:
+            conditions["weather_data"] = await asyncio.to_thread(load_weather, pincode, None, False)
     except Exception as e:
-        print(f"[ERROR] Market fetch failed: {e}")
-        traceback.print_exc()
-        market_data = None
-
+        logger.error(f"Weather fetch failed for pincode {pincode}: {e}")
     try:
-        print(f"[STEP 4] Calling AI pipeline...")
-        ai_response, confidence, sources = await get_ai_response(
-            query=request.query,
-            lang=request.language,
-            pincode=request.pincode,
-            location_details=location_details,
-            weather_data=weather_data,
-            market_data=market_data,
-        )
+        conditions["market_data"] = await get_market_prices(pincode, commodity=None, apmc=None)
     except Exception as e:
-        print(f"[FATAL] AI response generation failed: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="AI processing failed")
-
-    response_data = QueryResponse(
-        response=ai_response,
-        confidence=confidence,
-        sources=sources,
-        weather=weather_data.dict() if weather_data else None,
-        market=market_data.dict() if market_data else None,
-    )
-    print(f"[STEP 5] Sending response")
-    return response_data
+        logger.error(f"Market fetch failed for pincode {pincode}: {e}")
+    if columnar_store.available():
+        try:
+            conditions["market_trends"] = await get_market_trends(
+                pincode, commodity=None, window=7, history_days=365, include_series=False
+            )
+        except Exception as e:
+            logger.error(f"Market trends failed for pincode {pincode}: {e}")
+    return conditions
+
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def handle_query_batch(request: BatchQueryRequest, http_request: Request):
+    """
+    Answers a batch of questions, e.g. from an SMS or IVR gateway, in input order.
+    Each distinct pincode's location, weather, market prices and price trends are
+    looked up once and fed into the prompt of every question from it; retrieval
+    and generation are batched by get_ai_responses_batch. A question that cannot
+    be answered (unknown pincode) gets an `error` instead of failing the whole
+    batch. Batch answers do not carry the weather and market data themselves.
+
+    Every question is charged to the caller's rate limit like a single one; the
+    admission middleware has already taken the first.
+    """
+    queries = request.queries
+    await charge(http_request, QUESTION_COST * (len(queries) - 1))
+    pincodes = list(dict.fromkeys(q.pincode for q in queries))
+    logger.info(f"Received batch of {len(queries)} queries for {len(pincodes)} pincodes")
+
+    with trace("query.batch", size=len(queries), pincodes=len(pincodes)):
+        with span("query.batch.location"):
+            locations = dict(zip(pincodes, await asyncio.gather(*(_lookup_location(p) for p in pincodes))))
+
+        answerable = [i for i, q in enumerate(queries) if not isinstance(locations[q.pincode], Exception)]
+        answers = []
+        if answerable:
+            located = [p for p in pincodes if not isinstance(locations[p], Exception)]
+            with span("query.batch.conditions"):
+                conditions = dict(zip(located, await asyncio.gather(*(_lookup_conditions(p) for p in located))))
+            try:
+                with span("query.batch.ai"):
+                    pipeline = await ai_runtime.get_pipeline()
+                    answers = await pipeline.get_ai_responses_batch([
+                        {
+                            "query": queries[i].query,
+                            "lang": queries[i].language,
+                            "pincode": queries[i].pincode,
+                            "location_details": locations[queries[i].pincode],
+                            **conditions[queries[i].pincode],
+                        }
+                        for i in answerable
+                    ])
+            except AIUnavailable as e:
+                logger.error(f"{e}; retrying in {e.retry_after:.0f}s")
+                raise HTTPException(
+                    status_code=503,
+                    detail="AI service temporarily unavailable",
+                    headers={"Retry-After": retry_after_header(e.retry_after)},
+                )
+            except Exception as e:
+                logger.exception(f"Batch AI response generation failed: {e}")
+                raise HTTPException(status_code=500, detail="AI processing failed")
+
+        answer_for = dict(zip(answerable, answers))
+        results = []
+        for i, q in enumerate(queries):
+            if i in answer_for:
+                response, confidence, sources = answer_for[i]
+                results.append(BatchQueryResult(response=response, confidence=confidence, sources=sources))
+            else:
+                results.append(BatchQueryResult(error=str(locations[q.pincode])))
+        return BatchQueryResponse(results=results)
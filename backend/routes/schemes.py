@@ -1,7 +1,11 @@
 import json
 import logging
-from fastapi import APIRouter, HTTPException
-from backend.schemas import SchemeResponse
+import threading
+from typing import Any, Callable, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from backend.schemas import SchemeResponse, SchemeSearchResponse
+from backend.http_cache import PrecompressedPayload
+from backend.scheme_search import SchemeSearchIndex, CursorError
 import os
 
 logging.basicConfig(
@@ -30,17 +34,81 @@ def load_schemes_data():
         logger.error(f"JSON decode error in {filepath}: {e}")
         return []  
     
+class SchemesCache:
+    """
+    Holds a value derived from schemes.json, rebuilt only when the file changes.
+    `build` receives the loaded schemes list and returns None when there is nothing to serve.
+    """
+
+    def __init__(self, filepath: str, build: Callable[[list], Any]):
+        self.filepath = filepath
+        self.build = build
+        self._version = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        try:
+            stat = os.stat(self.filepath)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    schemes_data = load_schemes_data()
+                    self._value = self.build(schemes_data) if schemes_data else None
+                    self._version = version
+        return self._value
+
+
+def build_schemes_payload(schemes_data: list) -> PrecompressedPayload:
+    body = SchemeResponse(schemes=schemes_data).model_dump_json().encode("utf-8")
+    payload = PrecompressedPayload(body)
+    logger.info(f"Prepared schemes payload: {len(body)} bytes, etag {payload.etags[None]}")
+    return payload
+
+
+SCHEMES_FILE = os.path.join(DATA_DIR, 'schemes.json')
+schemes_payload = SchemesCache(SCHEMES_FILE, build_schemes_payload)
+schemes_index = SchemesCache(SCHEMES_FILE, SchemeSearchIndex)
+
 @router.get("/schemes", response_model=SchemeResponse)
-async def get_all_schemes():
+async def get_all_schemes(request: Request):
     """
     Returns a list of all government schemes from the data file.
+    The response is served from a precompressed payload and honours If-None-Match.
     """
     logger.info("GET /schemes endpoint called.")
-    schemes_data = load_schemes_data()
+    payload = schemes_payload.get()
 
-    if not schemes_data:
+    if payload is None:
         logger.warning("No schemes data found.")
         raise HTTPException(status_code=404, detail="No schemes data found.")
     
-    logger.info(f"Returning {len(schemes_data)} schemes.")
-    return SchemeResponse(schemes=schemes_data)
+    return payload.response(request)
+
+
+@router.get("/schemes/search", response_model=SchemeSearchResponse)
+async def search_schemes(
+    q: str = Query("", max_length=200),
+    category: Optional[str] = Query(None),
+    lang: str = Query("en", pattern="^(en|hi|mr)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+):
+    """
+    Searches schemes by name, category and description (including Hindi and Marathi
+    translations), with category facets and cursor pagination.
+    """
+    logger.info(f"GET /schemes/search called with q='{q}', category={category}, lang={lang}")
+    index = schemes_index.get()
+
+    if index is None:
+        logger.warning("No schemes data found.")
+        raise HTTPException(status_code=404, detail="No schemes data found.")
+
+    try:
+        return SchemeSearchResponse(**index.search(q, category=category, lang=lang, limit=limit, cursor=cursor))
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
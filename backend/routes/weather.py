@@ -1,9 +1,13 @@
 import os
+import sys
 import requests
 import logging
 import time
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 from ..schemas import WeatherResponse
+from ..prefetch import PincodePrefetcher
+from ..metrics import record_cache, span
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,46 +20,151 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
+WEATHER_API_BASE = os.getenv("WEATHER_API_BASE", "http://api.weatherapi.com/v1")
 CACHE_EXPIRY = 1800  
 weather_cache = {}
 
-@router.get("/weather", response_model=WeatherResponse)
-async def get_weather(pincode: str = Query(..., min_length=6, max_length=6)):
-    logger.info(f"Received request for weather data with pincode: {pincode}")
+# Only the fields read by the frontend WeatherCard/WeatherPage and the LLM context
+# are kept; the raw WeatherAPI forecastday carries dozens more per day and hour.
+DAY_FIELDS = (
+    "maxtemp_c", "mintemp_c", "avgtemp_c", "totalprecip_mm",
+    "avghumidity", "daily_chance_of_rain", "maxwind_kph", "uv",
+)
+HOUR_FIELDS = ("temp_c", "humidity", "chance_of_rain", "precip_mm", "wind_kph")
+
+
+def _compact_condition(condition: Optional[dict]) -> dict:
+    condition = condition or {}
+    # Condition texts and icon URLs repeat across days and pincodes, so intern them.
+    return {
+        "text": sys.intern(condition.get("text", "")),
+        "icon": sys.intern(condition.get("icon", "")),
+    }
+
+
+def compact_forecast(forecast_days: list) -> list:
+    """Projects raw WeatherAPI forecastday entries onto the fields the app uses."""
+    compact_days = []
+    for forecast_day in forecast_days:
+        day = forecast_day.get("day", {})
+        compact_day = {field: day.get(field) for field in DAY_FIELDS}
+        compact_day["condition"] = _compact_condition(day.get("condition"))
+        # Hourly values are stored column-wise (one list per field) rather than as
+        # 24 dicts per day, which is most of the saving for a full cache.
+        hours = forecast_day.get("hour", [])
+        hourly = {"time": [hour.get("time") for hour in hours]}
+        for field in HOUR_FIELDS:
+            hourly[field] = [hour.get(field) for hour in hours]
+        compact_days.append({
+            "date": forecast_day.get("date"),
+            "date_epoch": forecast_day.get("date_epoch"),
+            "day": compact_day,
+            "hourly": hourly,
+        })
+    return compact_days
+
+
+def select_forecast_fields(weather_data: WeatherResponse, fields: Optional[str] = None, hourly: bool = True) -> WeatherResponse:
+    """
+    Narrows a cached forecast for the response: `fields` is a comma-separated list of
+    day fields to keep (the condition is always included) and `hourly=False` drops
+    the hourly entries.
+    """
+    if fields is None and hourly:
+        return weather_data
 
+    day_fields = None
+    if fields:
+        day_fields = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = day_fields - set(DAY_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown forecast fields: {', '.join(sorted(unknown))}")
+
+    selected = []
+    for forecast_day in weather_data.forecast:
+        day = forecast_day["day"]
+        if day_fields is not None:
+            day = {field: value for field, value in day.items() if field in day_fields or field == "condition"}
+        projected = {"date": forecast_day["date"], "date_epoch": forecast_day["date_epoch"], "day": day}
+        if hourly:
+            projected["hourly"] = forecast_day.get("hourly", {})
+        selected.append(projected)
+    return WeatherResponse(forecast=selected)
+
+
+def get_cached_weather(pincode: str):
+    """Returns the cached forecast for a pincode if it has not expired yet."""
     if pincode in weather_cache:
         cached_data, timestamp = weather_cache[pincode]
         if time.time() - timestamp < CACHE_EXPIRY:
-            logger.info(f"[CACHE] HIT: Weather for pincode {pincode}")
             return cached_data
+    return None
 
-    if not WEATHER_API_KEY:
-        logger.error("Weather API key not found in environment variables.")
-        raise HTTPException(status_code=500, detail="Weather API key not configured")
 
-    # API URL
-    url = f"http://api.weatherapi.com/v1/forecast.json?key={WEATHER_API_KEY}&q=India {pincode}&days=7&aqi=no&alerts=no"
+def fetch_weather(pincode: str) -> WeatherResponse:
+    """
+    Fetches the 7-day forecast for a pincode from WeatherAPI and stores it in the cache.
+    Raises requests.exceptions.RequestException on upstream failures.
+    """
+    url = f"{WEATHER_API_BASE}/forecast.json?key={WEATHER_API_KEY}&q=India {pincode}&days=7&aqi=no&alerts=no"
     logger.debug(f"Constructed Weather API URL: {url}")
 
-    try:
-        logger.info(f"[CACHE] MISS: Fetching weather for pincode {pincode}")
-        response = requests.get(url)
-        logger.info(f"WeatherAPI responded with status code: {response.status_code}")
+    with span("upstream.weather"):
+        response = requests.get(url, timeout=10)
+    logger.info(f"WeatherAPI responded with status code: {response.status_code}")
 
-        response.raise_for_status()
-        data = response.json()
+    response.raise_for_status()
+    data = response.json()
 
-        logger.debug(f"Full API Response: {data}")
+    logger.debug(f"Full API Response: {data}")
 
-        forecast_days = data.get("forecast", {}).get("forecastday", [])
-        logger.info(f"Extracted forecast for {len(forecast_days)} days.")
+    forecast_days = data.get("forecast", {}).get("forecastday", [])
+    logger.info(f"Extracted forecast for {len(forecast_days)} days.")
 
-        weather_data = WeatherResponse(forecast=forecast_days)
-        
-        # Store in cache
-        weather_cache[pincode] = (weather_data, time.time())
+    weather_data = WeatherResponse(forecast=compact_forecast(forecast_days))
 
-        return weather_data
+    # Store in cache
+    weather_cache[pincode] = (weather_data, time.time())
+
+    return weather_data
+
+
+def _cached_at(pincode: str):
+    entry = weather_cache.get(pincode)
+    return entry[1] if entry else None
+
+
+# Keeps the forecasts of the busiest pincodes warm ahead of CACHE_EXPIRY.
+# Refreshes are spread out to stay within the WeatherAPI rate limit.
+weather_prefetcher = PincodePrefetcher(
+    refresh=fetch_weather,
+    cached_at=_cached_at,
+    ttl=CACHE_EXPIRY,
+    top_n=int(os.getenv("WEATHER_PREFETCH_TOP_N", "2000")),
+    lead_time=float(os.getenv("WEATHER_PREFETCH_LEAD_SECONDS", "300")),
+    max_per_minute=int(os.getenv("WEATHER_PREFETCH_MAX_PER_MINUTE", "100")),
+)
+
+
+def load_weather(pincode: str, fields: Optional[str] = None, hourly: bool = True) -> WeatherResponse:
+    """
+    Returns the forecast for a pincode from the cache or WeatherAPI. Blocks on a
+    cache miss, so callers on the event loop should run it in a thread.
+    Raises HTTPException if the forecast cannot be fetched.
+    """
+    cached_data = get_cached_weather(pincode)
+    record_cache("weather", cached_data is not None)
+    if cached_data is not None:
+        logger.info(f"[CACHE] HIT: Weather for pincode {pincode}")
+        return select_forecast_fields(cached_data, fields, hourly)
+
+    if not WEATHER_API_KEY:
+        logger.error("Weather API key not found in environment variables.")
+        raise HTTPException(status_code=500, detail="Weather API key not configured")
+
+    try:
+        logger.info(f"[CACHE] MISS: Fetching weather for pincode {pincode}")
+        weather_data = fetch_weather(pincode)
 
     except requests.exceptions.RequestException as e:
         logger.exception("Error while fetching data from WeatherAPI.")
@@ -64,3 +173,16 @@ async def get_weather(pincode: str = Query(..., min_length=6, max_length=6)):
     except Exception as e:
         logger.exception("Unexpected error occurred.")
         raise HTTPException(status_code=500, detail=str(e))
+
+    return select_forecast_fields(weather_data, fields, hourly)
+
+
+@router.get("/weather", response_model=WeatherResponse)
+async def get_weather(
+    pincode: str = Query(..., min_length=6, max_length=6),
+    fields: Optional[str] = Query(None, description="Comma-separated day fields to return"),
+    hourly: bool = Query(True, description="Include hourly entries"),
+):
+    logger.info(f"Received request for weather data with pincode: {pincode}")
+    weather_prefetcher.record_request(pincode)
+    return load_weather(pincode, fields, hourly)
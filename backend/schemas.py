@@ -21,6 +21,22 @@ class QueryResponse(BaseModel):
     weather: Optional[dict] = None
     market: Optional[dict] = None
 
+# Largest batch an SMS/IVR gateway may send to /api/query/query/batch.
+MAX_BATCH_QUERIES = 500
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+
+class BatchQueryResult(BaseModel):
+    response: Optional[str] = None
+    confidence: float = 0.0
+    sources: list = []
+    # Set instead of a response when this question could not be answered, e.g. for an unknown pincode.
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryResult]
+
 class WeatherResponse(BaseModel):
     forecast: list 
 
@@ -39,3 +55,27 @@ class MarketResponse(BaseModel):
 
 class SchemeResponse(BaseModel):
     schemes: list 
+
+class SchemeSearchResponse(BaseModel):
+    results: list
+    facets: Dict[str, int]
+    total: int
+    next_cursor: Optional[str] = None
+
+class CommodityTrend(BaseModel):
+    commodity: str
+    unit: str
+    latest_date: str
+    latest_modal_price: float
+    rolling_min_price: float
+    rolling_max_price: float
+    rolling_modal_price: float
+    week_over_week_change_pct: Optional[float] = None
+    best_mandi: Optional[str] = None
+    best_mandi_modal_price: Optional[float] = None
+    series: Optional[List[Dict[str, Any]]] = None
+
+class MarketTrendsResponse(BaseModel):
+    state: str
+    window_days: int
+    trends: list[CommodityTrend]
@@ -0,0 +1,176 @@
+import base64
+import bisect
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SEARCH_FIELDS = {"scheme_name": 3.0, "category": 2.0, "description": 1.0}
+LANGUAGES = ("en", "hi", "mr")
+
+# \w alone splits Devanagari words at vowel signs and viramas, so include the block.
+TOKEN_RE = re.compile(r"[\w\u0900-\u097F]+")
+
+
+class CursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+    pass
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.casefold())
+
+
+def _localized(scheme: dict, lang: str) -> dict:
+    """Returns the scheme with its fields replaced by the `lang` translation where present."""
+    localized = {field: value for field, value in scheme.items() if field != "translations"}
+    translation = scheme.get("translations", {}).get(lang)
+    if translation:
+        localized.update({field: value for field, value in translation.items() if field in SEARCH_FIELDS})
+    return localized
+
+
+def encode_cursor(score: float, doc_id: int) -> str:
+    raw = json.dumps([round(score, 6), doc_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, doc_id = json.loads(raw)
+        return float(score), int(doc_id)
+    except (ValueError, TypeError) as e:
+        raise CursorError(f"Invalid cursor: {cursor}") from e
+
+
+class SchemeSearchIndex:
+    """
+    In-memory inverted index over scheme names, categories and descriptions in
+    English and in any Hindi ("hi") or Marathi ("mr") translations carried by a
+    scheme under `translations`.
+
+    Each term's postings are a pair of arrays (doc ids, field-weighted term
+    frequencies). Queries score into a dense per-document array, so matching,
+    facet counting and ranking are array operations. Every query term is required
+    and the last one also matches as a prefix, for search-as-you-type.
+    """
+
+    def __init__(self, schemes: List[dict]):
+        self.schemes = schemes
+        postings: Dict[str, Tuple[List[int], List[float]]] = defaultdict(lambda: ([], []))
+
+        for doc_id, scheme in enumerate(schemes):
+            weights: Counter = Counter()
+            for lang in LANGUAGES:
+                fields = scheme if lang == "en" else scheme.get("translations", {}).get(lang, {})
+                for field, weight in SEARCH_FIELDS.items():
+                    for term in tokenize(str(fields.get(field) or "")):
+                        weights[term] += weight
+            for term, weight in weights.items():
+                doc_ids, term_weights = postings[term]
+                doc_ids.append(doc_id)
+                term_weights.append(weight)
+
+        n_docs = max(len(schemes), 1)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, (doc_ids, term_weights) in postings.items():
+            idf = math.log(1 + n_docs / len(doc_ids))
+            self.postings[term] = (np.asarray(doc_ids, dtype=np.int32), np.asarray(term_weights, dtype=np.float32) * idf)
+        self.vocabulary = sorted(self.postings)
+
+        categories = [scheme.get("category") or "Other" for scheme in schemes]
+        self.category_names = sorted(set(categories))
+        category_codes = {name.casefold(): code for code, name in enumerate(self.category_names)}
+        self.category_codes = category_codes
+        self.categories = np.asarray([category_codes[name.casefold()] for name in categories], dtype=np.int32)
+
+    def _prefix_terms(self, prefix: str, limit: int = 50) -> List[str]:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _match(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (doc ids, scores) of the documents matching every query term."""
+        n_docs = len(self.schemes)
+        terms = tokenize(query)
+        if not terms:
+            return np.arange(n_docs, dtype=np.int32), np.zeros(n_docs, dtype=np.float32)
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        matched = np.ones(n_docs, dtype=bool)
+        for position, term in enumerate(terms):
+            candidates = [term] if term in self.postings else []
+            if position == len(terms) - 1:
+                candidates += [t for t in self._prefix_terms(term) if t != term]
+            term_scores = np.zeros(n_docs, dtype=np.float32)
+            for candidate in candidates:
+                doc_ids, weights = self.postings[candidate]
+                term_scores[doc_ids] = np.maximum(term_scores[doc_ids], weights)
+            matched &= term_scores > 0
+            scores += term_scores
+        doc_ids = np.flatnonzero(matched).astype(np.int32)
+        return doc_ids, scores[doc_ids]
+
+    def search(
+        self,
+        query: str = "",
+        category: Optional[str] = None,
+        lang: str = "en",
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns one page of matching schemes, category facet counts for the query
+        (before the category filter is applied), the total number of matches and a
+        cursor for the next page.
+        """
+        doc_ids, scores = self._match(query)
+
+        facet_counts = np.bincount(self.categories[doc_ids], minlength=len(self.category_names))
+        facets = {
+            self.category_names[code]: int(facet_counts[code])
+            for code in np.argsort(-facet_counts, kind="stable")
+            if facet_counts[code]
+        }
+
+        if category:
+            code = self.category_codes.get(category.casefold(), -1)
+            keep = self.categories[doc_ids] == code
+            doc_ids, scores = doc_ids[keep], scores[keep]
+        total = len(doc_ids)
+
+        # Results are ordered by (score desc, doc id asc); scores are rounded so the
+        # order survives the round trip through the cursor.
+        scores = np.round(scores.astype(np.float64), 6)
+        if cursor:
+            last_score, last_doc_id = decode_cursor(cursor)
+            after = (scores < last_score) | ((scores == last_score) & (doc_ids > last_doc_id))
+            doc_ids, scores = doc_ids[after], scores[after]
+
+        # Only the page is ordered: keep everything scoring at least the (limit + 1)-th
+        # best score, ties included, so the doc id tie-break stays exact across pages.
+        if len(doc_ids) > limit + 1:
+            threshold = -np.partition(-scores, limit)[limit]
+            top = scores >= threshold
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.lexsort((doc_ids, -scores))
+        page = order[:limit]
+
+        next_cursor = None
+        if len(order) > limit:
+            next_cursor = encode_cursor(float(scores[page[-1]]), int(doc_ids[page[-1]]))
+
+        return {
+            "results": [_localized(self.schemes[doc_id], lang) for doc_id in doc_ids[page]],
+            "facets": facets,
+            "total": total,
+            "next_cursor": next_cursor,
+        }
@@ -0,0 +1,116 @@
+import mimetypes
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .http_cache import PrecompressedPayload, choose_encoding
+from .precompress import COMPRESSIBLE_EXTENSIONS
+
+# Vite emits only content-hashed file names under assets/, and uploads are named
+# after the SHA-256 of their content, so neither ever changes under the same URL.
+IMMUTABLE_PATH_RE = re.compile(r"^(assets/.+|uploads/[0-9a-f]{64}(_\w+)?\.\w+)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the `.br` / `.gz` sibling of a file when the client
+    accepts it (see backend/precompress.py, run at build time), and marks hashed
+    assets as immutable so browsers never revalidate them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (path, mtime) -> {encoding: (sibling path, sibling stat)}; siblings are
+        # looked up once per file version rather than on every request.
+        self._siblings: Dict[Tuple[str, int], Dict[str, Tuple[str, os.stat_result]]] = {}
+
+    def _find_siblings(self, full_path: str, stat_result: os.stat_result) -> Dict[str, Tuple[str, os.stat_result]]:
+        key = (full_path, stat_result.st_mtime_ns)
+        siblings = self._siblings.get(key)
+        if siblings is None:
+            siblings = {}
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                try:
+                    sibling_stat = os.stat(full_path + suffix)
+                except OSError:
+                    continue
+                if sibling_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+                    siblings[encoding] = (full_path + suffix, sibling_stat)
+            self._siblings[key] = siblings
+        return siblings
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if IMMUTABLE_PATH_RE.match(relative_path) else REVALIDATE_CACHE_CONTROL,
+        }
+
+        siblings = {}
+        if os.path.splitext(relative_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            siblings = self._find_siblings(str(full_path), stat_result)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""), siblings) if siblings else None
+        if siblings:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            full_path, stat_result = siblings[encoding]
+
+        media_type = mimetypes.guess_type(relative_path)[0] or "text/plain"
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class InMemoryIndex:
+    """
+    The SPA's index.html held in memory with gzip/brotli variants and an ETag,
+    re-read only when the file changes (checked at most every `check_interval` seconds).
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._payload: Optional[PrecompressedPayload] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._payload is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._payload is not None and now - self._checked_at < self.check_interval:
+                return
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                # Keep serving the last good copy, if any, while the file is replaced.
+                if self._payload is None:
+                    raise HTTPException(status_code=404, detail="Frontend has not been built.")
+                return
+            version = (stat.st_mtime_ns, stat.st_size)
+            if version != self._version:
+                with open(self.path, "rb") as f:
+                    self._payload = PrecompressedPayload(f.read(), media_type="text/html; charset=utf-8")
+                self._version = version
+            self._checked_at = now
+
+    def response(self, request: Request) -> Response:
+        self._refresh()
+        return self._payload.response(request)
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "static", "uploads")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_IMAGES_PER_LISTING = int(os.getenv("MAX_IMAGES_PER_LISTING", "8"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+CHUNK_SIZE = 256 * 1024
+# Refuse to decode images above this many pixels (about a 60 MP photo).
+MAX_IMAGE_PIXELS = 60_000_000
+
+# Longest side in pixels of each generated variant. "web" is what the gallery shows,
+# "thumb" what EquipmentCard shows; both are small enough for a 2G connection.
+VARIANTS = {"web": 1280, "thumb": 320}
+VARIANT_QUALITY = 75
+
+# Accepted image types, recognised by their leading bytes rather than the
+# client-supplied filename or content type.
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"RIFF", "webp"),
+)
+
+_image_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _sniff_extension(head: bytes) -> Optional[str]:
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            if extension == "webp" and head[8:12] != b"WEBP":
+                return None
+            return extension
+    return None
+
+
+def _store_original(source) -> Dict[str, str]:
+    """
+    Copies an uploaded file into UPLOAD_DIR in chunks, hashing it on the way, and
+    names it after its SHA-256 digest. A file that is already stored is not written
+    again; "created" says whether this call wrote it. Runs in a worker thread.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = source.read(CHUNK_SIZE)
+    extension = _sniff_extension(head)
+    if extension is None:
+        raise HTTPException(status_code=415, detail="Images must be JPEG, PNG or WebP.")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Each image must be at most {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.",
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+                chunk = source.read(CHUNK_SIZE)
+
+        name = digest.hexdigest()
+        path = os.path.join(UPLOAD_DIR, f"{name}.{extension}")
+        created = not os.path.exists(path)
+        if created:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {"name": name, "path": path, "created": created}
+
+
+def make_variants(path: str, name: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Writes the downscaled WebP variants of an original image, skipping ones that
+    already exist. Returns their file names by variant and the names of the ones
+    written by this call. Runs in a worker process.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    filenames = {variant: f"{name}_{variant}.webp" for variant in VARIANTS}
+    missing = {
+        variant: size for variant, size in VARIANTS.items()
+        if not os.path.exists(os.path.join(UPLOAD_DIR, filenames[variant]))
+    }
+    if not missing:
+        return filenames, []
+
+    with Image.open(path) as image:
+        largest = max(missing.values())
+        # Lets the JPEG decoder scale down by up to 8x while decoding.
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        # Largest first, so each smaller variant is resized from the previous one.
+        for variant, size in sorted(missing.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.LANCZOS)
+            target = os.path.join(UPLOAD_DIR, filenames[variant])
+            tmp_target = f"{target}.{os.getpid()}.part"
+            image.save(tmp_target, "WEBP", quality=VARIANT_QUALITY, method=4)
+            os.replace(tmp_target, target)
+    return filenames, [filenames[variant] for variant in missing]
+
+
+def _get_image_executor() -> ProcessPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _image_executor
+
+
+def shutdown_image_executor():
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False, cancel_futures=True)
+        _image_executor = None
+
+
+async def save_image(upload: UploadFile, base_url: str, created: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Stores one uploaded image and its variants, returning their URLs under
+    "original", "web" and "thumb". Storing happens on a worker thread and resizing
+    in the image process pool, so neither blocks the event loop. The paths of the
+    files this call writes (rather than finds already stored) are appended to
+    `created`.
+    """
+    try:
+        stored = await asyncio.to_thread(_store_original, upload.file)
+    finally:
+        await upload.close()
+
+    loop = asyncio.get_running_loop()
+    try:
+        filenames, written = await loop.run_in_executor(
+            _get_image_executor(), make_variants, stored["path"], stored["name"]
+        )
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"Could not process image {upload.filename}: {e}")
+        # Not a decodable image, so no listing can be referring to it.
+        if os.path.exists(stored["path"]):
+            os.remove(stored["path"])
+        raise HTTPException(status_code=400, detail=f"Could not process image {upload.filename}.")
+
+    if created is not None:
+        if stored["created"]:
+            created.append(stored["path"])
+        created.extend(os.path.join(UPLOAD_DIR, filename) for filename in written)
+
+    urls = {"original": f"{base_url}/static/uploads/{os.path.basename(stored['path'])}"}
+    for variant, filename in filenames.items():
+        urls[variant] = f"{base_url}/static/uploads/{filename}"
+    return urls
+
+
+async def save_images(uploads: List[UploadFile], base_url: str, created: List[str]) -> List[Dict[str, str]]:
+    """
+    Stores several uploaded images concurrently (see save_image). If any of them
+    fails, the files written for the others are removed before its error is raised,
+    so a rejected upload leaves nothing behind.
+    """
+    results = await asyncio.gather(*(save_image(upload, base_url, created) for upload in uploads), return_exceptions=True)
+    failure = next((result for result in results if isinstance(result, BaseException)), None)
+    if failure is not None:
+        discard_files(created)
+        raise failure
+    return results
+
+
+def discard_files(paths: List[str]):
+    """Removes stored upload files, e.g. those of a listing that could not be created."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove upload {path}: {e}")
@@ -0,0 +1,304 @@
+"""
+Checks AdmissionControlMiddleware (backend/asgi_middleware.py, backend/admission.py)
+under concurrent load and measures its per-request cost. The app is a stand-in
+with the real route layout: /api/query/query waits on a fake LLM that serves
+`--llm-slots` calls at a time (the Groq quota), /api/schemes/schemes answers at
+once. Requests go through the ASGI interface via httpx, clients are told apart
+by X-Forwarded-For.
+
+- fairness: one scraper on `--scraper-connections` connections hammers
+  /api/query, forging a new X-Forwarded-For address on every request, while
+  farmers ask a question every few seconds. Without admission
+  control the scraper fills the LLM slots and the farmers queue behind it; with
+  it the scraper gets 429s and the farmers get through.
+- ceiling: `--burst-clients` distinct clients ask at the same moment; no more
+  than the concurrency limit may reach the LLM routes, and the rest get 429.
+- retry-after: a client that drains its bucket is told when to come back, and
+  is admitted when it does.
+- batches: a batch is charged for every question, one too big for the caller's
+  bucket gets 413, and its LLM calls share the concurrency ceiling with single
+  questions.
+- shared buckets: two middleware instances ("workers") share one MongoDB
+  bucket store (mongomock here), so a client spreading requests over both gets
+  one budget, not two.
+
+Exits non-zero if any check fails. Run from the repository root:
+
+    python -m benchmarks.admission_control [--seconds 6] [--llm-latency-ms 200] [--llm-slots 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import Body, FastAPI, Request
+
+os.environ.setdefault("MONGO_URI", "mongomock://admission-control")
+# mongomock is not thread-safe; keep its calls on one thread.
+os.environ.setdefault("MONGO_MAX_POOL_SIZE", "1")
+
+from backend.admission import QUESTION_COST, LLMSlots, MemoryBucketStore, MongoBucketStore, charge, route_cost  # noqa: E402
+from backend.asgi_middleware import AdmissionControlMiddleware  # noqa: E402
+
+
+class FakeLLM:
+    def __init__(self, slots, latency):
+        self.slots = asyncio.Semaphore(slots)
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+
+    async def answer(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            async with self.slots:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+
+def build_app(llm, store=None, llm_concurrency=16, key_store=None, api_keys=frozenset()):
+    app = FastAPI()
+    slots = LLMSlots(llm_concurrency)
+
+    @app.post("/api/query/query")
+    async def query():
+        await llm.answer()
+        return {"response": "ok"}
+
+    @app.post("/api/query/query/batch")
+    async def batch(request: Request, queries: list = Body(..., embed=True)):
+        # As handle_query_batch and get_ai_responses_batch do it.
+        await charge(request, QUESTION_COST * (len(queries) - 1))
+        semaphore = asyncio.Semaphore(8)
+
+        async def generate():
+            async with semaphore, slots:
+                await llm.answer()
+
+        await asyncio.gather(*(generate() for _ in queries))
+        return {"results": len(queries)}
+
+    @app.get("/api/schemes/schemes")
+    async def schemes():
+        return {"schemes": []}
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    if store is not None:
+        app.add_middleware(
+            AdmissionControlMiddleware, store=store, llm_slots=slots, key_store=key_store, api_keys=api_keys, proxy_hops=1
+        )
+    return app
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=120)
+
+
+async def fairness(args, admission):
+    llm = FakeLLM(args.llm_slots, args.llm_latency_ms / 1000)
+    store = MemoryBucketStore(args.rate, args.burst) if admission else None
+    app = build_app(llm, store, args.llm_concurrency)
+    deadline = time.perf_counter() + args.seconds
+    scraper = {"ok": 0, "rejected": 0}
+    farmer_latencies, farmer_rejections = [], 0
+
+    async def scrape(client):
+        while time.perf_counter() < deadline:
+            # A forged address on the left of the one the (single, trusted) proxy appended.
+            forged = f"10.{scraper['ok'] % 250}.{scraper['rejected'] % 250}.1, 203.0.113.9"
+            response = await client.post("/api/query/query", headers={"x-forwarded-for": forged})
+            if response.status_code == 429:
+                scraper["rejected"] += 1
+                # A scraper that ignores Retry-After, slowed only by the response time.
+                await asyncio.sleep(0.01)
+            else:
+                scraper["ok"] += 1
+
+    async def farm(client, n):
+        nonlocal farmer_rejections
+        await asyncio.sleep(n * args.farmer_interval / args.farmers)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post("/api/query/query", headers={"x-forwarded-for": f"198.51.100.{n}"})
+            farmer_latencies.append(time.perf_counter() - started)
+            farmer_rejections += response.status_code == 429
+            await asyncio.sleep(args.farmer_interval)
+
+    async with client_for(app) as client:
+        await asyncio.gather(
+            *(scrape(client) for _ in range(args.scraper_connections)),
+            *(farm(client, n) for n in range(args.farmers)),
+        )
+    farmer_latencies.sort()
+    return {
+        "farmer_p50_ms": statistics.median(farmer_latencies) * 1e3,
+        "farmer_p95_ms": farmer_latencies[int(0.95 * (len(farmer_latencies) - 1))] * 1e3,
+        "farmer_requests": len(farmer_latencies),
+        "farmer_rejections": farmer_rejections,
+        "scraper_ok": scraper["ok"],
+        "scraper_rejected": scraper["rejected"],
+    }
+
+
+async def ceiling(args):
+    llm = FakeLLM(args.burst_clients, args.llm_latency_ms / 1000)
+    app = build_app(llm, MemoryBucketStore(args.rate, args.burst), args.llm_concurrency)
+    async with client_for(app) as client:
+        responses = await asyncio.gather(*(
+            client.post("/api/query/query", headers={"x-forwarded-for": f"10.0.{n // 250}.{n % 250}"})
+            for n in range(args.burst_clients)
+        ))
+    rejected = [r for r in responses if r.status_code == 429]
+    return llm.peak, len(responses) - len(rejected), rejected
+
+
+async def retry_after(args):
+    llm = FakeLLM(1, 0)
+    # A fast refill so the check takes about a second.
+    rate = route_cost("/api/query") * 2
+    app = build_app(llm, MemoryBucketStore(rate, rate), args.llm_concurrency)
+    headers = {"x-forwarded-for": "203.0.113.77"}
+    async with client_for(app) as client:
+        admitted = 0
+        while (response := await client.post("/api/query/query", headers=headers)).status_code == 200:
+            admitted += 1
+        wait = int(response.headers.get("retry-after", "0"))
+        await asyncio.sleep(wait)
+        again = await client.post("/api/query/query", headers=headers)
+        schemes = await client.get("/api/schemes/schemes", headers=headers)
+        health = [await client.get("/healthz", headers=headers) for _ in range(50)]
+    return admitted, wait, again.status_code, schemes.status_code, {r.status_code for r in health}
+
+
+async def shared_buckets(args):
+    from backend.db import db
+    collection = db.rate_limits_benchmark
+    collection.delete_many({})
+    burst = route_cost("/api/query") * 5
+    # A negligible refill, so every admission comes out of the shared burst.
+    apps = [build_app(FakeLLM(1, 0), MongoBucketStore(collection, 0.001, burst), args.llm_concurrency) for _ in range(2)]
+    headers = {"x-forwarded-for": "203.0.113.50"}
+    admitted = 0
+    async with client_for(apps[0]) as first, client_for(apps[1]) as second:
+        for n in range(20):
+            response = await (first, second)[n % 2].post("/api/query/query", headers=headers)
+            admitted += response.status_code == 200
+    return admitted, int(burst / route_cost("/api/query"))
+
+
+async def batches(args):
+    llm = FakeLLM(1000, args.llm_latency_ms / 1000)
+    key_store = MemoryBucketStore(args.rate * 10, 500 * QUESTION_COST)
+    app = build_app(llm, MemoryBucketStore(args.rate, args.burst), args.llm_concurrency, key_store, frozenset({"gateway"}))
+    questions = int(args.burst // QUESTION_COST) - 1
+    async with client_for(app) as client:
+        ip = {"x-forwarded-for": "203.0.113.60"}
+        first = await client.post("/api/query/query/batch", json={"queries": ["q"] * questions}, headers=ip)
+        second = await client.post("/api/query/query/batch", json={"queries": ["q"] * questions}, headers=ip)
+        oversized = await client.post(
+            "/api/query/query/batch", json={"queries": ["q"] * 100}, headers={"x-forwarded-for": "203.0.113.61"}
+        )
+        gateway, *singles = await asyncio.gather(
+            client.post("/api/query/query/batch", json={"queries": ["q"] * 200}, headers={"x-api-key": "gateway"}),
+            *(client.post("/api/query/query", headers={"x-forwarded-for": f"10.1.0.{n}"}) for n in range(20)),
+        )
+    return {
+        "questions": questions,
+        "statuses": (first.status_code, second.status_code, oversized.status_code),
+        "retry_after": second.headers.get("retry-after"),
+        "gateway": gateway.status_code,
+        "singles": sum(r.status_code == 200 for r in singles),
+        "peak": llm.peak,
+    }
+
+
+async def overhead(requests):
+    timings = {}
+    for label, store in (("no admission control", None), ("memory buckets", MemoryBucketStore(1e9, 1e9))):
+        app = build_app(FakeLLM(1, 0), store)
+        async with client_for(app) as client:
+            await client.get("/api/schemes/schemes")
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get("/api/schemes/schemes")
+            timings[label] = (time.perf_counter() - started) / requests * 1e6
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-slots", type=int, default=4, help="Concurrent calls the fake LLM quota allows")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="The middleware's ceiling on LLM routes")
+    parser.add_argument("--rate", type=float, default=2)
+    parser.add_argument("--burst", type=float, default=60)
+    parser.add_argument("--scraper-connections", type=int, default=20)
+    parser.add_argument("--farmers", type=int, default=5)
+    parser.add_argument("--farmer-interval", type=float, default=2, help="Seconds between a farmer's questions")
+    parser.add_argument("--burst-clients", type=int, default=100)
+    parser.add_argument("--overhead-requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(ok, message):
+        print(f"  [{'ok' if ok else 'FAIL'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    print(f"fairness: 1 scraper x {args.scraper_connections} connections, {args.farmers} farmers, "
+          f"LLM {args.llm_slots} slots x {args.llm_latency_ms:.0f} ms, {args.seconds:.0f}s")
+    results = {admission: asyncio.run(fairness(args, admission)) for admission in (False, True)}
+    for admission, r in results.items():
+        print(f"  {'with' if admission else 'without':7} admission control: farmers p50 {r['farmer_p50_ms']:7.0f} ms, "
+              f"p95 {r['farmer_p95_ms']:7.0f} ms, {r['farmer_requests']} asked, {r['farmer_rejections']} rejected; "
+              f"scraper {r['scraper_ok']} answered, {r['scraper_rejected']} rejected")
+    with_admission = results[True]
+    check(with_admission["farmer_rejections"] == 0, "farmers are never rejected")
+    check(with_admission["farmer_p95_ms"] < 2 * args.llm_latency_ms + 50, "farmers wait for no one but the LLM")
+    check(with_admission["scraper_ok"] <= args.burst / route_cost("/api/query") + args.seconds * args.rate / route_cost("/api/query") + 1,
+          "the scraper gets no more than its bucket allows")
+
+    peak, admitted, rejected = asyncio.run(ceiling(args))
+    print(f"ceiling: {args.burst_clients} clients at once, limit {args.llm_concurrency}: "
+          f"peak {peak} in the LLM route, {admitted} admitted, {len(rejected)} rejected")
+    check(peak <= args.llm_concurrency, "the concurrency ceiling holds")
+    check(all(r.headers.get("retry-after") for r in rejected), "every 429 carries Retry-After")
+
+    admitted, wait, again, schemes, health = asyncio.run(retry_after(args))
+    print(f"retry-after: {admitted} questions admitted, then told to retry after {wait}s; "
+          f"after waiting: query {again}, schemes {schemes}, /healthz {sorted(health)}")
+    check(wait >= 1 and again == 200, "a client that waits Retry-After is admitted")
+    check(health == {200}, "free routes are never limited")
+
+    r = asyncio.run(batches(args))
+    print(f"batches: two batches of {r['questions']} from one IP -> {r['statuses'][0]}, {r['statuses'][1]} "
+          f"(Retry-After {r['retry_after']}), 100 questions -> {r['statuses'][2]}; a 200-question gateway batch "
+          f"-> {r['gateway']} alongside {r['singles']}/20 admitted single questions, peak {r['peak']} LLM calls")
+    check(r["statuses"] == (200, 429, 413) and r["retry_after"], "a batch pays for every question")
+    check(r["gateway"] == 200, "an API-key caller's bucket pays for a large batch")
+    check(r["peak"] <= args.llm_concurrency, "batch LLM calls count against the concurrency ceiling")
+
+    admitted, budget = asyncio.run(shared_buckets(args))
+    print(f"shared buckets: {admitted} of 20 questions admitted across 2 workers, budget {budget}")
+    check(admitted == budget, "workers sharing the MongoDB store share one budget")
+
+    timings = asyncio.run(overhead(args.overhead_requests))
+    print("overhead on /api/schemes/schemes: " + ", ".join(f"{label} {us:.0f} us" for label, us in timings.items()))
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Measures the per-request overhead of the response middleware: the previous
+BaseHTTPMiddleware CSP middleware against the pure ASGI SecurityHeadersMiddleware,
+and the cost and size saving of CompressionMiddleware on a weather-sized JSON body.
+
+Requests are driven straight through the ASGI interface, without a server or test
+client, so the numbers are the middleware and routing cost alone.
+
+Run from the repository root:
+
+    python -m benchmarks.asgi_middleware [requests]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from backend.asgi_middleware import CompressionMiddleware, SecurityHeadersMiddleware
+
+CSP_PARTS = (
+    "default-src 'self'; ",
+    "script-src 'self' https://agrisaathi.onrender.com 'unsafe-inline'; ",
+    "script-src-elem 'self' https://agrisaathi.onrender.com; ",
+    "script-src-attr 'self' https://agrisaathi.onrender.com 'unsafe-inline'; ",
+    "style-src 'self' https://agrisaathi.onrender.com 'unsafe-inline' https://fonts.googleapis.com; ",
+    "img-src 'self' data: https://agrisaathi.onrender.com; ",
+    "font-src 'self' https://fonts.gstatic.com; ",
+    "connect-src 'self' https://agrisaathi.onrender.com; ",
+    "frame-src 'self'; ",
+    "object-src 'none'; ",
+    "base-uri 'self'; ",
+    "form-action 'self';",
+)
+
+
+class CSPMiddleware(BaseHTTPMiddleware):
+    """The middleware as it was before: the policy string is rebuilt per request."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers["Content-Security-Policy"] = "".join(CSP_PARTS)
+        return response
+
+
+def weather_body():
+    random.seed(0)
+    days = [
+        {"date": f"2025-06-{day:02d}", "day": {field: round(random.uniform(0, 40), 1) for field in (
+            "maxtemp_c", "mintemp_c", "avgtemp_c", "totalprecip_mm", "avghumidity", "daily_chance_of_rain", "maxwind_kph", "uv")},
+         "hourly": {field: [round(random.uniform(0, 40), 1) for _ in range(24)] for field in (
+            "temp_c", "humidity", "precip_mm", "chance_of_rain", "wind_kph")}}
+        for day in range(1, 8)
+    ]
+    return json.dumps({"location": "Nagpur", "forecast": days}).encode("utf-8")
+
+
+def build_app(body, middleware):
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/weather")
+    async def weather():
+        return Response(body, media_type="application/json")
+
+    for cls, options in middleware:
+        app.add_middleware(cls, **options)
+    return app
+
+
+async def call(app, path, headers):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sum(len(message.get("body", b"")) for message in sent)
+
+
+async def measure(app, path, headers, requests):
+    await call(app, path, headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        size = await call(app, path, headers)
+    return (time.perf_counter() - started) / requests * 1e6, size
+
+
+async def run(requests):
+    body = weather_body()
+    csp = {"Content-Security-Policy": "".join(CSP_PARTS)}
+    apps = {
+        "no middleware": build_app(body, []),
+        "BaseHTTPMiddleware CSP": build_app(body, [(CSPMiddleware, {})]),
+        "ASGI security headers": build_app(body, [(SecurityHeadersMiddleware, {"headers": csp})]),
+        "ASGI headers + compression": build_app(body, [
+            (CompressionMiddleware, {"minimum_size": 1024}), (SecurityHeadersMiddleware, {"headers": csp}),
+        ]),
+    }
+    cases = [("/small", "br", list(apps))]
+    cases += [("/weather", "br", list(apps))]
+    cases += [("/weather", encoding, ["ASGI headers + compression"]) for encoding in ("gzip", "identity")]
+    for path, encoding, labels in cases:
+        print(f"{path} (Accept-Encoding: {encoding})")
+        for label in labels:
+            per_request, size = await measure(apps[label], path, [(b"accept-encoding", encoding.encode())], requests)
+            print(f"  {label:<28} {per_request:8.1f} us/request  {size:6d} body bytes")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    asyncio.run(run(requests))
+
+
+if __name__ == "__main__":
+    main()
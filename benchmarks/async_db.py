@@ -0,0 +1,147 @@
+"""
+Checks the async data-access layer of backend/db.py (AsyncCollection, run_db)
+against the in-memory mongomock stand-in:
+
+- results: every AsyncCollection operation returns what the pymongo call does.
+- event loop: slow database calls run on the database pool, so a ticker on the
+  event loop keeps its pace while they are in flight.
+- bounded pool: no more than MONGO_MAX_POOL_SIZE calls run at once; the rest queue.
+- metrics: each call is recorded under "<collection>.<operation>", and a call
+  that raises is counted as an error and the exception reaches the caller.
+
+Exits non-zero if any check fails. Run from the repository root:
+
+    python -m benchmarks.async_db [--slow-ms 200] [--calls 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("MONGO_URI", "mongomock://async-db")
+# Two threads so the pool bound is observable; the mongomock calls below are
+# awaited one at a time, since mongomock is not thread-safe.
+os.environ.setdefault("MONGO_MAX_POOL_SIZE", "2")
+
+from pymongo import ASCENDING, DESCENDING  # noqa: E402
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+from backend.db import MONGO_MAX_POOL_SIZE, AsyncDatabase, db, db_metrics, run_db  # noqa: E402
+
+
+async def results(check):
+    collection = db.async_db_check
+    collection.drop()
+    probe = AsyncDatabase(db).async_db_check
+
+    inserted = await probe.insert_one({"_id": 1, "crop": "wheat", "price": 2200})
+    await probe.insert_many([
+        {"_id": 2, "crop": "rice", "price": 2100},
+        {"_id": 3, "crop": "wheat", "price": 2400},
+        {"_id": 4, "crop": "onion", "price": 1500},
+    ])
+    check(inserted.inserted_id == 1, "insert_one returns the inserted id")
+    check(await probe.find_one({"_id": 3}) == collection.find_one({"_id": 3}), "find_one matches pymongo")
+
+    found = await probe.find({"crop": "wheat"}, {"price": 1}, sort=[("price", DESCENDING)], limit=1)
+    check(found == [{"_id": 3, "price": 2400}], "find applies projection, sort and limit")
+    check(
+        await probe.find(sort=[("_id", ASCENDING)]) == list(collection.find().sort("_id", ASCENDING)),
+        "find without a filter returns every document",
+    )
+
+    updated = await probe.update_one({"_id": 4}, {"$set": {"price": 1600}})
+    many = await probe.update_many({"crop": "wheat"}, {"$inc": {"price": 100}})
+    check(updated.modified_count == 1 and many.modified_count == 2, "update_one and update_many report their counts")
+    check(collection.find_one({"_id": 1})["price"] == 2300, "updates reach the collection")
+
+    check(await probe.count_documents({"crop": "wheat"}) == 2, "count_documents matches")
+    grouped = await probe.aggregate([{"$group": {"_id": "$crop", "n": {"$sum": 1}}}, {"$sort": {"_id": 1}}])
+    check(grouped == [{"_id": "onion", "n": 1}, {"_id": "rice", "n": 1}, {"_id": "wheat", "n": 2}],
+          "aggregate materializes the pipeline result")
+
+    deleted = await probe.delete_one({"_id": 2})
+    check(deleted.deleted_count == 1 and collection.count_documents({}) == 3, "delete_one removes the document")
+
+    try:
+        await probe.insert_one({"_id": 1})
+        raised = False
+    except DuplicateKeyError:
+        raised = True
+    check(raised, "a failing operation raises in the caller")
+
+    stats = db_metrics()
+    check(stats.get("async_db_check.insert_one", {}).get("count") == 2, "calls are recorded per collection and operation")
+    check(stats.get("async_db_check.insert_one", {}).get("errors") == 1, "the failed call is counted as an error")
+    check(AsyncDatabase(db).async_db_check.collection is collection, "AsyncDatabase wraps the named collection")
+    collection.drop()
+
+
+async def event_loop(args, check):
+    slow_seconds = args.slow_ms / 1000
+    in_flight = peak = 0
+    lock = threading.Lock()
+
+    def slow_call():
+        # Stands in for a slow query: holds a pool thread without yielding.
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(slow_seconds)
+        with lock:
+            in_flight -= 1
+
+    gaps = []
+
+    async def ticker(stop):
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    stop = asyncio.Event()
+    ticking = asyncio.create_task(ticker(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(run_db("async_db_check.slow", slow_call) for _ in range(args.calls)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticking
+
+    waves = -(-args.calls // MONGO_MAX_POOL_SIZE)
+    print(f"event loop: {args.calls} calls of {args.slow_ms:.0f} ms on {MONGO_MAX_POOL_SIZE} threads took "
+          f"{elapsed * 1000:.0f} ms; longest ticker gap {max(gaps) * 1000:.1f} ms; peak {peak} in flight")
+    check(max(gaps) < min(0.05, slow_seconds / 2), "slow database calls do not block the event loop")
+    check(peak == min(args.calls, MONGO_MAX_POOL_SIZE), "no more calls run at once than the pool allows")
+    check(elapsed >= waves * slow_seconds * 0.9, "calls beyond the pool size queue for a thread")
+    check(db_metrics().get("async_db_check.slow", {}).get("count") == args.calls, "run_db records every call")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slow-ms", type=float, default=200, help="Duration of each simulated slow query")
+    parser.add_argument("--calls", type=int, default=8, help="Slow queries issued at once")
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(ok, message):
+        print(f"  [{'ok' if ok else 'FAIL'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    print("results: AsyncCollection against mongomock")
+    asyncio.run(results(check))
+    asyncio.run(event_loop(args, check))
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compares questions per second through the batch endpoint
+(/api/query/query/batch) with the single-question endpoint (/api/query/query)
+driven at the same concurrency, end to end against the fake upstreams of
+benchmarks/fake_upstreams.py.
+
+The app runs the real pipeline with the ONNX embedding backend. Pass
+`--model-dir` for an exported model (python -m backend.ai.onnx_export). Without
+it, a random-weight MiniLM-shaped model is built (see
+benchmarks/embedding_backends.py), which is enough to time retrieval. The
+knowledge-base index is built into a temporary directory.
+
+Run from the repository root:
+
+    python -m benchmarks.batch_query [--questions 400] [--batch-size 200] [--concurrency 8]
+        [--pincodes 50] [--llm-latency-ms 300]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import time
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeUpstreams
+from benchmarks.load_test import QUESTIONS, free_port, start_app, wait_until_up
+
+LANGUAGES = ["english", "hindi"]
+
+
+async def single(client, questions, concurrency):
+    pending = list(questions)
+    errors = 0
+
+    async def user():
+        nonlocal errors
+        while pending:
+            response = await client.post("/api/query/query", json=pending.pop())
+            errors += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return time.perf_counter() - started, errors
+
+
+async def batched(client, questions, batch_size):
+    errors = 0
+    started = time.perf_counter()
+    for start in range(0, len(questions), batch_size):
+        response = await client.post("/api/query/query/batch", json={"queries": questions[start:start + batch_size]})
+        if response.status_code != 200:
+            errors += len(questions[start:start + batch_size])
+        else:
+            errors += sum(result["error"] is not None for result in response.json()["results"])
+    return time.perf_counter() - started, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel single requests, and the batch LLM concurrency cap")
+    parser.add_argument("--pincodes", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--model-dir")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    os.environ["BATCH_LLM_CONCURRENCY"] = str(args.concurrency)
+
+    random.seed(0)
+    pincode_list = [str(pincode) for pincode in random.sample(range(110001, 855999), args.pincodes)]
+    questions = [
+        {"query": random.choice(QUESTIONS), "language": random.choice(LANGUAGES), "pincode": random.choice(pincode_list)}
+        for _ in range(args.questions)
+    ]
+
+    upstream_port, port = free_port(), free_port()
+    upstreams = multiprocessing.Process(
+        target=FakeUpstreams(args.latency_ms, args.llm_latency_ms).serve, args=("127.0.0.1", upstream_port), daemon=True
+    )
+    upstreams.start()
+    app_args = argparse.Namespace(
+        mongo_uri="mongomock://batch-query", pincode_list=pincode_list, workers=1, verbose=args.verbose,
+        model_dir=args.model_dir,
+    )
+    app = start_app(app_args, f"http://127.0.0.1:{upstream_port}", port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    async def run():
+        await wait_until_up(base_url)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=600) as client:
+            status = (await client.get("/readyz")).json()
+            if status.get("ai") != "ready":
+                raise RuntimeError(f"AI pipeline did not load: {status}")
+            # Warm the location, weather and answer paths once before timing.
+            await client.post("/api/query/query", json=questions[0])
+            return await single(client, questions, args.concurrency), await batched(client, questions, args.batch_size)
+
+    try:
+        (single_seconds, single_errors), (batch_seconds, batch_errors) = asyncio.run(run())
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        upstreams.terminate()
+
+    n = len(questions)
+    print(f"{n} questions over {args.pincodes} pincodes, concurrency {args.concurrency}, fake LLM {args.llm_latency_ms:.0f} ms")
+    print(f"single: {n / single_seconds:7.1f} questions/s  ({single_seconds:.1f}s, {single_errors} errors)")
+    print(f"batch:  {n / batch_seconds:7.1f} questions/s  ({batch_seconds:.1f}s, {batch_errors} errors, batches of {args.batch_size})")
+    print(f"speedup {single_seconds / batch_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Times booking creation (with its atomic overlap check) and availability lookups for
+one piece of equipment that already has thousands of bookings.
+
+Uses MONGO_URI if set (point it at a local mongod for representative numbers),
+otherwise the in-memory mongomock stand-in.
+
+Run from the repository root:
+
+    python -m benchmarks.booking_calendar [bookings]
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("MONGO_URI", "mongomock://benchmark")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3
+    return f"p50 {pick(0.5):7.2f} ms  p95 {pick(0.95):7.2f} ms"
+
+
+def main():
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from bson import ObjectId
+    from backend.db import db
+    from backend.routes import agri_share
+
+    db.bookings.drop()
+    db.booking_calendar.drop()
+    equipment_id = db.equipment.insert_one(
+        {"name": "Benchmark tractor", "availability_status": True, "owner_id": ObjectId()}
+    ).inserted_id
+
+    app = FastAPI()
+    app.include_router(agri_share.router, prefix="/api/agri-share")
+    client = TestClient(app)
+
+    def book(start_day, days):
+        return client.post("/api/agri-share/agri-share/bookings", json={
+            "equipment_id": str(equipment_id), "renter_id": str(ObjectId()),
+            "start_date": start_day.isoformat(), "end_date": (start_day + timedelta(days=days - 1)).isoformat(),
+            "total_price": 1500.0 * days,
+        })
+
+    # Two-day bookings with a one-day gap, so the calendar is dense.
+    samples, day = [], date(2020, 1, 1)
+    for _ in range(bookings):
+        started = time.perf_counter()
+        assert book(day, 2).status_code == 200
+        samples.append(time.perf_counter() - started)
+        day += timedelta(days=3)
+    print(f"create booking ({bookings} bookings)    {percentiles(samples[-200:])}  (last 200)")
+
+    samples, conflicts = [], 0
+    for i in range(200):
+        started = time.perf_counter()
+        conflicts += book(date(2020, 1, 1) + timedelta(days=3 * i + 1), 2).status_code == 409
+        samples.append(time.perf_counter() - started)
+    print(f"overlapping booking rejected       {percentiles(samples)}  ({conflicts}/200 got 409)")
+
+    for span in (30, 90, 365):
+        samples = []
+        for i in range(200):
+            start_day = date(2020, 1, 1) + timedelta(days=(i * 7) % (3 * bookings))
+            params = {"start_date": start_day.isoformat(), "end_date": (start_day + timedelta(days=span - 1)).isoformat()}
+            started = time.perf_counter()
+            client.get(f"/api/agri-share/agri-share/equipment/{equipment_id}/availability", params=params)
+            samples.append(time.perf_counter() - started)
+        print(f"availability over {span:>3} days         {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Measures what dropping near-duplicate documents and re-ranking by maximal
+marginal relevance (backend/ai/context_selection.py) saves in the prompt, on the
+recorded questions in benchmarks/query_set.txt.
+
+The knowledge base in data/ is indexed the way the retriever indexes it, with
+`--copies` extra copies of every scheme record tagged with a state, like the
+near-identical entries that come from importing the same central scheme from
+several state portals. For every question the plain top-k and the diversified
+top-k are built into the prompt through the pipeline's own truncation, and
+their token counts (llama_pipeline.count_tokens) are compared. The report also
+shows how many distinct records each context holds and how relevant its
+documents are to the question, so a reduction that only drops useful context
+is visible.
+
+Pass `--model-dir` to embed with the ONNX backend and an exported model
+(python -m backend.ai.onnx_export). Without it, texts are embedded as hashed
+bags of words: near-identical records still get near-identical vectors and
+questions land near records sharing their words, which is enough to judge the
+selection when the real model can't be downloaded. (A random-weight model, as
+in benchmarks/embedding_backends.py, maps every text to nearly the same vector
+and is no use here.)
+
+Run from the repository root:
+
+    python -m benchmarks.context_diversity [--copies 3] [--fetch-k 5] [--dedup-threshold 0.95] [--mmr-lambda 0.7]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+
+from backend.ai.context_selection import normalize_rows
+from backend.ai.embeddings import OnnxEmbeddings
+from backend.ai.llama_pipeline import PROMPT, _prepare_chain_input, count_tokens
+from backend.ai.retriever import DATA_DIR, SafeVectorStoreRetriever, load_knowledge_base
+from benchmarks.fake_upstreams import DISTRICTS
+
+QUERY_SET = os.path.join(os.path.dirname(__file__), "query_set.txt")
+STATES = list(dict.fromkeys(state for _, state in DISTRICTS))
+LOCATION = {"district": "Pune", "state": "Maharashtra"}
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words vectors with words hashed into `dimensions` buckets."""
+
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.dimensions] += 1
+        return normalize_rows(vectors)
+
+    def embed_documents(self, texts):
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+def load_queries(path=QUERY_SET):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def build_documents(copies):
+    """The knowledge base plus `copies` state-tagged copies of each scheme record."""
+    documents = load_knowledge_base()
+    with open(os.path.join(DATA_DIR, "schemes.json"), encoding="utf-8") as f:
+        schemes = json.load(f)
+    for n, scheme in enumerate(schemes):
+        for c in range(copies):
+            record = dict(scheme, state=STATES[(n + c) % len(STATES)])
+            documents.append(Document(page_content=json.dumps(record, ensure_ascii=False), metadata={"source": "schemes.json"}))
+    return documents
+
+
+def record_key(doc):
+    """Identifies a record regardless of the state tag its copies carry."""
+    try:
+        record = json.loads(doc.page_content.rstrip("."))
+    except ValueError:
+        return doc.page_content
+    if isinstance(record, dict):
+        record.pop("state", None)
+    return json.dumps(record, sort_keys=True, ensure_ascii=False)
+
+
+def prompt_tokens(query, docs):
+    chain_input, truncated_docs = _prepare_chain_input(query, "english", "411001", LOCATION, docs)
+    chain_input["context"] = "\n\n".join(doc.page_content for doc in truncated_docs)
+    return count_tokens(PROMPT.format(**chain_input))
+
+
+def measure(retriever, embeddings, queries):
+    query_vectors = normalize_rows(embeddings.embed(queries))
+    tokens, sizes, distinct, relevance = [], [], [], []
+    for query, vector, docs in zip(queries, query_vectors, retriever.get_relevant_documents_batch(queries)):
+        tokens.append(prompt_tokens(query, docs))
+        sizes.append(len(docs))
+        distinct.append(len({record_key(doc) for doc in docs}))
+        if docs:
+            relevance.append(float(np.mean(normalize_rows(embeddings.embed([d.page_content for d in docs])) @ vector)))
+    return {
+        "tokens": float(np.mean(tokens)),
+        "documents": float(np.mean(sizes)),
+        "distinct": float(np.mean(distinct)),
+        "relevance": float(np.mean(relevance)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", default=QUERY_SET)
+    parser.add_argument("--copies", type=int, default=3, help="State-tagged copies added per scheme record")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fetch-k", type=int, default=5)
+    parser.add_argument("--dedup-threshold", type=float, default=0.95)
+    parser.add_argument("--mmr-lambda", type=float, default=0.7)
+    parser.add_argument("--model-dir")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    # The pipeline logs every truncation at INFO.
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    queries = load_queries(args.queries)
+    documents = build_documents(args.copies)
+    embeddings = OnnxEmbeddings(args.model_dir) if args.model_dir else HashingEmbeddings()
+    vectorstore = FAISS.from_documents(documents, embeddings)
+
+    search_kwargs = {"k": args.k}
+    plain = measure(SafeVectorStoreRetriever(vectorstore, search_kwargs, fetch_k=None), embeddings, queries)
+    diverse = measure(
+        SafeVectorStoreRetriever(vectorstore, search_kwargs, args.fetch_k, args.dedup_threshold, args.mmr_lambda),
+        embeddings,
+        queries,
+    )
+
+    print(f"{type(embeddings).__name__}: {len(queries)} questions, {len(documents)} documents ({args.copies} extra copies per scheme), k={args.k}")
+    print(f"{'':10} {'prompt tokens':>14} {'documents':>10} {'distinct':>9} {'relevance':>10}")
+    for name, result in (("top-k", plain), ("diverse", diverse)):
+        print(f"{name:10} {result['tokens']:14.1f} {result['documents']:10.2f} {result['distinct']:9.2f} {result['relevance']:10.3f}")
+    reduction = 1 - diverse["tokens"] / plain["tokens"]
+    print(f"average prompt-token reduction: {reduction:.1%} "
+          f"(fetch_k={args.fetch_k}, dedup threshold {args.dedup_threshold}, lambda {args.mmr_lambda})")
+
+
+if __name__ == "__main__":
+    main()
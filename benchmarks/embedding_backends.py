@@ -0,0 +1,198 @@
+"""
+Checks parity and measures throughput of the embedding backends
+(backend/ai/embeddings.py): torch (sentence-transformers), ONNX Runtime in
+float32, and ONNX Runtime with the dynamically int8-quantized model.
+
+Parity: every backend embeds the same sentences, taken from the knowledge base
+in data/, and is compared with the reference — torch when it is installed,
+otherwise the float32 ONNX model. The script exits non-zero when the lowest
+cosine similarity to the reference drops below 1 - max drift, or when fewer than
+`--min-overlap` of each sentence's 5 nearest neighbours are kept.
+
+Run from the repository root, against the model exported by
+`python -m backend.ai.onnx_export`:
+
+    python -m benchmarks.embedding_backends [--model-dir DIR] [--threads N] [--max-drift 0.02]
+
+or against a small locally built model with MiniLM's shape but random weights
+(`--synthetic`), when the real one can't be downloaded. Random weights
+quantize worse than trained ones, so use the real model to judge drift.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.ai.embeddings import MODEL_FILE, ONNX_MODEL_DIR, OnnxEmbeddings, TOKENIZER_FILE
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+NEIGHBOURS = 5
+
+
+def knowledge_base_sentences(limit):
+    """Short and long passages from the JSON files, like the ones the retriever indexes."""
+    sentences = []
+
+    def walk(value):
+        if isinstance(value, str):
+            if len(value.split()) >= 3:
+                sentences.append(value)
+        elif isinstance(value, dict):
+            sentences.append(json.dumps(value, ensure_ascii=False)[:1000])
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+                walk(json.load(f))
+    sentences = list(dict.fromkeys(sentences))
+    while len(sentences) < limit:
+        sentences += sentences
+    return sentences[:limit]
+
+
+def build_synthetic_model(output_dir, sentences, layers=6, hidden=384, heads=12, intermediate=1536):
+    """A BERT encoder with all-MiniLM-L6-v2's dimensions and random weights, plus a WordPiece tokenizer."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    from tokenizers.implementations import BertWordPieceTokenizer
+
+    tokenizer = BertWordPieceTokenizer(lowercase=True)
+    tokenizer.train_from_iterator(sentences, vocab_size=8000)
+    tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    vocab_size = tokenizer.get_vocab_size()
+
+    rng = np.random.default_rng(0)
+    initializers, nodes = [], []
+
+    def weight(name, *shape, value=None):
+        array = value if value is not None else rng.normal(0, 0.02, shape).astype(np.float32)
+        initializers.append(numpy_helper.from_array(np.asarray(array), name))
+        return name
+
+    def node(op, inputs, **attrs):
+        output = f"{op}_{len(nodes)}"
+        nodes.append(helper.make_node(op, inputs, [output], **attrs))
+        return output
+
+    def layer_norm(x, prefix):
+        return node("LayerNormalization", [
+            x, weight(f"{prefix}.gamma", value=np.ones(hidden, np.float32)), weight(f"{prefix}.beta", value=np.zeros(hidden, np.float32)),
+        ], axis=-1, epsilon=1e-12)
+
+    def dense(x, prefix, n_in, n_out):
+        return node("Add", [node("MatMul", [x, weight(f"{prefix}.weight", n_in, n_out)]), weight(f"{prefix}.bias", n_out)])
+
+    head_dim = hidden // heads
+    split_shape = weight("split_shape", value=np.array([0, 0, heads, head_dim], np.int64))
+    merge_shape = weight("merge_shape", value=np.array([0, 0, hidden], np.int64))
+
+    sequence = node("Gather", [node("Shape", ["input_ids"]), weight("one", value=np.array(1, np.int64))], axis=0)
+    positions = node("Range", [weight("zero", value=np.array(0, np.int64)), sequence, "one"])
+    x = node("Add", [
+        node("Add", [node("Gather", [weight("word_embeddings", vocab_size, hidden), "input_ids"]),
+                     node("Gather", [weight("position_embeddings", 512, hidden), positions])]),
+        node("Gather", [weight("token_type_embeddings", 2, hidden), "token_type_ids"]),
+    ])
+    x = layer_norm(x, "embeddings")
+
+    mask = node("Cast", ["attention_mask"], to=TensorProto.FLOAT)
+    mask = node("Mul", [node("Sub", [weight("f_one", value=np.array(1, np.float32)), mask]), weight("neg", value=np.array(-10000, np.float32))])
+    mask = node("Unsqueeze", [mask, weight("mask_axes", value=np.array([1, 2], np.int64))])
+
+    for i in range(layers):
+        prefix = f"layer{i}"
+        q = node("Transpose", [node("Reshape", [dense(x, f"{prefix}.q", hidden, hidden), split_shape])], perm=[0, 2, 1, 3])
+        k = node("Transpose", [node("Reshape", [dense(x, f"{prefix}.k", hidden, hidden), split_shape])], perm=[0, 2, 3, 1])
+        v = node("Transpose", [node("Reshape", [dense(x, f"{prefix}.v", hidden, hidden), split_shape])], perm=[0, 2, 1, 3])
+        scores = node("Add", [node("Mul", [node("MatMul", [q, k]), weight(f"{prefix}.scale", value=np.array(head_dim ** -0.5, np.float32))]), mask])
+        context = node("MatMul", [node("Softmax", [scores], axis=-1), v])
+        context = node("Reshape", [node("Transpose", [context], perm=[0, 2, 1, 3]), merge_shape])
+        x = layer_norm(node("Add", [x, dense(context, f"{prefix}.out", hidden, hidden)]), f"{prefix}.attention_norm")
+
+        h = dense(x, f"{prefix}.intermediate", hidden, intermediate)
+        erf = node("Erf", [node("Div", [h, weight(f"{prefix}.sqrt2", value=np.array(np.sqrt(2), np.float32))])])
+        h = node("Mul", [node("Mul", [h, node("Add", [erf, "f_one"])]), weight(f"{prefix}.half", value=np.array(0.5, np.float32))])
+        x = layer_norm(node("Add", [x, dense(h, f"{prefix}.output", intermediate, hidden)]), f"{prefix}.output_norm")
+
+    nodes.append(helper.make_node("Identity", [x], ["last_hidden_state"]))
+    inputs = [helper.make_tensor_value_info(name, TensorProto.INT64, ["batch", "sequence"]) for name in ("input_ids", "attention_mask", "token_type_ids")]
+    output = helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", hidden])
+    graph = helper.make_graph(nodes, "synthetic-minilm", inputs, [output], initializers)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=9)
+    onnx.checker.check_model(model)
+    onnx.save(model, os.path.join(output_dir, MODEL_FILE))
+
+
+def throughput(embed, sentences, repeats=3):
+    embed(sentences[:32])  # warm up
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        vectors = np.asarray(embed(sentences), dtype=np.float32)
+        best = min(best, time.perf_counter() - started)
+    return vectors, len(sentences) / best
+
+
+def neighbour_overlap(reference, candidate):
+    top = lambda vectors: np.argsort(-(vectors @ vectors.T), axis=1)[:, 1:NEIGHBOURS + 1]
+    expected, actual = top(reference), top(candidate)
+    return np.mean([len(set(e) & set(a)) / NEIGHBOURS for e, a in zip(expected, actual)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--synthetic", action="store_true", help="Build a random-weight MiniLM-shaped model to run against")
+    parser.add_argument("--sentences", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--max-drift", type=float, default=0.02)
+    parser.add_argument("--min-overlap", type=float, default=0.8)
+    args = parser.parse_args()
+
+    sentences = knowledge_base_sentences(args.sentences)
+    model_dir = args.model_dir
+    if args.synthetic:
+        from backend.ai.onnx_export import quantize_model
+        model_dir = tempfile.mkdtemp()
+        build_synthetic_model(model_dir, sentences)
+        quantize_model(model_dir)
+
+    backends = {}
+    try:
+        from backend.ai.embeddings import get_embeddings
+        backends["torch"] = get_embeddings("torch").embed_documents
+    except ImportError as e:
+        print(f"torch backend unavailable ({e}); comparing against float32 ONNX")
+    backends["onnx fp32"] = OnnxEmbeddings(model_dir, quantized=False, threads=args.threads).embed
+    backends["onnx int8"] = OnnxEmbeddings(model_dir, quantized=True, threads=args.threads).embed
+
+    results = {name: throughput(embed, sentences) for name, embed in backends.items()}
+    reference_name = next(iter(results))
+    reference = results[reference_name][0]
+    print(f"{len(sentences)} sentences, reference: {reference_name}")
+
+    failed = False
+    for name, (vectors, rate) in results.items():
+        line = f"{name:>10}: {rate:8.1f} sentences/s"
+        if name != reference_name:
+            cosine = np.sum(reference * vectors, axis=1)
+            overlap = neighbour_overlap(reference, vectors)
+            line += f"  cosine mean {cosine.mean():.5f} min {cosine.min():.5f}  top-{NEIGHBOURS} overlap {overlap:.1%}"
+            if 1 - cosine.min() > args.max_drift or overlap < args.min_overlap:
+                line += "  FAIL"
+                failed = True
+        print(line)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
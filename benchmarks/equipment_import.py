@@ -0,0 +1,84 @@
+"""
+Measures rows per second through the bulk equipment import endpoint for a CSV and a
+JSON lines file of synthetic listings, with a share of invalid rows mixed in.
+
+Uses MONGO_URI if set (point it at a local mongod for representative numbers),
+otherwise the in-memory mongomock stand-in.
+
+Run from the repository root:
+
+    python -m benchmarks.equipment_import [rows]
+"""
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("MONGO_URI", "mongomock://benchmark")
+
+FIELDS = ["name", "description", "price_per_day", "pincode", "owner_id", "contact_name", "contact_phone", "image_urls"]
+
+
+def make_rows(count):
+    from bson import ObjectId
+    random.seed(0)
+    owners = [str(ObjectId()) for _ in range(50)]
+    rows = []
+    for i in range(count):
+        row = {
+            "name": f"Tractor {i}", "description": "35 HP tractor with rotavator",
+            "price_per_day": str(random.randint(800, 3000)), "pincode": str(random.randint(110001, 855999)),
+            "owner_id": random.choice(owners), "contact_name": "CHC Manager", "contact_phone": "9999999999",
+            "image_urls": "https://example.org/a.webp|https://example.org/b.webp",
+        }
+        # About 1% of rows are invalid.
+        if i % 100 == 7:
+            row["price_per_day"] = "n/a"
+        rows.append(row)
+    return rows
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def to_jsonl(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({**row, "image_urls": row["image_urls"].split("|")}))
+    return "\n".join(lines).encode("utf-8")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from backend.db import db
+    from backend.routes import agri_share
+
+    app = FastAPI()
+    app.include_router(agri_share.router, prefix="/api/agri-share")
+    client = TestClient(app)
+    rows = make_rows(count)
+
+    for label, filename, body in (("csv", "fleet.csv", to_csv(rows)), ("jsonl", "fleet.jsonl", to_jsonl(rows))):
+        db.equipment.drop()
+        started = time.perf_counter()
+        result = client.post("/api/agri-share/agri-share/equipment/import", files={"file": (filename, body)}).json()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:<6} {count} rows in {elapsed:6.2f}s  {count / elapsed:9.0f} rows/s  "
+            f"inserted {result['inserted']}, failed {result['failed']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
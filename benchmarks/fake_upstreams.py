@@ -0,0 +1,146 @@
+"""
+Local stand-ins for the services AgriSaathi calls, for load tests and offline
+development:
+
+- the India Post pincode API (GET /pincode/<pincode>)
+- WeatherAPI's forecast endpoint (GET /v1/forecast.json)
+- Groq's OpenAI-compatible chat completions (POST /openai/v1/chat/completions),
+  answering deterministically from a hash of the prompt
+
+Point the app at it with
+
+    POSTAL_API_BASE=http://127.0.0.1:8900
+    WEATHER_API_BASE=http://127.0.0.1:8900/v1
+    GROQ_API_BASE=http://127.0.0.1:8900
+
+(benchmarks/load_test.py does this itself). Run from the repository root:
+
+    python -m benchmarks.fake_upstreams [--port 8900] [--latency-ms 20] [--llm-latency-ms 300]
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.weather_cache_memory import raw_forecast
+
+# States present in the sample market data and schemes, so lookups find matches.
+DISTRICTS = [
+    ("Pune", "Maharashtra"), ("Nagpur", "Maharashtra"), ("Nashik", "Maharashtra"),
+    ("Ludhiana", "Punjab"), ("Karnal", "Haryana"), ("Indore", "Madhya Pradesh"),
+    ("Guntur", "Andhra Pradesh"), ("Rajkot", "Gujarat"), ("Lucknow", "Uttar Pradesh"),
+    ("Coimbatore", "Tamil Nadu"),
+]
+ANSWER_SENTENCES = [
+    "Sow after the first good monsoon shower, once the soil has enough moisture.",
+    "Use certified seed and treat it with a fungicide before sowing.",
+    "Apply fertilizer according to a soil health card test.",
+    "Irrigate at the critical crop stages and avoid waterlogging.",
+    "Watch for pests after cloudy, humid spells and spray only when needed.",
+    "Check mandi prices on eNAM before selling your produce.",
+    "Consult the district Krishi Vigyan Kendra (KVK) for local advice.",
+]
+
+
+def location_for(pincode):
+    return DISTRICTS[zlib.crc32(pincode.encode()) % len(DISTRICTS)]
+
+
+def chat_answer(prompt, sentences=4):
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return " ".join(ANSWER_SENTENCES[b % len(ANSWER_SENTENCES)] for b in digest[:sentences])
+
+
+class FakeUpstreams:
+    def __init__(self, latency_ms=20.0, llm_latency_ms=300.0, forecast_variants=20):
+        self.latency = latency_ms / 1000
+        self.llm_latency = llm_latency_ms / 1000
+        random.seed(0)
+        self.forecasts = [json.dumps({"forecast": {"forecastday": raw_forecast()}}).encode() for _ in range(forecast_variants)]
+
+    def postal(self, pincode):
+        time.sleep(self.latency)
+        if not pincode.isdigit() or len(pincode) != 6:
+            return 200, [{"Message": "No records found", "Status": "Error", "PostOffice": None}]
+        district, state = location_for(pincode)
+        office = {"Name": f"{district} H.O", "District": district, "State": state, "Country": "India", "Pincode": pincode}
+        return 200, [{"Message": "Number of pincode(s) found:1", "Status": "Success", "PostOffice": [office]}]
+
+    def forecast(self, query):
+        time.sleep(self.latency)
+        q = query.get("q", [""])[0]
+        return 200, self.forecasts[zlib.crc32(q.encode()) % len(self.forecasts)]
+
+    def chat(self, body):
+        time.sleep(self.llm_latency)
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        answer = chat_answer(prompt)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(answer) // 4
+        return 200, {
+            "id": f"chatcmpl-{hashlib.md5(prompt.encode()).hexdigest()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "llama3-8b-8192"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "logprobs": None, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+            "system_fingerprint": None,
+        }
+
+    def handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/pincode/"):
+                    self._reply(*upstreams.postal(url.path.rsplit("/", 1)[1]))
+                elif url.path == "/v1/forecast.json":
+                    self._reply(*upstreams.forecast(parse_qs(url.query)))
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if urlparse(self.path).path.endswith("/chat/completions"):
+                    self._reply(*upstreams.chat(body))
+                else:
+                    self._reply(404, {"error": "not found"})
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=8900):
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake pincode, weather and Groq APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Added to every pincode and weather response")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Added to every chat completion")
+    args = parser.parse_args()
+    print(f"Fake upstreams on http://{args.host}:{args.port}")
+    FakeUpstreams(args.latency_ms, args.llm_latency_ms).serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
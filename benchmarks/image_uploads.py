@@ -0,0 +1,61 @@
+"""
+Times the image upload pipeline on synthetic 12 MP phone photos: storing the
+original (chunked copy + SHA-256) and generating the web and thumbnail variants in
+the process pool, and reports the variant sizes EquipmentCard downloads.
+
+Run from the repository root:
+
+    python -m benchmarks.image_uploads [images]
+"""
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageFilter
+from starlette.datastructures import UploadFile
+
+from backend import uploads
+
+
+def phone_photo(seed):
+    random.seed(seed)
+    image = Image.effect_noise((4000, 3000), 60).convert("RGB")
+    image = Image.merge("RGB", [band.point(lambda v, s=random.random(): int(v * s)) for band in image.split()])
+    buffer = io.BytesIO()
+    image.filter(ImageFilter.GaussianBlur(2)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def run(photos):
+    uploads.UPLOAD_DIR = tempfile.mkdtemp()
+    started = time.perf_counter()
+    saved = await asyncio.gather(*(
+        uploads.save_image(UploadFile(io.BytesIO(photo), filename=f"{i}.jpg"), "") for i, photo in enumerate(photos)
+    ))
+    elapsed = time.perf_counter() - started
+    print(f"{len(photos)} uploads in {elapsed:.2f}s ({len(photos) / elapsed:.1f} images/s, {uploads.IMAGE_WORKERS} workers)")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        uploads.save_image(UploadFile(io.BytesIO(photo), filename=f"{i}.jpg"), "") for i, photo in enumerate(photos)
+    ))
+    print(f"{len(photos)} duplicate uploads in {time.perf_counter() - started:.2f}s")
+
+    sizes = lambda variant: sum(os.path.getsize(os.path.join(uploads.UPLOAD_DIR, os.path.basename(urls[variant]))) for urls in saved)
+    for variant in ("original", "web", "thumb"):
+        print(f"{variant:<9} avg {sizes(variant) / len(saved) / 1024:8.1f} KiB")
+    uploads.shutdown_image_executor()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    photos = [phone_photo(i) for i in range(count)]
+    asyncio.run(run(photos))
+
+
+if __name__ == "__main__":
+    main()
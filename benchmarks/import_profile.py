@@ -0,0 +1,70 @@
+"""
+Import-time profile: runs `python -X importtime -c "import <module>"` in a fresh
+interpreter and reports the total, the slowest imports by cumulative time, the
+cost per top-level package and the cost of every backend module.
+
+Run from the repository root:
+
+    python -m benchmarks.import_profile [module] [--top N]
+
+e.g. `backend.main` (the default, what uvicorn imports at start-up) or
+`backend.ai.llama_pipeline` (what the AI warmup loads).
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def profile(module):
+    env = {**os.environ, "MONGO_URI": os.environ.get("MONGO_URI", "mongomock://import-profile")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    failure = None
+    if result.returncode != 0:
+        failure = result.stderr.strip().splitlines()[-1]
+    return rows, failure
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import times of the backend.")
+    parser.add_argument("module", nargs="?", default="backend.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    rows, failure = profile(args.module)
+    if failure:
+        print(f"Importing {args.module} failed: {failure}")
+    # Nesting depth is the indentation of the name; depth 1 are direct imports of the root.
+    top_level = [(name.strip(), cumulative) for name, _, cumulative in rows if len(name) - len(name.lstrip()) == 1]
+    total = sum(cumulative for _, cumulative in top_level)
+    print(f"import {args.module}: {total / 1e3:.1f} ms across {len(rows)} modules\n")
+
+    print(f"Slowest {args.top} imports by cumulative time:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"  {cumulative_us / 1e3:9.1f} ms  (self {self_us / 1e3:7.1f} ms)  {name.strip()}")
+
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.strip().split(".")[0]] += self_us
+    print(f"\nSelf time per top-level package:")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1e3:9.1f} ms  {package}")
+
+    print(f"\nBackend modules:")
+    for name, self_us, cumulative_us in rows:
+        if name.strip().startswith("backend"):
+            print(f"  {cumulative_us / 1e3:9.1f} ms  (self {self_us / 1e3:7.1f} ms)  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
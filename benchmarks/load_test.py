@@ -0,0 +1,369 @@
+"""
+End-to-end load test: starts the fake upstreams (benchmarks/fake_upstreams.py)
+and the app, seeds agri-share data through the API, then drives a weighted mix
+of requests at a fixed concurrency and reports requests/s and p50/p95/p99
+latency per scenario.
+
+The app runs in its own process with uvicorn, or with gunicorn and several
+workers (`--workers N`, see gunicorn.conf.py). Embeddings use the ONNX backend
+with `--model-dir` (python -m backend.ai.onnx_export), or else a random-weight
+MiniLM-shaped model built locally (see benchmarks/embedding_backends.py), so no
+model is downloaded; the index is built into a temporary directory. MongoDB is
+mongomock by default.
+That is one in-memory database per process, so with several workers pass
+`--mongo-uri` for a local mongod. Pass `--url` to load an app that is already
+running instead of starting one.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test [--concurrency 32] [--duration 30] [--mix query=1,weather=3]
+        [--save results.json] [--baseline results.json --max-regression 0.2]
+
+Exits non-zero if every request of some scenario failed. With `--baseline`,
+also if any scenario's p95 grew, or its requests/s fell, by more than
+`--max-regression` against a run saved with `--save`.
+"""
+import argparse
+import asyncio
+import collections
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+DEFAULT_MIX = {
+    "query": 1,
+    "weather": 3,
+    "market": 3,
+    "schemes": 2,
+    "scheme_search": 1,
+    "equipment": 3,
+    "nearby": 2,
+    "availability": 2,
+    "booking": 1,
+    "bookings": 1,
+}
+QUESTIONS = [
+    "When should I sow wheat?",
+    "How much urea should I apply to paddy?",
+    "Which government schemes help with drip irrigation?",
+    "What is the mandi price of soybean?",
+    "How do I control pink bollworm in cotton?",
+]
+SCHEME_TERMS = ["kisan", "irrigation", "insurance", "credit", "soil", "organic"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3 if samples else 0.0
+
+
+class Scenarios:
+    """Builds one request per scenario from the seeded data."""
+
+    def __init__(self, pincodes, equipment_ids, user_ids):
+        self.pincodes = pincodes
+        self.equipment_ids = equipment_ids
+        self.user_ids = user_ids
+
+    def request(self, name):
+        pincode = random.choice(self.pincodes)
+        if name == "query":
+            body = {"query": random.choice(QUESTIONS), "language": "english", "pincode": pincode}
+            return "POST", "/api/query/query", {"json": body}
+        if name == "weather":
+            return "GET", "/api/weather/weather", {"params": {"pincode": pincode, "hourly": "false"}}
+        if name == "market":
+            return "GET", "/api/market/market", {"params": {"pincode": pincode}}
+        if name == "schemes":
+            return "GET", "/api/schemes/schemes", {}
+        if name == "scheme_search":
+            return "GET", "/api/schemes/schemes/search", {"params": {"q": random.choice(SCHEME_TERMS)}}
+        if name == "equipment":
+            return "GET", "/api/agri-share/agri-share/equipment", {"params": {"limit": 20}}
+        if name == "nearby":
+            return "GET", "/api/agri-share/agri-share/equipment/nearby", {"params": {"pincode": pincode, "radius_km": 50}}
+        if name == "availability":
+            params = {"start_date": "2026-01-01", "end_date": "2026-03-31"}
+            return "GET", f"/api/agri-share/agri-share/equipment/{random.choice(self.equipment_ids)}/availability", {"params": params}
+        if name == "booking":
+            # Mostly free dates; an occasional overlap exercises the 409 path.
+            day = random.randrange(365 * 3)
+            start = time.strftime("%Y-%m-%d", time.gmtime(1767225600 + day * 86400))
+            end = time.strftime("%Y-%m-%d", time.gmtime(1767225600 + (day + 2) * 86400))
+            body = {
+                "equipment_id": random.choice(self.equipment_ids), "renter_id": random.choice(self.user_ids),
+                "start_date": start, "end_date": end, "total_price": 3000,
+            }
+            return "POST", "/api/agri-share/agri-share/bookings", {"json": body}
+        if name == "bookings":
+            return "GET", "/api/agri-share/agri-share/bookings", {"params": {"user_id": random.choice(self.user_ids), "limit": 20}}
+        raise ValueError(f"Unknown scenario: {name}")
+
+
+# Expected refusals, not failures.
+EXPECTED_STATUS = {"booking": {409}}
+
+
+async def seed(client, listings, pincodes):
+    """Creates equipment listings through the bulk import endpoint; returns (equipment ids, user ids)."""
+    owners = [f"{random.getrandbits(96):024x}" for _ in range(max(1, listings // 20))]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["name", "description", "price_per_day", "pincode", "owner_id", "contact_name", "contact_phone"])
+    writer.writeheader()
+    for i in range(listings):
+        writer.writerow({
+            "name": f"Tractor {i}", "description": "35 HP tractor with rotavator", "price_per_day": random.randint(800, 3000),
+            "pincode": random.choice(pincodes), "owner_id": random.choice(owners),
+            "contact_name": "CHC Manager", "contact_phone": "9999999999",
+        })
+    response = await client.post(
+        "/api/agri-share/agri-share/equipment/import", files={"file": ("fleet.csv", buffer.getvalue().encode())}, timeout=120
+    )
+    response.raise_for_status()
+
+    equipment_ids, cursor = [], None
+    while len(equipment_ids) < min(listings, 500):
+        params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/agri-share/agri-share/equipment", params=params)).json()
+        equipment_ids += [item["_id"] for item in page["equipment"]]
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    return equipment_ids, owners + [f"{random.getrandbits(96):024x}" for _ in range(len(owners))]
+
+
+async def run_load(base_url, scenarios, mix, concurrency, duration, warmup):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    failures = collections.Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def user(client):
+        while (now := time.perf_counter()) < stop_at:
+            name = random.choices(names, weights)[0]
+            method, path, kwargs = scenarios.request(name)
+            request_started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                outcome = response.status_code
+                failed = outcome >= 400 and outcome not in EXPECTED_STATUS.get(name, ())
+            except httpx.HTTPError as e:
+                outcome, failed = type(e).__name__, True
+            if now >= measure_from:
+                latencies[name].append(time.perf_counter() - request_started)
+                errors[name] += int(failed)
+                if failed:
+                    failures[name, outcome] += 1
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    for (name, outcome), count in sorted(failures.items(), key=str):
+        print(f"{name}: {count} x {outcome}")
+    return latencies, errors
+
+
+def report(latencies, errors, duration):
+    results = {}
+    print(f"{'scenario':<14} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    everything = []
+    for name, samples in [*latencies.items(), ("total", None)]:
+        if samples is None:
+            samples, error_count = everything, sum(errors.values())
+        else:
+            everything += samples
+            error_count = errors[name]
+        samples = sorted(samples)
+        results[name] = {
+            "requests": len(samples), "errors": error_count, "rps": len(samples) / duration,
+            "p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95), "p99_ms": percentile(samples, 0.99),
+        }
+        r = results[name]
+        print(f"{name:<14} {r['requests']:>8} {r['errors']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    return results
+
+
+def regressions(results, baseline, max_regression):
+    found = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not current["requests"]:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            found.append(f"{name}: p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if current["rps"] < previous["rps"] * (1 - max_regression):
+            found.append(f"{name}: {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return found
+
+
+def build_model(model_dir):
+    """A quantized random-weight model with MiniLM's shape, for when no exported one is given."""
+    from backend.ai.onnx_export import quantize_model
+    from benchmarks.embedding_backends import build_synthetic_model, knowledge_base_sentences
+    build_synthetic_model(model_dir, knowledge_base_sentences(2000))
+    quantize_model(model_dir)
+
+
+def start_app(args, upstream_url, port):
+    tmp = tempfile.mkdtemp()
+    model_dir = args.model_dir
+    if model_dir is None:
+        model_dir = os.path.join(tmp, "model")
+        os.makedirs(model_dir)
+        build_model(model_dir)
+    centroid_file = os.path.join(tmp, "pincode_centroids.csv")
+    with open(centroid_file, "w") as f:
+        f.write("pincode,latitude,longitude\n")
+        for pincode in args.pincode_list:
+            f.write(f"{pincode},{random.uniform(8, 35):.5f},{random.uniform(68, 97):.5f}\n")
+    env = {
+        **os.environ,
+        "MONGO_URI": args.mongo_uri,
+        "POSTAL_API_BASE": upstream_url,
+        "WEATHER_API_BASE": f"{upstream_url}/v1",
+        "WEATHER_API_KEY": "load-test",
+        "GROQ_API_BASE": upstream_url,
+        "GROQ_API_KEY": "load-test",
+        "PINCODE_CENTROIDS_FILE": centroid_file,
+        "UPLOAD_DIR": tmp,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "EMBEDDING_BACKEND": "onnx",
+        "ONNX_MODEL_DIR": model_dir,
+        "FAISS_INDEX_PATH": os.path.join(tmp, "faiss_index"),
+        # Every simulated user comes from 127.0.0.1, so per-client limits would throttle the whole test.
+        "RATE_LIMIT_ENABLED": "0",
+    }
+    if args.mongo_uri.startswith("mongomock://"):
+        # mongomock is not thread-safe; one database thread serializes access to it.
+        env["MONGO_MAX_POOL_SIZE"] = "1"
+    if args.workers > 1:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--no-access-log"]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+
+
+async def wait_until_up(base_url, timeout=300):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/healthz")).status_code == 200:
+                    # Give the AI warmup a chance to finish before measuring.
+                    while time.monotonic() < deadline and (await client.get("/readyz")).json().get("ai") == "loading":
+                        await asyncio.sleep(0.5)
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not come up")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test AgriSaathi against local fake upstreams.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the measurement")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Scenario weights, e.g. query=1,weather=3")
+    parser.add_argument("--workers", type=int, default=1, help="App processes; more than 1 runs gunicorn")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongomock://load-test"))
+    parser.add_argument("--listings", type=int, default=5000)
+    parser.add_argument("--pincodes", type=int, default=500, help="Distinct pincodes in requests and listings")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Fake pincode/weather API latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Fake Groq latency")
+    parser.add_argument("--model-dir", help="Exported ONNX embedding model; default: a locally built random-weight one")
+    parser.add_argument("--url", help="Load an already running app instead of starting one (it must use the fake upstreams)")
+    parser.add_argument("--save", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="Show the app's log")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.workers > 1 and args.mongo_uri.startswith("mongomock://"):
+        print("warning: every worker gets its own mongomock database; use --mongo-uri for a shared one")
+
+    random.seed(0)
+    args.pincode_list = [str(pincode) for pincode in random.sample(range(110001, 855999), args.pincodes)]
+
+    upstream_port = free_port()
+    upstreams = multiprocessing.Process(
+        target=FakeUpstreams(args.latency_ms, args.llm_latency_ms).serve, args=("127.0.0.1", upstream_port), daemon=True
+    )
+    upstreams.start()
+    app = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        app = start_app(args, f"http://127.0.0.1:{upstream_port}", port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    async def run():
+        await wait_until_up(base_url)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            equipment_ids, user_ids = await seed(client, args.listings, args.pincode_list)
+            ai_status = (await client.get("/readyz")).json()
+        print(f"Seeded {args.listings} listings; AI: {ai_status.get('ai')}; concurrency {args.concurrency}, {args.duration:.0f}s")
+        scenarios = Scenarios(args.pincode_list, equipment_ids, user_ids)
+        return await run_load(base_url, scenarios, args.mix, args.concurrency, args.duration, args.warmup)
+
+    try:
+        latencies, errors = asyncio.run(run())
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait(timeout=30)
+        upstreams.terminate()
+
+    results = report(latencies, errors, args.duration)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    failed = [name for name, r in results.items() if name != "total" and r["requests"] and r["errors"] == r["requests"]]
+    for name in failed:
+        print(f"FAILED {name}: every request failed")
+    found = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.max_regression)
+        for line in found:
+            print(f"REGRESSION {line}")
+    sys.exit(1 if failed or found else 0)
+
+
+if __name__ == "__main__":
+    main()
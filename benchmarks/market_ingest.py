@@ -0,0 +1,79 @@
+"""
+Benchmarks streaming ingestion of an Agmarknet-style daily price CSV into the
+columnar market store, and filtered lookups against the memory-mapped result.
+
+Run from the repository root:
+
+    python -m benchmarks.market_ingest [rows]
+"""
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.market_columnar import ColumnarMarketStore, ingest_csv
+
+HEADER = ["State", "District", "Market", "Commodity", "Variety", "Grade",
+          "Arrival_Date", "Min_x0020_Price", "Max_x0020_Price", "Modal_x0020_Price"]
+
+
+def write_csv(path, rows):
+    random.seed(0)
+    markets = [(f"State {i % 30}", f"District {i}", f"Market {i}") for i in range(3000)]
+    commodities = [f"Commodity {i}" for i in range(300)]
+    start = date(2018, 1, 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            state, district, market = random.choice(markets)
+            modal = random.randint(1000, 9000)
+            day = start + timedelta(days=i * 2500 // rows)
+            writer.writerow([state, district, market, random.choice(commodities), "Other", "FAQ",
+                             day.strftime("%d/%m/%Y"), modal - 150, modal + 150, modal])
+
+
+def max_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "prices.csv")
+        store_path = os.path.join(tmp, "market_columnar")
+        write_csv(csv_path, rows)
+        csv_mib = os.path.getsize(csv_path) / 2**20
+        baseline_rss = max_rss_mib()
+
+        started = time.perf_counter()
+        ingest_csv([csv_path], store_path)
+        elapsed = time.perf_counter() - started
+        store_mib = sum(os.path.getsize(os.path.join(store_path, name)) for name in os.listdir(store_path)) / 2**20
+        print(f"Ingested {rows} rows ({csv_mib:.0f} MiB CSV -> {store_mib:.0f} MiB columnar) "
+              f"in {elapsed:.1f}s = {rows / elapsed:,.0f} rows/s")
+        print(f"Peak RSS during ingest: {max_rss_mib():.0f} MiB (baseline {baseline_rss:.0f} MiB)")
+
+        store = ColumnarMarketStore(store_path)
+        for label, kwargs in (
+            ("state", {"state": "State 7"}),
+            ("state + commodity", {"state": "State 7", "commodity": "Commodity 3"}),
+            ("apmc + commodity", {"apmc": "Market 70", "commodity": "Commodity 3"}),
+        ):
+            store.latest_prices(**kwargs)
+            started = time.perf_counter()
+            for _ in range(20):
+                result = store.latest_prices(**kwargs)
+            per_call = (time.perf_counter() - started) / 20
+            print(f"latest_prices({label}): {per_call * 1e3:.2f} ms, {len(result)} rows")
+        print(f"Peak RSS after queries: {max_rss_mib():.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Times filtered lookups against MarketPriceStore holding a synthetic national daily
+price list (every state x APMC x commodity).
+
+Run from the repository root:
+
+    python -m benchmarks.market_store_lookup [states] [apmcs_per_state] [commodities]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from backend.market_store import MarketPriceStore
+
+
+def write_price_file(path, states, apmcs, commodities):
+    rows = []
+    for s in range(states):
+        for a in range(apmcs):
+            for c in range(commodities):
+                modal = random.randint(1000, 9000)
+                rows.append({
+                    "state": f"State {s}", "apmc": f"APMC {s}-{a}", "commodity": f"Commodity {c}",
+                    "min_price": modal - 100, "max_price": modal + 100, "modal_price": modal,
+                    "unit": "Quintal", "date": "2025-06-10",
+                })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+    return len(rows)
+
+
+def timeit(label, fn, repeat=200):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<28} {per_call * 1e3:8.3f} ms  ({len(result)} rows)")
+
+
+def main():
+    states, apmcs, commodities = (int(arg) for arg in (sys.argv[1:] + ["36", "80", "60"][len(sys.argv) - 1:]))
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "market_prices.json")
+        rows = write_price_file(path, states, apmcs, commodities)
+        store = MarketPriceStore(path)
+
+        started = time.perf_counter()
+        store.snapshot()
+        print(f"Initial load of {rows} rows: {time.perf_counter() - started:.2f}s")
+
+        timeit("state + commodity", lambda: store.find(state="State 7", commodity="Commodity 3"))
+        timeit("apmc + commodity", lambda: store.find(apmc="APMC 7-5", commodity="Commodity 3"))
+        timeit("apmc", lambda: store.find(apmc="APMC 7-5"))
+        timeit("state", lambda: store.find(state="State 7"))
+
+
+if __name__ == "__main__":
+    main()
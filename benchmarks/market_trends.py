@@ -0,0 +1,38 @@
+"""
+Times `compute_trends` over multi-year price histories in the columnar store.
+
+Run from the repository root:
+
+    python -m benchmarks.market_trends [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from backend.market_columnar import ColumnarMarketStore, ingest_csv
+from backend.market_trends import compute_trends
+from benchmarks.market_ingest import write_csv
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "prices.csv")
+        store_path = os.path.join(tmp, "market_columnar")
+        write_csv(csv_path, rows)
+        ingest_csv([csv_path], store_path)
+        store = ColumnarMarketStore(store_path)
+
+        for history_days in (365, 3 * 365, 6 * 365):
+            for label, commodity in (("all commodities", None), ("one commodity", "Commodity 3")):
+                compute_trends(store, "State 7", commodity=commodity, history_days=history_days)
+                started = time.perf_counter()
+                for _ in range(10):
+                    trends = compute_trends(store, "State 7", commodity=commodity, history_days=history_days)
+                per_call = (time.perf_counter() - started) / 10
+                print(f"{history_days:>5} days, {label:<16} {per_call * 1e3:8.2f} ms ({len(trends)} commodities)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmarks proximity search over pincode centroids: the in-memory centroid radius
+query on its own, and the /agri-share/equipment/nearby route over 100k listings.
+
+Uses MONGO_URI if set (point it at a local mongod for representative numbers),
+otherwise the in-memory mongomock stand-in.
+
+Run from the repository root:
+
+    python -m benchmarks.nearby_equipment [listings] [pincodes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("MONGO_URI", "mongomock://benchmark")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3
+    return f"p50 {pick(0.5):7.2f} ms  p95 {pick(0.95):7.2f} ms"
+
+
+def main():
+    listings = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_pincodes = int(sys.argv[2]) if len(sys.argv) > 2 else 19_000
+    random.seed(0)
+
+    tmp = tempfile.mkdtemp()
+    centroid_file = os.path.join(tmp, "pincode_centroids.csv")
+    pincodes = [str(110001 + i * 45) for i in range(n_pincodes)]
+    with open(centroid_file, "w") as f:
+        f.write("pincode,latitude,longitude\n")
+        for pincode in pincodes:
+            f.write(f"{pincode},{random.uniform(8.0, 34.0):.5f},{random.uniform(68.0, 97.0):.5f}\n")
+    os.environ["PINCODE_CENTROIDS_FILE"] = centroid_file
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from bson import ObjectId
+    from backend.db import db
+    from backend.indexes import ensure_indexes
+    from backend.pincode_geo import get_pincode_centroids
+    from backend.routes import agri_share
+
+    centroids = get_pincode_centroids()
+    queries = random.sample(pincodes, 200)
+    for radius in (10, 25, 50):
+        samples, found = [], 0
+        for pincode in queries:
+            lat, lon = centroids.centroid(pincode)
+            started = time.perf_counter()
+            found += len(centroids.within(lat, lon, radius))
+            samples.append(time.perf_counter() - started)
+        print(f"centroid radius {radius:>3} km: {percentiles(samples)}  avg {found / len(queries):.1f} pincodes")
+
+    db.equipment.drop()
+    ensure_indexes(db)
+    started = time.perf_counter()
+    batch = []
+    for i in range(listings):
+        batch.append({
+            "name": f"Tractor {i}", "description": "35 HP tractor with rotavator", "owner_id": ObjectId(),
+            "pincode": random.choice(pincodes), "price_per_day": 1500.0, "availability_status": True,
+            "image_urls": [], "contact_name": "Owner", "contact_phone": "9999999999", "contact_whatsapp": None,
+        })
+        if len(batch) == 5000:
+            db.equipment.insert_many(batch)
+            batch = []
+    if batch:
+        db.equipment.insert_many(batch)
+    print(f"Inserted {listings} listings in {time.perf_counter() - started:.1f}s ({os.environ['MONGO_URI'].split(':')[0]})")
+
+    app = FastAPI()
+    app.include_router(agri_share.router, prefix="/api/agri-share")
+    client = TestClient(app)
+    for radius in (10, 25, 50):
+        samples, pages = [], 0
+        for pincode in queries[:30]:
+            params = {"pincode": pincode, "radius_km": radius, "limit": 20}
+            started = time.perf_counter()
+            response = client.get("/api/agri-share/agri-share/equipment/nearby", params=params).json()
+            samples.append(time.perf_counter() - started)
+            if response["next_cursor"]:
+                client.get("/api/agri-share/agri-share/equipment/nearby", params={**params, "cursor": response["next_cursor"]})
+                pages += 1
+        print(f"nearby route radius {radius:>3} km: {percentiles(samples)}  ({pages} queries had a second page)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmarks SchemeSearchIndex build time and query latency on a synthetic corpus
+of 10k schemes with Hindi and Marathi translations.
+
+Run from the repository root:
+
+    python -m benchmarks.scheme_search [schemes]
+"""
+import random
+import sys
+import time
+
+from backend.scheme_search import SchemeSearchIndex
+
+EN_WORDS = ("kisan", "fasal", "bima", "pension", "loan", "credit", "irrigation", "soil", "seed", "subsidy",
+            "organic", "dairy", "fisheries", "horticulture", "insurance", "tractor", "solar", "pump", "storage",
+            "market", "women", "tribal", "drought", "flood", "training", "export", "warehouse", "cooperative")
+HI_WORDS = ("किसान", "फसल", "बीमा", "पेंशन", "ऋण", "सिंचाई", "मिट्टी", "बीज", "सब्सिडी", "जैविक", "डेयरी", "बागवानी")
+MR_WORDS = ("शेतकरी", "पीक", "विमा", "निवृत्तीवेतन", "कर्ज", "सिंचन", "माती", "बियाणे", "अनुदान", "सेंद्रिय")
+CATEGORIES = ("Financial Support", "Insurance", "Pension Scheme", "Irrigation", "Credit", "Infrastructure",
+              "Organic Farming", "Livestock", "Horticulture", "Marketing")
+
+
+def make_scheme(i):
+    sentence = lambda words, n: " ".join(random.choice(words) for _ in range(n))
+    return {
+        "scheme_name": f"{sentence(EN_WORDS, 3).title()} Yojana {i}",
+        "category": random.choice(CATEGORIES),
+        "description": sentence(EN_WORDS, 40),
+        "translations": {
+            "hi": {"scheme_name": f"{sentence(HI_WORDS, 3)} योजना {i}", "description": sentence(HI_WORDS, 40)},
+            "mr": {"scheme_name": f"{sentence(MR_WORDS, 3)} योजना {i}", "description": sentence(MR_WORDS, 40)},
+        },
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    random.seed(0)
+    schemes = [make_scheme(i) for i in range(n)]
+
+    started = time.perf_counter()
+    index = SchemeSearchIndex(schemes)
+    print(f"Indexed {n} schemes ({len(index.vocabulary)} terms) in {time.perf_counter() - started:.2f}s")
+
+    cases = (
+        ("browse, no query", {"query": ""}),
+        ("single term", {"query": "irrigation"}),
+        ("two terms", {"query": "solar pump"}),
+        ("prefix", {"query": "horti"}),
+        ("Hindi", {"query": "फसल बीमा", "lang": "hi"}),
+        ("Marathi + category", {"query": "पीक", "lang": "mr", "category": "Insurance"}),
+        ("rare three terms", {"query": "tribal drought warehouse"}),
+    )
+    for label, kwargs in cases:
+        result = index.search(limit=20, **kwargs)
+        samples = []
+        for _ in range(50):
+            started = time.perf_counter()
+            index.search(limit=20, **kwargs)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        page2 = index.search(limit=20, cursor=result["next_cursor"], **kwargs) if result["next_cursor"] else None
+        print(f"{label:<20} p50 {samples[25] * 1e3:6.2f} ms  p95 {samples[47] * 1e3:6.2f} ms  "
+              f"{result['total']:>6} matches{'' if page2 is None else ', page 2 ok'}")
+
+
+if __name__ == "__main__":
+    main()
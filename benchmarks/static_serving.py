@@ -0,0 +1,95 @@
+"""
+Compares the bytes a browser downloads for the frontend (index.html plus the Vite
+bundle) on a first and a repeat visit, before (plain FileResponse / StaticFiles)
+and after (in-memory index, precompressed siblings, immutable assets), and times
+index.html responses.
+
+Writes the .br/.gz siblings into a copy of backend/static. Run from the repository root:
+
+    python -m benchmarks.static_serving
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from backend.precompress import precompress
+from backend.static_files import InMemoryIndex, PrecompressedStaticFiles
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "backend", "static")
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+
+def baseline_app(static_dir):
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+
+    @app.get("/{full_path:path}")
+    async def serve_frontend(full_path: str):
+        return FileResponse(os.path.join(static_dir, "index.html"))
+    return app
+
+
+def optimized_app(static_dir):
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
+    index = InMemoryIndex(os.path.join(static_dir, "index.html"))
+
+    @app.get("/{full_path:path}")
+    async def serve_frontend(full_path: str, request: Request):
+        return index.response(request)
+    return app
+
+
+def visit(client, asset_urls, cache):
+    """Loads the page like a browser with an HTTP cache; returns bytes transferred."""
+    transferred = 0
+    for url in ["/market", *asset_urls]:
+        cached = cache.get(url)
+        if cached and "immutable" in cached.get("cache-control", ""):
+            continue
+        headers = dict(BROWSER_HEADERS)
+        if cached:
+            if "etag" in cached:
+                headers["If-None-Match"] = cached["etag"]
+            if "last-modified" in cached:
+                headers["If-Modified-Since"] = cached["last-modified"]
+        # Count what went over the wire, not the decoded body.
+        with client.stream("GET", url, headers=headers) as response:
+            transferred += sum(len(chunk) for chunk in response.iter_raw())
+            transferred += sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+            if response.status_code == 200:
+                cache[url] = dict(response.headers)
+    return transferred
+
+
+def main():
+    static_dir = os.path.join(tempfile.mkdtemp(), "static")
+    shutil.copytree(STATIC_DIR, static_dir, ignore=shutil.ignore_patterns("uploads"))
+    precompress(static_dir)
+    with open(os.path.join(static_dir, "index.html")) as f:
+        # The committed index.html predates the /static/ base, so point it at the mount.
+        html = re.sub(r'"/assets/', '"/static/assets/', f.read())
+    with open(os.path.join(static_dir, "index.html"), "w") as f:
+        f.write(html)
+    asset_urls = re.findall(r'(?:src|href)="(/static/assets/[^"]+)"', html)
+
+    for label, app in (("baseline", baseline_app(static_dir)), ("optimized", optimized_app(static_dir))):
+        client = TestClient(app)
+        cache = {}
+        first, repeat = visit(client, asset_urls, cache), visit(client, asset_urls, cache)
+        started = time.perf_counter()
+        for _ in range(2000):
+            client.get("/market", headers=BROWSER_HEADERS)
+        per_request = (time.perf_counter() - started) / 2000 * 1e3
+        print(f"{label:<10} first visit {first / 1024:8.1f} KiB  repeat visit {repeat / 1024:6.2f} KiB  index.html {per_request:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
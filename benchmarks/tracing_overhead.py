@@ -0,0 +1,106 @@
+"""
+Measures what the tracing in backend/metrics.py adds to a `/api/query` request:
+`handle_query` is run with instant stand-ins for the location, weather, market
+and AI stages, once with its spans and trace and once with them replaced by
+no-ops, so the difference is the instrumentation alone. Also reports the cost
+of one span and of rendering /metrics.
+
+Run from the repository root:
+
+    python -m benchmarks.tracing_overhead [queries]
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("MONGO_URI", "mongomock://benchmark")
+
+from backend import metrics
+from backend.routes import query
+from backend.schemas import QueryRequest
+
+# Typical end-to-end query latencies: a cached answer path and a Groq round trip.
+REFERENCE_QUERY_MS = (50, 500)
+
+
+class FakePipeline:
+    async def get_ai_response(self, **kwargs):
+        with metrics.span("retriever"):
+            pass
+        with metrics.span("llm"):
+            pass
+        return "answer", 0.85, ["crop_advisory.json"]
+
+
+class FakeRuntime:
+    async def get_pipeline(self):
+        return FakePipeline()
+
+
+def fake_location(pincode):
+    with metrics.span("upstream.location"):
+        return {"district": "Pune", "state": "Maharashtra"}
+
+
+async def fake_weather(pincode, fields=None, hourly=False):
+    metrics.record_cache("weather", True)
+    return None
+
+
+async def fake_market(pincode, commodity=None, apmc=None):
+    return None
+
+
+def per_query_us(queries):
+    request = QueryRequest(query="When should I sow wheat?", language="english", pincode="411001")
+
+    async def run():
+        for _ in range(100):
+            await query.handle_query(request)
+        started = time.perf_counter()
+        for _ in range(queries):
+            await query.handle_query(request)
+        return (time.perf_counter() - started) / queries * 1e6
+
+    return min(asyncio.run(run()) for _ in range(3))
+
+
+def main():
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # The per-request trace line is logged at INFO; keep it enabled, as in production,
+    # but write it nowhere.
+    logging.getLogger().handlers = [logging.StreamHandler(open(os.devnull, "w"))]
+
+    query.get_location_details = fake_location
+    query.get_weather = fake_weather
+    query.get_market_prices = fake_market
+    query.ai_runtime = FakeRuntime()
+
+    real_span = metrics.span
+    traced = per_query_us(queries)
+    query.span = query.trace = lambda *args, **kwargs: contextlib.nullcontext()
+    metrics.span = lambda *args, **kwargs: contextlib.nullcontext()
+    metrics.record_cache = lambda *args: None
+    untraced = per_query_us(queries)
+
+    overhead = traced - untraced
+    print(f"handle_query with tracing: {traced:.1f} us, without: {untraced:.1f} us, overhead {overhead:.1f} us per query")
+    for reference_ms in REFERENCE_QUERY_MS:
+        print(f"  {overhead / (reference_ms * 1000):.3%} of a {reference_ms} ms query")
+
+    started = time.perf_counter()
+    for _ in range(queries):
+        with real_span("bench"):
+            pass
+    print(f"one span: {(time.perf_counter() - started) / queries * 1e6:.2f} us")
+
+    started = time.perf_counter()
+    body = metrics.render()
+    print(f"/metrics render: {(time.perf_counter() - started) * 1000:.2f} ms, {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    main()
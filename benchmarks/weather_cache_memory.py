@@ -0,0 +1,105 @@
+"""
+Measures the memory held by `weather_cache` for 10k pincodes, storing either the raw
+WeatherAPI `forecastday` list or the compact projection from `compact_forecast`.
+
+Run from the repository root:
+
+    python -m benchmarks.weather_cache_memory [pincodes]
+
+The raw cache needs several GiB for 10k pincodes; pass a smaller count on small machines.
+"""
+import copy
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from backend.routes.weather import compact_forecast
+from backend.schemas import WeatherResponse
+
+CONDITIONS = [
+    ("Sunny", "//cdn.weatherapi.com/weather/64x64/day/113.png"),
+    ("Partly cloudy", "//cdn.weatherapi.com/weather/64x64/day/116.png"),
+    ("Patchy rain nearby", "//cdn.weatherapi.com/weather/64x64/day/176.png"),
+    ("Moderate rain", "//cdn.weatherapi.com/weather/64x64/day/302.png"),
+]
+
+
+def _condition():
+    text, icon = random.choice(CONDITIONS)
+    return {"text": text, "icon": icon, "code": random.randint(1000, 1300)}
+
+
+def _raw_hour(date, hour):
+    value = lambda: round(random.uniform(0, 40), 1)
+    return {
+        "time_epoch": 1700000000 + hour * 3600, "time": f"{date} {hour:02d}:00",
+        "temp_c": value(), "temp_f": value(), "is_day": int(6 <= hour < 18), "condition": _condition(),
+        "wind_mph": value(), "wind_kph": value(), "wind_degree": random.randint(0, 359), "wind_dir": "WSW",
+        "pressure_mb": value(), "pressure_in": value(), "precip_mm": value(), "precip_in": value(),
+        "snow_cm": 0.0, "humidity": random.randint(20, 100), "cloud": random.randint(0, 100),
+        "feelslike_c": value(), "feelslike_f": value(), "windchill_c": value(), "windchill_f": value(),
+        "heatindex_c": value(), "heatindex_f": value(), "dewpoint_c": value(), "dewpoint_f": value(),
+        "will_it_rain": 0, "chance_of_rain": random.randint(0, 100), "will_it_snow": 0, "chance_of_snow": 0,
+        "vis_km": 10.0, "vis_miles": 6.0, "gust_mph": value(), "gust_kph": value(), "uv": value(),
+    }
+
+
+def raw_forecast(days=7):
+    forecast = []
+    for offset in range(days):
+        date = f"2025-06-{10 + offset:02d}"
+        value = lambda: round(random.uniform(0, 40), 1)
+        forecast.append({
+            "date": date, "date_epoch": 1749513600 + offset * 86400,
+            "day": {
+                "maxtemp_c": value(), "maxtemp_f": value(), "mintemp_c": value(), "mintemp_f": value(),
+                "avgtemp_c": value(), "avgtemp_f": value(), "maxwind_mph": value(), "maxwind_kph": value(),
+                "totalprecip_mm": value(), "totalprecip_in": value(), "totalsnow_cm": 0.0,
+                "avgvis_km": 10.0, "avgvis_miles": 6.0, "avghumidity": random.randint(20, 100),
+                "daily_will_it_rain": 1, "daily_chance_of_rain": random.randint(0, 100),
+                "daily_will_it_snow": 0, "daily_chance_of_snow": 0, "condition": _condition(), "uv": value(),
+            },
+            "astro": {
+                "sunrise": "05:45 AM", "sunset": "07:05 PM", "moonrise": "08:12 PM", "moonset": "06:01 AM",
+                "moon_phase": "Waning Gibbous", "moon_illumination": 97, "is_moon_up": 0, "is_sun_up": 0,
+            },
+            "hour": [_raw_hour(date, hour) for hour in range(24)],
+        })
+    return forecast
+
+
+def measure(build, pincodes):
+    # Parse from JSON per pincode so each cache entry owns its objects, as in production.
+    payloads = [json.dumps(raw_forecast()) for _ in range(50)]
+    tracemalloc.start()
+    started = time.perf_counter()
+    cache = {}
+    for i in range(pincodes):
+        cache[f"{400000 + i}"] = (build(json.loads(payloads[i % len(payloads)])), time.time())
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cache, current, elapsed
+
+
+def main():
+    pincodes = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    random.seed(0)
+    sample = raw_forecast()
+    raw_bytes = len(json.dumps(sample))
+    compact_bytes = len(json.dumps(compact_forecast(copy.deepcopy(sample))))
+    print(f"JSON per pincode: raw={raw_bytes / 1024:.1f} KiB compact={compact_bytes / 1024:.1f} KiB")
+
+    for label, build in (
+        ("raw", lambda days: WeatherResponse(forecast=days)),
+        ("compact", lambda days: WeatherResponse(forecast=compact_forecast(days))),
+    ):
+        cache, current, elapsed = measure(build, pincodes)
+        print(f"{label:>8}: {pincodes} pincodes -> {current / 2**20:.1f} MiB ({elapsed:.1f}s)")
+        del cache
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measures per-worker memory of the gunicorn multi-worker mode (gunicorn.conf.py)
+with and without loading the shared state in the master before forking.
+
+Starts gunicorn twice — GUNICORN_PRELOAD=1 and GUNICORN_PRELOAD=0 — waits for
+every worker to answer /healthz, sends some traffic, and reads Rss and Pss from
+/proc/<pid>/smaps_rollup for the master and each worker. Pss divides shared pages
+between the processes sharing them, so the Pss total is the memory the
+deployment really uses.
+
+Run from the repository root (Linux only):
+
+    python -m benchmarks.worker_memory [workers] [centroid pincodes]
+
+A synthetic pincode centroid table stands in for the larger shared state; the
+FAISS index is included when the AI dependencies and index are installed. The
+embedding model is not shared: each worker loads its own after the fork (see
+backend/preload.py), so it counts fully in every worker's Pss.
+"""
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REQUESTS_PER_WORKER = 50
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def memory_kib(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        response.read()
+
+
+def measure(preload, workers, env, pincode):
+    port = free_port()
+    env = {**env, "GUNICORN_PRELOAD": "1" if preload else "0", "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 300
+        while time.monotonic() < deadline:
+            try:
+                if len(children(server.pid)) == workers:
+                    get(f"{base}/healthz")
+                    break
+            except OSError:
+                pass
+            time.sleep(0.2)
+        else:
+            raise RuntimeError("gunicorn did not start")
+        # Requests land on arbitrary workers; enough of them make every worker
+        # load (or touch) its state.
+        for _ in range(REQUESTS_PER_WORKER * workers):
+            get(f"{base}/api/schemes/schemes")
+            get(f"{base}/api/agri-share/agri-share/equipment/nearby?pincode={pincode}&radius_km=5")
+        time.sleep(1)
+
+        master = memory_kib(server.pid)
+        worker_memory = [memory_kib(pid) for pid in children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    label = "preload" if preload else "no preload"
+    print(f"{label}: master RSS {master[0] / 1024:.1f} MiB, PSS {master[1] / 1024:.1f} MiB")
+    for i, (rss, pss) in enumerate(worker_memory):
+        print(f"  worker {i}: RSS {rss / 1024:.1f} MiB, PSS {pss / 1024:.1f} MiB")
+    total_pss = master[1] + sum(pss for _, pss in worker_memory)
+    print(f"  total PSS {total_pss / 1024:.1f} MiB")
+    return total_pss
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    pincodes = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+
+    tmp = tempfile.mkdtemp()
+    centroid_file = os.path.join(tmp, "pincode_centroids.csv")
+    with open(centroid_file, "w") as f:
+        f.write("pincode,latitude,longitude\n")
+        sample = random.sample(range(100000, 1000000), pincodes)
+        for pincode in sample:
+            f.write(f"{pincode},{random.uniform(8, 35):.5f},{random.uniform(68, 97):.5f}\n")
+
+    env = {
+        **os.environ,
+        "MONGO_URI": os.getenv("MONGO_URI", "mongomock://benchmark"),
+        "PINCODE_CENTROIDS_FILE": centroid_file,
+    }
+    with_preload = measure(True, workers, env, sample[0])
+    without_preload = measure(False, workers, env, sample[0])
+    saving = without_preload - with_preload
+    print(f"preloading saves {saving / 1024:.1f} MiB PSS ({saving / without_preload:.0%}) across {workers} workers")
+
+
+if __name__ == "__main__":
+    main()
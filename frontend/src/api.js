@@ -27,7 +27,7 @@ export const api = {
 
     getWeather: async (pincode) => {
         try {
-            const response = await apiClient.get(`/weather?pincode=${pincode}`);
+            const response = await apiClient.get(`/weather?pincode=${pincode}&hourly=false`);
             return response.data;
         } catch (error) {
             handleApiError(error);
@@ -52,6 +52,18 @@ export const api = {
         }
     },
 
+    searchSchemes: async ({ q = '', category = null, lang = 'en', cursor = null, limit = 20 } = {}) => {
+        try {
+            const params = { q, lang, limit };
+            if (category) params.category = category;
+            if (cursor) params.cursor = cursor;
+            const response = await apiClient.get('/schemes/search', { params });
+            return response.data;
+        } catch (error) {
+            handleApiError(error);
+        }
+    },
+
     getLocationDetails: async (pincode) => {
         try {
             const response = await apiClient.get(`/location/${pincode}`);
@@ -26,6 +26,7 @@ const ImageGalleryModal = ({ images, onClose }) => {
               key={index}
               src={url}
               alt={`Equipment image ${index + 1}`}
+              loading="lazy"
               className="w-full h-auto object-cover rounded-md"
             />
           ))}
@@ -46,9 +47,12 @@ const EquipmentCard = ({ equipment }) => {
 
   // Defensive: ensure image_urls is an array
   const images = Array.isArray(equipment.image_urls) ? equipment.image_urls : [];
+  const thumbnails = Array.isArray(equipment.thumbnail_urls) ? equipment.thumbnail_urls : [];
 
   const primaryImage =
-    images.length > 0
+    thumbnails.length > 0
+      ? thumbnails[0]
+      : images.length > 0
       ? images[0]
       : `https://via.placeholder.com/400x300.png?text=${t('agri_share.card.no_image').replace(
           / /g,
@@ -62,6 +66,7 @@ const EquipmentCard = ({ equipment }) => {
           <img
             src={primaryImage}
             alt={equipment.name || t('agri_share.card.unnamed')}
+            loading="lazy"
             className="w-full h-48 object-cover cursor-pointer"
             onClick={() => images.length > 0 && setIsModalOpen(true)}
           />
@@ -56,7 +56,7 @@ const EquipmentList = () => {
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
                 {equipment.length > 0 ? (
                     equipment.map(item => (
-                        <EquipmentCard key={item.id} equipment={item} />
+                        <EquipmentCard key={item._id} equipment={item} />
                     ))
                 ) : (
                     <p className="col-span-full text-center">{t('agri_share.list.no_equipment_available')}</p>
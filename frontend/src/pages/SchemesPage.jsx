@@ -1,33 +1,70 @@
 import React, { useState, useEffect } from 'react';
+import { useTranslation } from 'react-i18next';
 import { api } from '../api';
 
+const SEARCH_LANGUAGES = ['en', 'hi', 'mr'];
+
 const SchemesPage = () => {
+    const { i18n } = useTranslation();
+    const lang = SEARCH_LANGUAGES.includes(i18n.language) ? i18n.language : 'en';
+
     const [schemes, setSchemes] = useState([]);
+    const [facets, setFacets] = useState({});
+    const [total, setTotal] = useState(0);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [query, setQuery] = useState('');
+    const [category, setCategory] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
 
+    const fetchSchemes = async (cursor = null) => {
+        setLoading(true);
+        setError('');
+        try {
+            const response = await api.searchSchemes({ q: query, category, lang, cursor });
+            setSchemes((previous) => (cursor ? [...previous, ...response.results] : response.results));
+            setFacets(response.facets || {});
+            setTotal(response.total || 0);
+            setNextCursor(response.next_cursor);
+        } catch (err) {
+            setError(err.message || 'Failed to fetch schemes.');
+        } finally {
+            setLoading(false);
+        }
+    };
+
     useEffect(() => {
-        const fetchSchemes = async () => {
-            setLoading(true);
-            setError('');
-            try {
-                const response = await api.getSchemes();
-                setSchemes(response.schemes || []);
-            } catch (err) {
-                setError(err.message || 'Failed to fetch schemes.');
-            } finally {
-                setLoading(false);
-            }
-        };
-
-        fetchSchemes();
-    }, []);
+        const timer = setTimeout(() => fetchSchemes(), 250);
+        return () => clearTimeout(timer);
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [query, category, lang]);
 
     return (
         <div className="w-full max-w-4xl mx-auto">
             <h1 className="text-3xl font-bold text-gray-800 mb-6">Government Schemes for Agriculture</h1>
 
-            {loading && <p>Loading schemes...</p>}
+            <input
+                type="search"
+                value={query}
+                onChange={(e) => setQuery(e.target.value)}
+                placeholder="Search schemes"
+                className="w-full p-3 mb-4 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary"
+            />
+
+            {Object.keys(facets).length > 0 && (
+                <div className="flex flex-wrap gap-2 mb-4">
+                    {Object.entries(facets).map(([name, count]) => (
+                        <button
+                            key={name}
+                            onClick={() => setCategory(category === name ? null : name)}
+                            className={`text-xs font-semibold px-2.5 py-1 rounded-full ${category === name ? 'bg-primary text-white' : 'bg-green-100 text-green-800'}`}
+                        >
+                            {name} ({count})
+                        </button>
+                    ))}
+                </div>
+            )}
+
             {error && <p className="text-red-500 bg-red-100 p-3 rounded-lg">{error}</p>}
             
             {!loading && schemes.length === 0 && !error && (
@@ -51,6 +88,17 @@ const SchemesPage = () => {
                     ))}
                 </div>
             )}
+
+            {loading && <p className="mt-4">Loading schemes...</p>}
+
+            {!loading && nextCursor && (
+                <button
+                    onClick={() => fetchSchemes(nextCursor)}
+                    className="mt-6 w-full px-6 py-3 bg-primary text-white font-semibold rounded-lg hover:bg-primary-dark"
+                >
+                    Load more ({schemes.length} of {total})
+                </button>
+            )}
         </div>
     );
 };
@@ -0,0 +1,30 @@
+# Multi-worker serving with state shared between workers:
+#
+#     gunicorn -c gunicorn.conf.py backend.main:app
+#
+# The app is imported and its indexes and data are loaded once in the master
+# (preload_app + backend.preload), then the workers are forked from it and share
+# that memory copy-on-write, instead of each loading its own copy as
+# `uvicorn --workers N` does. Each worker loads its own embedding model.
+import multiprocessing
+import os
+
+# The HF tokenizers loaded in the master must not start their thread pool before
+# the fork; in the workers the embedding batches are already parallel.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+# GUNICORN_PRELOAD=0 gives every worker its own copy again, e.g. to compare memory use.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked.
+    if not preload_app:
+        return
+    from backend.preload import preload_shared_state
+    preload_shared_state()